@@ -0,0 +1,40 @@
+from datetime import datetime
+from typing import Annotated, Literal, Optional
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.auth.auth_service import get_current_active_user
+from app.core.config import ADMIN_FEEDBACK_PAGE_SIZE, ADMIN_FEEDBACK_PAGE_MAX
+from app.core.database import get_db
+from app.schemas.feedback_schema import FeedbackPage
+from app.services.feedback_export import list_feedback, export_ndjson, export_csv
+
+router = APIRouter(dependencies=[Depends(get_current_active_user)])
+
+@router.get("/feedback", response_model=FeedbackPage)
+async def read_feedback(
+    db: Annotated[AsyncSession, Depends(get_db)],
+    limit: Annotated[int, Query(ge=1, le=ADMIN_FEEDBACK_PAGE_MAX)] = ADMIN_FEEDBACK_PAGE_SIZE,
+    before_id: Optional[int] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+):
+    return await list_feedback(db, limit, before_id, since, until)
+
+@router.get("/feedback/export")
+async def export_feedback(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+):
+    if format == "csv":
+        return StreamingResponse(
+            export_csv(since, until),
+            media_type="text/csv; charset=utf-8",
+            headers={"Content-Disposition": 'attachment; filename="feedback.csv"'},
+        )
+    return StreamingResponse(
+        export_ndjson(since, until),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="feedback.ndjson"'},
+    )
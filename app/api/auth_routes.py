@@ -6,15 +6,16 @@ from app.schemas.auth import Token
 from app.schemas.user_schema import User_schema
 from app.core.config import ACCESS_TOKEN_EXPIRE_MINUTES
 from app.auth.auth_service import get_current_active_user, authenticate_user
+from app.auth.password_hasher import password_hasher
 from app.auth.jwt_handler import create_access_token
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.database import get_db
 
 router = APIRouter()
 
 @router.post("/login")
-async def login_for_access_token(db: Annotated[Session, Depends(get_db)],form_data: Annotated[OAuth2PasswordRequestForm, Depends()],) -> Token:
-    user = authenticate_user(db, form_data.username, form_data.password)
+async def login_for_access_token(db: Annotated[AsyncSession, Depends(get_db)],form_data: Annotated[OAuth2PasswordRequestForm, Depends()],) -> Token:
+    user = await authenticate_user(db, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -30,3 +31,7 @@ async def login_for_access_token(db: Annotated[Session, Depends(get_db)],form_da
 @router.get("/users/me/", response_model=User_schema)
 async def read_users_me(current_user: Annotated[User_schema, Depends(get_current_active_user)],):
     return current_user
+
+@router.get("/hasher/stats")
+async def read_hasher_stats(current_user: Annotated[User_schema, Depends(get_current_active_user)],):
+    return password_hasher.stats()
@@ -0,0 +1,25 @@
+from fastapi import APIRouter, Response, status
+from fastapi.responses import JSONResponse
+from app.core.metrics import render_metrics
+from app.core.startup import startup_state
+
+router = APIRouter()
+
+@router.get("/live")
+async def liveness():
+    return {"status": "alive"}
+
+@router.get("/ready")
+async def readiness():
+    # 503 ate o fim do aquecimento: o balanceador so envia trafego para workers prontos
+    report = startup_state.report()
+    if not startup_state.ready:
+        return JSONResponse(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, content=report)
+    return report
+
+metrics_router = APIRouter()
+
+@metrics_router.get("/metrics", include_in_schema=False)
+async def metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
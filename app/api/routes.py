@@ -1,62 +1,313 @@
-from fastapi import APIRouter, File, UploadFile, HTTPException, Response, status
+import asyncio
+import itertools
+import json
+import os
+import zipfile
+from io import BytesIO
+from typing import List
+from fastapi import APIRouter, File, Form, UploadFile, HTTPException, Request, Response, WebSocket, WebSocketDisconnect, status
+from pydantic import ValidationError
+from fastapi.responses import StreamingResponse
 from app.schemas.translation_schema import Translation_schema
-from app.schemas.voice_command_schema import VoiceCommandRequest
-from app.schemas.feedback_schema import Feedback_schema
-from app.services.translate_service import translate_list
-from app.services.image_description import analyze_image
-from app.services.feedback_service import send_feedback
+from app.schemas.voice_command_schema import VoiceCommandRequest, VoiceCommandMessage
+from app.schemas.feedback_schema import Feedback_schema, FeedbackBulkRequest
+from app.schemas.tts_schema import TextToSpeechBatchRequest
+from app.core.responses import compressed_json
+from app.core.upstream import UpstreamUnavailable
+from app.core.config import (
+    TTS_BATCH_MAX_TEXTS,
+    FEEDBACK_BULK_MAX_ITEMS,
+    IMAGE_MAX_UPLOAD_BYTES,
+    IMAGE_BATCH_MAX_ITEMS,
+    IMAGE_BATCH_CONCURRENCY,
+    VOICE_WS_MAX_IN_FLIGHT,
+)
+from app.services.translate_service import translate_compact, translate_list, translate_stream
+from app.services.translation_cache import translation_cache
+from app.services.segment_filter import SegmentFilterStats
+from app.services.image_description import analyze_image, analyze_image_url, cached_caption
+from app.services.image_preprocessing import ImageTooLarge, preprocess_image_async
+from app.services.feedback_service import send_feedback, send_feedback_bulk
+from app.services.feedback_writer import feedback_writer
 from app.services.tts_service import TextToSpeechService
-from app.services.wit_nlu_service import WitNLUService
+from app.services.wit_nlu_service import get_wit_nlu_service
 
 router = APIRouter()
 
-@router.post("/feedback", response_model=Feedback_schema, status_code=status.HTTP_201_CREATED)
+tts_service = TextToSpeechService()
+
+@router.post("/feedback", response_model=Feedback_schema, status_code=status.HTTP_202_ACCEPTED)
 async def post_feedback(feedback_body: Feedback_schema):
-    return send_feedback(
+    return await send_feedback(
             title=feedback_body.title,
             message=feedback_body.message
     )
 
+@router.post("/feedback/bulk", status_code=status.HTTP_202_ACCEPTED)
+async def post_feedback_bulk(bulk_body: FeedbackBulkRequest):
+    if len(bulk_body.feedbacks) > FEEDBACK_BULK_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {FEEDBACK_BULK_MAX_ITEMS} feedbacks per request.",
+        )
+    return {"accepted": await send_feedback_bulk(bulk_body.feedbacks)}
+
+@router.get("/feedback/queue-stats")
+async def feedback_queue_stats():
+    return feedback_writer.stats()
+
 @router.post("/translate/")
-async def translate_text_list(translate_body: Translation_schema):
-    return translate_list(
+async def translate_text_list(translate_body: Translation_schema, request: Request):
+    stats = SegmentFilterStats()
+    if translate_body.format == "compact":
+        result = await translate_compact(
+            to_language=translate_body.to_language,
+            text_list=translate_body.text_list,
+            from_language=translate_body.from_language,
+            include_detected_language=translate_body.include_detected_language,
+            stats=stats
+        )
+    else:
+        result = await translate_list(
+            to_language=translate_body.to_language,
+            text_list=translate_body.text_list,
+            from_language=translate_body.from_language,
+            stats=stats
+        )
+    response = compressed_json(request, result)
+    response.headers.update(stats.headers())
+    return response
+
+@router.post("/translate/stream")
+async def translate_text_stream(translate_body: Translation_schema):
+    translations = translate_stream(
         to_language=translate_body.to_language,
         text_list=translate_body.text_list,
         from_language=translate_body.from_language
     )
+    # o primeiro registro sai antes dos cabecalhos, para que falhas iniciais ainda virem 503/500
+    try:
+        first = await anext(translations)
+    except StopAsyncIteration:
+        first = None
+
+    def record(index, translation):
+        return json.dumps({"index": index, "translation": translation}, ensure_ascii=False) + "\n"
+
+    async def ndjson_records():
+        if first is None:
+            return
+        yield record(*first)
+        try:
+            async for index, translation in translations:
+                yield record(index, translation)
+        except Exception as e:
+            # o status 200 ja foi enviado, entao o erro vai como ultimo registro
+            yield json.dumps({"error": str(e)}, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(ndjson_records(), media_type="application/x-ndjson")
+
+@router.get("/translate/cache-stats")
+async def translation_cache_stats():
+    return translation_cache.stats()
+
+async def read_upload(file: UploadFile, max_bytes: int) -> bytes:
+    # o corpo inteiro ja foi limitado pelo BodySizeLimitMiddleware; aqui vale o limite por arquivo
+    if file.size is not None and file.size > max_bytes:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="File too large")
+    return await file.read()
+
+async def preprocess_upload(image_bytes: bytes) -> bytes:
+    try:
+        return await preprocess_image_async(image_bytes)
+    except ImageTooLarge:
+        raise HTTPException(status_code=400, detail="Image dimensions too large")
 
 @router.post("/describe-image/")
 async def describe_image(file: UploadFile = File(...)):
     if file.content_type.split('/')[0] != 'image':
         raise HTTPException(status_code=400, detail="File must be an image")
     
-    image_bytes = await file.read()
-    caption = analyze_image(image_bytes)
+    upload_bytes = await read_upload(file, IMAGE_MAX_UPLOAD_BYTES)
+    # repeticao exata: responde do cache sem decodificar nem redimensionar a imagem
+    caption = await cached_caption(upload_bytes)
+    if caption is None:
+        image_bytes = await preprocess_upload(upload_bytes)
+        caption = await analyze_image(image_bytes, upload_bytes=upload_bytes)
 
     return caption  
 
+@router.post("/describe-image/batch/")
+async def describe_image_batch(files: List[UploadFile] = File(default=[]), urls: List[str] = Form(default=[])):
+    if len(files) + len(urls) > IMAGE_BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {IMAGE_BATCH_MAX_ITEMS} images per batch")
+
+    semaphore = asyncio.Semaphore(IMAGE_BATCH_CONCURRENCY)
+
+    async def describe_file(file: UploadFile):
+        if not file.content_type or file.content_type.split('/')[0] != 'image':
+            raise HTTPException(status_code=400, detail="File must be an image")
+        upload_bytes = await read_upload(file, IMAGE_MAX_UPLOAD_BYTES)
+        caption = await cached_caption(upload_bytes)
+        if caption is not None:
+            return caption
+        async with semaphore:
+            image_bytes = await preprocess_upload(upload_bytes)
+            return await analyze_image(image_bytes, upload_bytes=upload_bytes)
+
+    async def describe_url(url: str):
+        if not url.startswith(("http://", "https://")):
+            raise HTTPException(status_code=400, detail="Invalid image URL")
+        async with semaphore:
+            return await analyze_image_url(url)
+
+    sources = [file.filename for file in files] + urls
+    results = await asyncio.gather(
+        *[describe_file(file) for file in files],
+        *[describe_url(url) for url in urls],
+        return_exceptions=True,
+    )
+
+    items = []
+    for index, (source, result) in enumerate(zip(sources, results)):
+        if isinstance(result, HTTPException):
+            items.append({"index": index, "source": source, "error": result.detail})
+        elif isinstance(result, UpstreamUnavailable):
+            items.append({"index": index, "source": source, "error": str(result)})
+        elif isinstance(result, Exception):
+            items.append({"index": index, "source": source, "error": "error analyzing image"})
+        else:
+            items.append({"index": index, "source": source, **result})
+    return {"results": items}
+
+def iter_file(audio_file, chunk_size: int = 64 * 1024):
+    with audio_file:
+        while chunk := audio_file.read(chunk_size):
+            yield chunk
+
 @router.post("/convert-audio/", response_class=Response)
 def convert_audio(text: str) -> Response:
-    tts_service = TextToSpeechService()
     try:
-        audio_bytes = tts_service.convert_text_to_audio(text)
-        return Response(
-            content=audio_bytes.read(),
+        # o arquivo ja aberto continua legivel mesmo que outro worker o remova do cache
+        audio_file = tts_service.open_audio_file(text)
+        return StreamingResponse(
+            iter_file(audio_file),
             media_type="audio/mpeg",
-            headers={"Content-Disposition": "attachment; filename=audio.mp3"},
+            headers={
+                "Content-Disposition": "attachment; filename=audio.mp3",
+                "Content-Length": str(os.fstat(audio_file.fileno()).st_size),
+            },
         )
     except ValueError as ve:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail=str(ve),
         )
+    except UpstreamUnavailable:
+        raise
     except Exception:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Internal error generating audio.",
         )
 
+@router.post("/convert-audio/stream/")
+def convert_audio_stream(text: str) -> StreamingResponse:
+    # o primeiro trecho e sintetizado antes dos cabecalhos, para que falhas iniciais ainda virem 400/500/503
+    try:
+        audio_chunks = tts_service.stream_text_to_audio(text)
+        first_chunk = next(audio_chunks)
+    except ValueError as ve:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=str(ve),
+        )
+    except UpstreamUnavailable:
+        raise
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Internal error generating audio.",
+        )
+    return StreamingResponse(
+        itertools.chain([first_chunk], audio_chunks),
+        media_type="audio/mpeg",
+        headers={"Content-Disposition": "attachment; filename=audio.mp3"},
+    )
+
+@router.post("/convert-audio/batch/", response_class=Response)
+def convert_audio_batch(batch_body: TextToSpeechBatchRequest) -> Response:
+    if len(batch_body.texts) > TTS_BATCH_MAX_TEXTS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {TTS_BATCH_MAX_TEXTS} texts per batch.",
+        )
+
+    results = tts_service.synthesize_batch(batch_body.texts, batch_body.lang, batch_body.tld)
+
+    # textos repetidos apontam para o mesmo arquivo dentro do zip
+    archive = BytesIO()
+    index, written = [], {}
+    with zipfile.ZipFile(archive, "w", compression=zipfile.ZIP_STORED) as zip_file:
+        for position, (text, result) in enumerate(zip(batch_body.texts, results)):
+            if isinstance(result, Exception):
+                detail = str(result) if isinstance(result, ValueError) else "Internal error generating audio."
+                index.append({"index": position, "error": detail})
+                continue
+            if text not in written:
+                written[text] = f"{position}.mp3"
+                zip_file.writestr(written[text], result)
+            index.append({"index": position, "file": written[text]})
+        zip_file.writestr("index.json", json.dumps(index, ensure_ascii=False))
+
+    return Response(
+        content=archive.getvalue(),
+        media_type="application/zip",
+        headers={"Content-Disposition": "attachment; filename=audio.zip"},
+    )
+
 @router.post("/voice-navigation/command")
-def process_voice_command(request: VoiceCommandRequest):
-    nlu_service = WitNLUService()
-    command = nlu_service.process_command(request.text)
+async def process_voice_command(request: VoiceCommandRequest):
+    nlu_service = get_wit_nlu_service()
+    command = await nlu_service.process_command_async(request.text)
     return command
+
+@router.websocket("/voice-navigation/ws")
+async def voice_navigation_socket(websocket: WebSocket):
+    await websocket.accept()
+    nlu_service = get_wit_nlu_service()
+    in_flight = asyncio.Semaphore(VOICE_WS_MAX_IN_FLIGHT)
+    send_lock = asyncio.Lock()
+    tasks = set()
+
+    async def send(payload: dict):
+        async with send_lock:
+            await websocket.send_json(payload)
+
+    async def handle(message: VoiceCommandMessage):
+        try:
+            command = await nlu_service.process_command_async(message.text)
+            await send({"id": message.id, "command": command.model_dump()})
+        except (WebSocketDisconnect, RuntimeError):
+            # conexao encerrada antes da resposta
+            pass
+        finally:
+            in_flight.release()
+
+    try:
+        while True:
+            raw_message = await websocket.receive_text()
+            try:
+                message = VoiceCommandMessage.model_validate_json(raw_message)
+            except ValidationError:
+                await send({"id": None, "error": "Invalid message, expected {\"id\", \"text\"}"})
+                continue
+
+            # comandos sao processados em paralelo e respondidos na ordem em que terminam
+            await in_flight.acquire()
+            task = asyncio.create_task(handle(message))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        for task in tasks:
+            task.cancel()
@@ -1,47 +1,71 @@
+import time
 from typing import Annotated
 from fastapi import Depends,HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from app.auth.jwt_handler import decode_access_token, verify_password
+from app.auth.jwt_handler import decode_access_token
+from app.auth.password_hasher import password_hasher
+from app.auth.principal_cache import token_cache, user_cache
+from app.core.config import AUTH_CACHE_TTL_SECONDS
 from app.schemas.auth import TokenData
 from jwt.exceptions import InvalidTokenError
 from app.core.database import get_db
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.user_model import User_model
+from app.schemas.user_schema import User_schema
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
-def get_user(db: Session, username: str) -> User_model |  None:
-    return db.query(User_model).filter(User_model.username == username).first()
+async def get_user(db: AsyncSession, username: str) -> User_model |  None:
+    result = await db.execute(select(User_model).where(User_model.username == username))
+    return result.scalars().first()
 
-def authenticate_user(db: Session, username: str, password: str) -> User_model | bool:
-    user = get_user(db, username)
+async def authenticate_user(db: AsyncSession, username: str, password: str) -> User_model | bool:
+    user = await get_user(db, username)
     if not user:
+        # usuarios inexistentes levam o mesmo tempo que uma senha errada
+        await password_hasher.dummy_verify()
         return False
-    if not verify_password(password, user.hashed_password):
+    valid, new_hash = await password_hasher.verify_and_update(password, user.hashed_password)
+    if not valid:
         return False
+    if new_hash:
+        user.hashed_password = new_hash
+        await db.commit()
     return user
 
 
-async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)], db: Annotated[Session, Depends(get_db)]):
+async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)], db: Annotated[AsyncSession, Depends(get_db)]):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = decode_access_token(token)
-        username = payload.get("sub")
-        if username is None:
+    username = token_cache.get(token)
+    if username is None:
+        try:
+            payload = decode_access_token(token)
+            username = payload.get("sub")
+            if username is None:
+                raise credentials_exception
+            token_data = TokenData(username=username)
+        except InvalidTokenError:
             raise credentials_exception
-        token_data = TokenData(username=username)
-    except InvalidTokenError:
-        raise credentials_exception
-    user = db.query(User_model).filter(User_model.username == token_data.username).first()
+        # o token nunca fica no cache alem da sua expiracao
+        token_ttl = min(AUTH_CACHE_TTL_SECONDS, payload.get("exp", 0) - time.time())
+        if token_ttl > 0:
+            token_cache.set(token, token_data.username, ttl=token_ttl)
+
+    user = user_cache.get(username)
     if user is None:
-        raise credentials_exception
+        user_row = await get_user(db, username)
+        if user_row is None:
+            raise credentials_exception
+        user = User_schema.model_validate(user_row, from_attributes=True)
+        user_cache.set(username, user)
     return user
 
-async def get_current_active_user(current_user: Annotated[User_model, Depends(get_current_user)],):
+async def get_current_active_user(current_user: Annotated[User_schema, Depends(get_current_user)],):
     if current_user.disabled:
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
@@ -0,0 +1,62 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+from fastapi import HTTPException, status
+from app.auth.jwt_handler import pwd_context
+from app.core.config import PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_QUEUE
+
+
+class PasswordHasher:
+    """Runs bcrypt on a dedicated bounded executor so logins never block the event loop"""
+
+    def __init__(self, max_workers: int, max_queue: int):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.in_flight = 0
+        self.queued = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bcrypt")
+
+    def _track(self, fn, *args):
+        # executado na thread do pool: a tarefa saiu da fila
+        with self._lock:
+            self.queued -= 1
+            self.in_flight += 1
+        try:
+            return fn(*args)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    async def _run(self, fn, *args):
+        with self._lock:
+            if self.queued >= self.max_queue:
+                self.rejected += 1
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Too many login attempts in progress",
+                    headers={"Retry-After": "1"},
+                )
+            self.queued += 1
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self._track, fn, *args)
+
+    async def verify_and_update(self, password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """Verify a password, returning a new hash when the stored one uses outdated parameters"""
+        return await self._run(pwd_context.verify_and_update, password, hashed_password)
+
+    async def dummy_verify(self) -> None:
+        """Spend the same time as a real verification, for unknown usernames"""
+        await self._run(pwd_context.dummy_verify)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "workers": self.max_workers,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "rejected": self.rejected,
+        }
+
+
+password_hasher = PasswordHasher(max_workers=PASSWORD_HASH_WORKERS, max_queue=PASSWORD_HASH_MAX_QUEUE)
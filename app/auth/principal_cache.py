@@ -0,0 +1,25 @@
+from sqlalchemy import event, inspect
+from app.core.cache import LRUCache
+from app.core.config import AUTH_CACHE_MAX_ENTRIES, AUTH_CACHE_TTL_SECONDS
+from app.core.metrics import cache_metrics
+from app.models.user_model import User_model
+
+# token -> username (evita verificar a assinatura do JWT a cada requisicao)
+token_cache = LRUCache(max_size=AUTH_CACHE_MAX_ENTRIES, ttl=AUTH_CACHE_TTL_SECONDS)
+# username -> User_schema (evita a consulta ao banco)
+user_cache = LRUCache(max_size=AUTH_CACHE_MAX_ENTRIES, ttl=AUTH_CACHE_TTL_SECONDS)
+
+cache_metrics.register_lru("auth_token", token_cache)
+cache_metrics.register_lru("auth_user", user_cache)
+
+def invalidate_user(username: str) -> None:
+    user_cache.delete(username)
+
+@event.listens_for(User_model, "after_update")
+@event.listens_for(User_model, "after_delete")
+def _invalidate_changed_user(mapper, connection, target):
+    # alteracoes feitas pelo ORM (ex.: desativar usuario) invalidam o cache na hora;
+    # updates em massa fora do ORM dependem do TTL
+    invalidate_user(target.username)
+    for old_username in inspect(target).attrs.username.history.deleted:
+        invalidate_user(old_username)
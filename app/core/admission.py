@@ -0,0 +1,177 @@
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from typing import Dict, Optional
+from fastapi.responses import JSONResponse
+from jwt import InvalidTokenError
+from app.auth.jwt_handler import decode_access_token
+from app.core.config import ADMISSION_MAX_WAIT_SECONDS, ADMISSION_RETRY_AFTER_SECONDS, RATE_LIMIT_MAX_CLIENTS
+from app.core.metrics import ADMISSION_QUEUE_WAIT, ADMISSION_QUEUED, ADMISSION_REJECTED
+
+
+class Overloaded(Exception):
+    def __init__(self, status_code: int, detail: str, retry_after: float):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class ConcurrencyLimiter:
+    """At most `max_concurrent` requests running, with a bounded FIFO queue for the rest"""
+
+    def __init__(self, name: str, max_concurrent: int, max_queue: int,
+                 max_wait: float = ADMISSION_MAX_WAIT_SECONDS, retry_after: float = ADMISSION_RETRY_AFTER_SECONDS):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.retry_after = retry_after
+        self.active = 0
+        self.rejected = 0
+        # futures criados no loop da requisicao: o limitador nao fica preso a um event loop
+        self._waiters: "deque[asyncio.Future]" = deque()
+
+    def _reject(self, reason: str):
+        self.rejected += 1
+        ADMISSION_REJECTED.labels(self.name, reason).inc()
+        raise Overloaded(503, "Server busy, try again later", self.retry_after)
+
+    async def acquire(self) -> float:
+        """Take a slot, returning how long the request waited for it"""
+        if self.active < self.max_concurrent:
+            self.active += 1
+            return 0.0
+        if len(self._waiters) >= self.max_queue:
+            self._reject("queue_full")
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        ADMISSION_QUEUED.labels(self.name).inc()
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(future, self.max_wait)
+        except asyncio.TimeoutError:
+            self._reject("timeout")
+        except BaseException:
+            # a vaga pode ter sido entregue logo antes do cancelamento
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+        finally:
+            ADMISSION_QUEUED.labels(self.name).dec()
+            if future in self._waiters:
+                self._waiters.remove(future)
+        return time.perf_counter() - started
+
+    def release(self):
+        # a vaga passa direto para o proximo da fila
+        while self._waiters:
+            future = self._waiters.popleft()
+            if not future.done():
+                future.set_result(None)
+                return
+        self.active -= 1
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "active": self.active,
+            "queued": len(self._waiters),
+            "rejected": self.rejected,
+        }
+
+
+class RateLimiter:
+    """Per-client token buckets refilled at `rate` tokens per second, holding at most `burst`"""
+
+    def __init__(self, name: str, rate: float, burst: int, max_clients: int = RATE_LIMIT_MAX_CLIENTS):
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self.rejected = 0
+        self._buckets: "OrderedDict[str, tuple[float, float]]" = OrderedDict()
+
+    def check(self, client: str):
+        now = time.monotonic()
+        tokens, updated = self._buckets.pop(client, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        self._buckets[client] = (tokens, now)
+        # clientes inativos ha mais tempo saem primeiro (e voltam com o balde cheio)
+        while len(self._buckets) > self.max_clients:
+            self._buckets.popitem(last=False)
+
+        if not allowed:
+            self.rejected += 1
+            ADMISSION_REJECTED.labels(self.name, "rate_limited").inc()
+            raise Overloaded(429, "Too many requests", (1 - tokens) / self.rate)
+
+    def stats(self) -> Dict[str, int]:
+        return {"clients": len(self._buckets), "rejected": self.rejected}
+
+
+class AdmissionPolicy:
+    def __init__(self, name: str, max_concurrent: int, max_queue: int, rate: float = 0, burst: int = 0):
+        self.name = name
+        self.limiter = ConcurrencyLimiter(name, max_concurrent, max_queue)
+        self.rate_limiter = RateLimiter(name, rate, burst) if rate > 0 else None
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {
+            "concurrency": self.limiter.stats(),
+            "rate_limit": self.rate_limiter.stats() if self.rate_limiter else None,
+        }
+
+
+def client_key(scope) -> str:
+    """Rate limit key: the user of a valid access token, otherwise the client IP"""
+    for name, value in scope["headers"]:
+        if name == b"authorization" and value[:7].lower() == b"bearer ":
+            # token nao verificado nao vale como chave: bastaria trocar o token para ganhar outro balde
+            try:
+                username = decode_access_token(value[7:].decode("latin-1")).get("sub")
+            except InvalidTokenError:
+                username = None
+            if username:
+                return "user:" + username
+            break
+    client = scope.get("client")
+    return "ip:" + (client[0] if client else "unknown")
+
+
+class AdmissionMiddleware:
+    """ASGI middleware that sheds load on expensive endpoints before their body is read"""
+
+    def __init__(self, app, policies: Dict[str, AdmissionPolicy]):
+        self.app = app
+        self.policies = policies
+
+    async def __call__(self, scope, receive, send):
+        policy: Optional[AdmissionPolicy] = self.policies.get(scope["path"]) if scope["type"] == "http" else None
+        if policy is None or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            if policy.rate_limiter:
+                policy.rate_limiter.check(client_key(scope))
+            waited = await policy.limiter.acquire()
+        except Overloaded as e:
+            response = JSONResponse(
+                status_code=e.status_code,
+                content={"detail": e.detail},
+                headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))},
+            )
+            await response(scope, receive, send)
+            return
+
+        ADMISSION_QUEUE_WAIT.labels(policy.name).observe(waited)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            policy.limiter.release()
@@ -3,8 +3,12 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
-#banco sqlite em memoria para testes
-DATABASE_URL = "sqlite:///:memory:"
+# banco persistente: sqlite em arquivo (modo WAL) por padrao, compartilhado entre os workers
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./app.db")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT_SECONDS = float(os.getenv("DB_POOL_TIMEOUT_SECONDS", "30"))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
 
 SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = "HS256"
@@ -20,3 +24,110 @@ AZURE_CV_ENDPOINT = os.getenv('AZURE_CV_ENDPOINT')
 ALLOWED_ORIGIN = os.getenv('ALLOWED_ORIGIN')
 
 WITAI_TOKEN = os.getenv("WITAI_TOKEN")
+WITAI_API_URL = os.getenv("WITAI_API_URL", "https://api.wit.ai/message")
+
+# host alternativo para o gTTS (ex.: servidor falso dos benchmarks); vazio usa o Google Tradutor
+GTTS_BASE_URL = os.getenv("GTTS_BASE_URL")
+
+CACHE_DIR = os.getenv("CACHE_DIR", ".cache")
+
+# cache de traducoes: LRU em memoria + arquivo sqlite compartilhado entre workers
+TRANSLATION_CACHE_PATH = os.getenv("TRANSLATION_CACHE_PATH", os.path.join(CACHE_DIR, "translations.sqlite3"))
+TRANSLATION_CACHE_MAX_ENTRIES = int(os.getenv("TRANSLATION_CACHE_MAX_ENTRIES", "10000"))
+TRANSLATION_CACHE_TTL_SECONDS = int(os.getenv("TRANSLATION_CACHE_TTL_SECONDS", str(30 * 24 * 60 * 60)))
+
+# limites por requisicao da API de traducao do Azure
+TRANSLATE_MAX_ELEMENTS_PER_REQUEST = int(os.getenv("TRANSLATE_MAX_ELEMENTS_PER_REQUEST", "1000"))
+TRANSLATE_MAX_CHARS_PER_REQUEST = int(os.getenv("TRANSLATE_MAX_CHARS_PER_REQUEST", "50000"))
+TRANSLATE_MAX_CONCURRENCY = int(os.getenv("TRANSLATE_MAX_CONCURRENCY", "4"))
+TRANSLATE_TIMEOUT_SECONDS = float(os.getenv("TRANSLATE_TIMEOUT_SECONDS", "10"))
+
+# respostas JSON menores que isso nao compensam o custo de compressao
+RESPONSE_COMPRESSION_MIN_BYTES = int(os.getenv("RESPONSE_COMPRESSION_MIN_BYTES", "1024"))
+RESPONSE_BROTLI_QUALITY = int(os.getenv("RESPONSE_BROTLI_QUALITY", "4"))
+RESPONSE_GZIP_LEVEL = int(os.getenv("RESPONSE_GZIP_LEVEL", "6"))
+
+# cache de audio enderecado por conteudo (hash de texto, idioma e tld)
+AUDIO_CACHE_DIR = os.getenv("AUDIO_CACHE_DIR", os.path.join(CACHE_DIR, "audio"))
+AUDIO_CACHE_MAX_BYTES = int(os.getenv("AUDIO_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+# o diretorio e compartilhado pelos workers: o indice local e refeito a partir do disco com esta frequencia
+AUDIO_CACHE_RESCAN_SECONDS = float(os.getenv("AUDIO_CACHE_RESCAN_SECONDS", "30"))
+
+TTS_MAX_WORKERS = int(os.getenv("TTS_MAX_WORKERS", "8"))
+TTS_STREAM_PREFETCH = int(os.getenv("TTS_STREAM_PREFETCH", "2"))
+TTS_BATCH_MAX_TEXTS = int(os.getenv("TTS_BATCH_MAX_TEXTS", "64"))
+
+# cache de legendas de imagens: sha256 exato + hash perceptual (dHash) para quase-duplicatas
+CAPTION_CACHE_PATH = os.getenv("CAPTION_CACHE_PATH", os.path.join(CACHE_DIR, "captions.sqlite3"))
+CAPTION_CACHE_MAX_ENTRIES = int(os.getenv("CAPTION_CACHE_MAX_ENTRIES", "5000"))
+CAPTION_CACHE_MAX_DISTANCE = int(os.getenv("CAPTION_CACHE_MAX_DISTANCE", "4"))
+
+# pre-processamento das imagens antes do envio ao Azure
+IMAGE_MAX_UPLOAD_BYTES = int(os.getenv("IMAGE_MAX_UPLOAD_BYTES", str(10 * 1024 * 1024)))
+IMAGE_MAX_SIDE = int(os.getenv("IMAGE_MAX_SIDE", "1024"))
+IMAGE_JPEG_QUALITY = int(os.getenv("IMAGE_JPEG_QUALITY", "85"))
+IMAGE_PREPROCESS_WORKERS = int(os.getenv("IMAGE_PREPROCESS_WORKERS", "2"))
+IMAGE_BATCH_MAX_ITEMS = int(os.getenv("IMAGE_BATCH_MAX_ITEMS", "50"))
+IMAGE_BATCH_CONCURRENCY = int(os.getenv("IMAGE_BATCH_CONCURRENCY", "8"))
+
+# tabela de frases extra (JSON) para o reconhecimento local de comandos de voz
+VOICE_PHRASES_PATH = os.getenv("VOICE_PHRASES_PATH")
+VOICE_LOCAL_MATCH_CONFIDENCE = float(os.getenv("VOICE_LOCAL_MATCH_CONFIDENCE", "0.99"))
+
+WITAI_TIMEOUT_SECONDS = float(os.getenv("WITAI_TIMEOUT_SECONDS", "10"))
+WITAI_POOL_SIZE = int(os.getenv("WITAI_POOL_SIZE", "10"))
+WITAI_CACHE_MAX_ENTRIES = int(os.getenv("WITAI_CACHE_MAX_ENTRIES", "2000"))
+WITAI_CACHE_TTL_SECONDS = int(os.getenv("WITAI_CACHE_TTL_SECONDS", str(60 * 60)))
+VOICE_WS_MAX_IN_FLIGHT = int(os.getenv("VOICE_WS_MAX_IN_FLIGHT", "8"))
+
+# custo do bcrypt e executor dedicado para verificacao de senhas
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "32"))
+
+AUTH_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "1024"))
+AUTH_CACHE_TTL_SECONDS = int(os.getenv("AUTH_CACHE_TTL_SECONDS", "60"))
+
+# fila de escrita em lote dos feedbacks (write-behind)
+FEEDBACK_QUEUE_MAX_SIZE = int(os.getenv("FEEDBACK_QUEUE_MAX_SIZE", "10000"))
+FEEDBACK_FLUSH_MAX_ROWS = int(os.getenv("FEEDBACK_FLUSH_MAX_ROWS", "500"))
+FEEDBACK_FLUSH_INTERVAL_SECONDS = float(os.getenv("FEEDBACK_FLUSH_INTERVAL_SECONDS", "0.5"))
+FEEDBACK_BULK_MAX_ITEMS = int(os.getenv("FEEDBACK_BULK_MAX_ITEMS", "500"))
+# lotes com erro (ex.: "database is locked") sao repetidos antes de serem descartados
+FEEDBACK_FLUSH_MAX_RETRIES = int(os.getenv("FEEDBACK_FLUSH_MAX_RETRIES", "5"))
+FEEDBACK_RETRY_BACKOFF_SECONDS = float(os.getenv("FEEDBACK_RETRY_BACKOFF_SECONDS", "0.1"))
+FEEDBACK_RETRY_BACKOFF_MAX_SECONDS = float(os.getenv("FEEDBACK_RETRY_BACKOFF_MAX_SECONDS", "5"))
+
+# listagem e exportacao de feedbacks para administradores
+ADMIN_FEEDBACK_PAGE_SIZE = int(os.getenv("ADMIN_FEEDBACK_PAGE_SIZE", "50"))
+ADMIN_FEEDBACK_PAGE_MAX = int(os.getenv("ADMIN_FEEDBACK_PAGE_MAX", "500"))
+ADMIN_EXPORT_CHUNK_ROWS = int(os.getenv("ADMIN_EXPORT_CHUNK_ROWS", "1000"))
+
+# camada comum de acesso aos upstreams: prazos, novas tentativas e circuit breaker
+UPSTREAM_CONNECT_TIMEOUT_SECONDS = float(os.getenv("UPSTREAM_CONNECT_TIMEOUT_SECONDS", "3"))
+UPSTREAM_MAX_RETRIES = int(os.getenv("UPSTREAM_MAX_RETRIES", "2"))
+UPSTREAM_BACKOFF_BASE_SECONDS = float(os.getenv("UPSTREAM_BACKOFF_BASE_SECONDS", "0.2"))
+UPSTREAM_BACKOFF_MAX_SECONDS = float(os.getenv("UPSTREAM_BACKOFF_MAX_SECONDS", "5"))
+UPSTREAM_BREAKER_FAILURES = int(os.getenv("UPSTREAM_BREAKER_FAILURES", "5"))
+UPSTREAM_BREAKER_RESET_SECONDS = float(os.getenv("UPSTREAM_BREAKER_RESET_SECONDS", "30"))
+
+VISION_TIMEOUT_SECONDS = float(os.getenv("VISION_TIMEOUT_SECONDS", "15"))
+VISION_POOL_SIZE = int(os.getenv("VISION_POOL_SIZE", "10"))
+TTS_TIMEOUT_SECONDS = float(os.getenv("TTS_TIMEOUT_SECONDS", "10"))
+
+# controle de admissao por endpoint (por worker): execucoes simultaneas, fila de espera e taxa por cliente
+ADMISSION_MAX_WAIT_SECONDS = float(os.getenv("ADMISSION_MAX_WAIT_SECONDS", "2"))
+ADMISSION_RETRY_AFTER_SECONDS = int(os.getenv("ADMISSION_RETRY_AFTER_SECONDS", "1"))
+RATE_LIMIT_MAX_CLIENTS = int(os.getenv("RATE_LIMIT_MAX_CLIENTS", "10000"))
+IMAGE_ADMISSION_CONCURRENCY = int(os.getenv("IMAGE_ADMISSION_CONCURRENCY", "8"))
+IMAGE_ADMISSION_QUEUE = int(os.getenv("IMAGE_ADMISSION_QUEUE", "16"))
+IMAGE_RATE_PER_SECOND = float(os.getenv("IMAGE_RATE_PER_SECOND", "2"))
+IMAGE_RATE_BURST = int(os.getenv("IMAGE_RATE_BURST", "10"))
+TTS_ADMISSION_CONCURRENCY = int(os.getenv("TTS_ADMISSION_CONCURRENCY", str(TTS_MAX_WORKERS)))
+TTS_ADMISSION_QUEUE = int(os.getenv("TTS_ADMISSION_QUEUE", "32"))
+TTS_RATE_PER_SECOND = float(os.getenv("TTS_RATE_PER_SECOND", "5"))
+TTS_RATE_BURST = int(os.getenv("TTS_RATE_BURST", "20"))
+TRANSLATE_ADMISSION_CONCURRENCY = int(os.getenv("TRANSLATE_ADMISSION_CONCURRENCY", "32"))
+TRANSLATE_ADMISSION_QUEUE = int(os.getenv("TRANSLATE_ADMISSION_QUEUE", "64"))
+TRANSLATE_RATE_PER_SECOND = float(os.getenv("TRANSLATE_RATE_PER_SECOND", "10"))
+TRANSLATE_RATE_BURST = int(os.getenv("TRANSLATE_RATE_BURST", "40"))
@@ -1,14 +1,62 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
-from app.core.config import DATABASE_URL
+from app.core.config import (
+    DATABASE_URL,
+    DB_POOL_SIZE,
+    DB_MAX_OVERFLOW,
+    DB_POOL_TIMEOUT_SECONDS,
+    SQLITE_BUSY_TIMEOUT_MS,
+)
 
-engine = create_engine(DATABASE_URL,connect_args={"check_same_thread": False})
+# drivers assincronos equivalentes aos drivers sincronos da DATABASE_URL
+_ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "mysql": "mysql+aiomysql",
+}
+
+def async_database_url(url: str):
+    parsed = make_url(url)
+    return parsed.set(drivername=_ASYNC_DRIVERS.get(parsed.drivername, parsed.drivername))
+
+def _is_sqlite(url) -> bool:
+    return make_url(url).get_backend_name() == "sqlite"
+
+def _engine_options(url) -> dict:
+    if not _is_sqlite(url):
+        return {"pool_size": DB_POOL_SIZE, "max_overflow": DB_MAX_OVERFLOW,
+                "pool_timeout": DB_POOL_TIMEOUT_SECONDS, "pool_pre_ping": True}
+    if make_url(url).database in (None, "", ":memory:"):
+        # banco em memoria: uma conexao por thread, sem ajuste de pool
+        return {"connect_args": {"check_same_thread": False}}
+    return {"connect_args": {"check_same_thread": False}, "pool_size": DB_POOL_SIZE,
+            "max_overflow": DB_MAX_OVERFLOW, "pool_timeout": DB_POOL_TIMEOUT_SECONDS}
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    # WAL permite leitores concorrentes com um escritor; NORMAL so faz fsync no checkpoint
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
+
+# engine sincrono: criacao das tabelas e dados iniciais
+engine = create_engine(DATABASE_URL, **_engine_options(DATABASE_URL))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# engine assincrono: usado pelas rotas, sem bloquear o event loop
+async_engine = create_async_engine(async_database_url(DATABASE_URL), **_engine_options(DATABASE_URL))
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False, autoflush=False)
+
+if _is_sqlite(DATABASE_URL):
+    event.listen(engine, "connect", _set_sqlite_pragmas)
+    event.listen(async_engine.sync_engine, "connect", _set_sqlite_pragmas)
+
 Base = declarative_base()
 
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
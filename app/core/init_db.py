@@ -1,6 +1,7 @@
 from app.core.database import engine, SessionLocal
 from app.models.user_model import Base as Base_user
 from app.models.feedback_model import Base as Base_feedback
+from sqlalchemy import inspect, text
 from sqlalchemy.orm import Session
 from app.models.user_model import User_model
 from app.auth.jwt_handler import get_password_hash
@@ -8,6 +9,17 @@ from app.auth.jwt_handler import get_password_hash
 def create_tables():
     Base_user.metadata.create_all(bind=engine)
     Base_feedback.metadata.create_all(bind=engine)
+    migrate_feedback_table()
+
+def migrate_feedback_table():
+    # bancos criados antes da coluna created_at; o sqlite nao aceita default nao constante no ALTER
+    columns = {column["name"] for column in inspect(engine).get_columns("feedback")}
+    if "created_at" in columns:
+        return
+    with engine.begin() as connection:
+        connection.execute(text("ALTER TABLE feedback ADD COLUMN created_at DATETIME"))
+        connection.execute(text("UPDATE feedback SET created_at = CURRENT_TIMESTAMP WHERE created_at IS NULL"))
+        connection.execute(text("CREATE INDEX IF NOT EXISTS ix_feedback_created_at_id ON feedback (created_at, id)"))
 
 def seed_initial_data():
     db: Session = SessionLocal()
@@ -22,3 +34,7 @@ def seed_initial_data():
         db.commit()
         db.refresh(user)    
     db.close()
+
+def init_database():
+    create_tables()
+    seed_initial_data()
@@ -0,0 +1,137 @@
+import time
+from typing import Callable, Dict, Tuple
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+# faixas em segundos: das respostas vindas do cache ate chamadas lentas aos upstreams
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+HTTP_REQUESTS = Counter("http_requests_total", "HTTP requests handled", ["method", "route", "status"])
+HTTP_LATENCY = Histogram("http_request_duration_seconds", "HTTP request latency", ["method", "route"],
+                         buckets=LATENCY_BUCKETS)
+HTTP_IN_FLIGHT = Gauge("http_requests_in_flight", "HTTP requests being handled")
+HTTP_REQUEST_BYTES = Counter("http_request_bytes_total", "HTTP request body bytes", ["route"])
+HTTP_RESPONSE_BYTES = Counter("http_response_bytes_total", "HTTP response body bytes", ["route"])
+
+UPSTREAM_REQUESTS = Counter("upstream_requests_total", "Calls to external services", ["upstream", "operation", "outcome"])
+UPSTREAM_LATENCY = Histogram("upstream_request_duration_seconds", "Latency of calls to external services",
+                             ["upstream", "operation"], buckets=LATENCY_BUCKETS)
+UPSTREAM_IN_FLIGHT = Gauge("upstream_requests_in_flight", "Calls to external services in progress", ["upstream"])
+UPSTREAM_BYTES = Counter("upstream_bytes_total", "Payload bytes exchanged with external services", ["upstream", "direction"])
+UPSTREAM_RETRIES = Counter("upstream_retries_total", "Calls to external services that were retried", ["upstream", "operation"])
+UPSTREAM_REJECTED = Counter("upstream_rejected_total", "Calls failed fast by an open circuit breaker", ["upstream"])
+UPSTREAM_BREAKER_OPEN = Gauge("upstream_circuit_open", "1 while the circuit breaker of an upstream is open", ["upstream"])
+
+ADMISSION_QUEUE_WAIT = Histogram("admission_queue_wait_seconds", "Time admitted requests waited for a free slot",
+                                 ["endpoint"], buckets=LATENCY_BUCKETS)
+ADMISSION_QUEUED = Gauge("admission_queued_requests", "Requests waiting for a free slot", ["endpoint"])
+ADMISSION_REJECTED = Counter("admission_rejected_total", "Requests shed by admission control", ["endpoint", "reason"])
+
+TRANSLATION_SEGMENTS_SKIPPED = Counter("translation_segments_skipped_total",
+                                       "Segments returned unchanged without calling the translator", ["reason"])
+TRANSLATION_CHARS_SAVED = Counter("translation_chars_saved_total",
+                                  "Characters not sent to the translator because they need no translation", ["reason"])
+
+
+class track_upstream:
+    """Time a call to an external service (usable with `with` in sync and async code)"""
+
+    __slots__ = ("upstream", "operation", "failed", "_started")
+
+    def __init__(self, upstream: str, operation: str):
+        self.upstream = upstream
+        self.operation = operation
+        # respostas de erro sem excecao (ex.: 503) tambem contam como falha
+        self.failed = False
+
+    def __enter__(self):
+        UPSTREAM_IN_FLIGHT.labels(self.upstream).inc()
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        UPSTREAM_LATENCY.labels(self.upstream, self.operation).observe(time.perf_counter() - self._started)
+        UPSTREAM_IN_FLIGHT.labels(self.upstream).dec()
+        UPSTREAM_REQUESTS.labels(self.upstream, self.operation, "error" if exc_type or self.failed else "ok").inc()
+        return False
+
+
+class CacheStatsCollector:
+    """Reads the caches' own counters at scrape time, so lookups pay nothing extra"""
+
+    def __init__(self):
+        self._sources: Dict[str, Callable[[], Tuple[int, int, int]]] = {}
+
+    def register(self, name: str, stats: Callable[[], Tuple[int, int, int]]):
+        # stats() -> (acertos, falhas, entradas)
+        self._sources[name] = stats
+
+    def register_lru(self, name: str, cache):
+        def stats():
+            values = cache.stats()
+            return values["hits"], values["misses"], values["size"]
+        self.register(name, stats)
+
+    def collect(self):
+        hits = CounterMetricFamily("cache_hits", "Cache hits", labels=["cache"])
+        misses = CounterMetricFamily("cache_misses", "Cache misses", labels=["cache"])
+        entries = GaugeMetricFamily("cache_entries", "Entries currently cached", labels=["cache"])
+        for name, stats in list(self._sources.items()):
+            cache_hits, cache_misses, cache_entries = stats()
+            hits.add_metric([name], cache_hits)
+            misses.add_metric([name], cache_misses)
+            entries.add_metric([name], cache_entries)
+        yield hits
+        yield misses
+        yield entries
+
+
+cache_metrics = CacheStatsCollector()
+REGISTRY.register(cache_metrics)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency, status, size and in-flight count per route template"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code = 500
+        sizes = [0, 0]
+
+        async def counting_receive():
+            message = await receive()
+            if message["type"] == "http.request":
+                sizes[0] += len(message.get("body", b""))
+            return message
+
+        async def counting_send(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                sizes[1] += len(message.get("body", b""))
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, counting_receive, counting_send)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            # o template da rota (ex.: /api/v1/admin/feedback) evita uma serie por URL
+            route = scope.get("route")
+            route_path = getattr(route, "path", "unmatched")
+            HTTP_LATENCY.labels(scope["method"], route_path).observe(time.perf_counter() - started)
+            HTTP_REQUESTS.labels(scope["method"], route_path, str(status_code)).inc()
+            HTTP_REQUEST_BYTES.labels(route_path).inc(sizes[0])
+            HTTP_RESPONSE_BYTES.labels(route_path).inc(sizes[1])
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
@@ -0,0 +1,43 @@
+from typing import Dict
+from fastapi import HTTPException, status
+from fastapi.responses import JSONResponse
+
+# cabecalhos e delimitadores do multipart alem do proprio arquivo
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+
+class BodySizeLimitMiddleware:
+    """ASGI middleware enforcing a per-path maximum request body size while it is received"""
+
+    def __init__(self, app, limits: Dict[str, int]):
+        self.app = app
+        self.limits = limits
+
+    async def __call__(self, scope, receive, send):
+        max_bytes = self.limits.get(scope["path"]) if scope["type"] == "http" else None
+        if max_bytes is None:
+            await self.app(scope, receive, send)
+            return
+
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > max_bytes:
+            # recusa antes de ler qualquer parte do corpo
+            response = JSONResponse(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                                    content={"detail": "Request body too large"})
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                # sem Content-Length (chunked) ou com valor falso: interrompe o parser do corpo
+                if received > max_bytes:
+                    raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                                        detail="Request body too large")
+            return message
+
+        await self.app(scope, limited_receive, send)
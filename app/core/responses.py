@@ -0,0 +1,44 @@
+import gzip
+from typing import Any
+import brotli
+from fastapi import Request, Response
+from fastapi.responses import ORJSONResponse
+from app.core.config import RESPONSE_COMPRESSION_MIN_BYTES, RESPONSE_BROTLI_QUALITY, RESPONSE_GZIP_LEVEL
+
+
+def accepted_encodings(header: str) -> set:
+    """Content codings from an Accept-Encoding header, without the ones refused with q=0"""
+    encodings = set()
+    for item in header.lower().split(","):
+        coding, _, params = item.partition(";")
+        quality = params.strip()
+        if quality.startswith("q="):
+            try:
+                if float(quality[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        if coding.strip():
+            encodings.add(coding.strip())
+    return encodings
+
+
+def compressed_json(request: Request, content: Any, min_bytes: int = RESPONSE_COMPRESSION_MIN_BYTES) -> Response:
+    """Serialize `content` with orjson, compressing it with brotli or gzip when the client accepts it"""
+    response = ORJSONResponse(content)
+    response.headers["Vary"] = "Accept-Encoding"
+    if len(response.body) < min_bytes:
+        return response
+
+    accepted = accepted_encodings(request.headers.get("accept-encoding", ""))
+    if "br" in accepted:
+        body, encoding = brotli.compress(response.body, quality=RESPONSE_BROTLI_QUALITY), "br"
+    elif "gzip" in accepted:
+        body, encoding = gzip.compress(response.body, compresslevel=RESPONSE_GZIP_LEVEL), "gzip"
+    else:
+        return response
+
+    response.body = body
+    response.headers["Content-Encoding"] = encoding
+    response.headers["Content-Length"] = str(len(body))
+    return response
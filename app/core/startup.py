@@ -0,0 +1,62 @@
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class StartupState:
+    """Import, startup and warm-up timings of this worker, reported by the readiness probe"""
+
+    def __init__(self):
+        self.import_seconds: Optional[float] = None
+        self.startup_seconds: Optional[float] = None
+        self.warmup_seconds: Dict[str, float] = {}
+        self.warmup_errors: Dict[str, str] = {}
+        self.ready = False
+        self._task: Optional[asyncio.Task] = None
+
+    def start_warmup(self, steps: List[Tuple[str, Callable[[], Any]]]):
+        self.ready = False
+        self._task = asyncio.create_task(self._warm_up(steps))
+
+    async def _warm_up(self, steps: List[Tuple[str, Callable[[], Any]]]):
+        started = time.perf_counter()
+        for name, step in steps:
+            step_started = time.perf_counter()
+            try:
+                if asyncio.iscoroutinefunction(step):
+                    await step()
+                else:
+                    await asyncio.to_thread(step)
+            except Exception as e:
+                # um upstream mal configurado nao impede o worker de atender as outras rotas
+                self.warmup_errors[name] = str(e)
+                logger.warning(f"Warm-up step {name} failed: {e}")
+            self.warmup_seconds[name] = time.perf_counter() - step_started
+        self.ready = True
+        logger.info(f"Worker ready: import {self.import_seconds or 0:.3f}s, startup {self.startup_seconds or 0:.3f}s, "
+                    f"warm-up {time.perf_counter() - started:.3f}s")
+
+    async def stop(self):
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        self.ready = False
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "status": "ready" if self.ready else "starting",
+            "import_seconds": self.import_seconds,
+            "startup_seconds": self.startup_seconds,
+            "warmup_seconds": self.warmup_seconds,
+            "warmup_errors": self.warmup_errors,
+        }
+
+
+startup_state = StartupState()
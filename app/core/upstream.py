@@ -0,0 +1,261 @@
+import asyncio
+import email.utils
+import itertools
+import random
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+import httpx
+from app.core.config import (
+    UPSTREAM_CONNECT_TIMEOUT_SECONDS,
+    UPSTREAM_MAX_RETRIES,
+    UPSTREAM_BACKOFF_BASE_SECONDS,
+    UPSTREAM_BACKOFF_MAX_SECONDS,
+    UPSTREAM_BREAKER_FAILURES,
+    UPSTREAM_BREAKER_RESET_SECONDS,
+)
+from app.core.metrics import UPSTREAM_BREAKER_OPEN, UPSTREAM_BYTES, UPSTREAM_REJECTED, UPSTREAM_RETRIES, track_upstream
+
+# falhas transitorias: vale tentar de novo e contam para o circuit breaker
+RETRY_STATUSES = {408, 429, 500, 502, 503, 504}
+
+# classify(resultado, erro) -> (falha transitoria?, segundos pedidos no Retry-After)
+Classifier = Callable[[Any, Optional[BaseException]], Tuple[bool, Optional[float]]]
+
+
+class UpstreamUnavailable(Exception):
+    """Raised without calling the upstream while its circuit breaker is open"""
+
+    def __init__(self, upstream: str, retry_after: float):
+        super().__init__(f"{upstream} is temporarily unavailable")
+        self.upstream = upstream
+        self.retry_after = retry_after
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        moment = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, moment.timestamp() - time.time())
+
+
+def classify_http(response: Optional[httpx.Response], error: Optional[BaseException]) -> Tuple[bool, Optional[float]]:
+    if error is not None:
+        return isinstance(error, httpx.TransportError), None
+    if response.status_code in RETRY_STATUSES:
+        return True, parse_retry_after(response.headers.get("Retry-After"))
+    return False, None
+
+
+class CircuitBreaker:
+    """Opens after consecutive failed calls and lets a single probe through once `reset_timeout` has passed"""
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self._open_until: Optional[float] = None
+        # identifica a chamada de teste do estado meio aberto; so ela pode fechar ou reabrir o circuito por isso
+        self._probe: Optional[int] = None
+        self._probe_ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self._open_until is None:
+            return "closed"
+        return "open" if time.monotonic() < self._open_until else "half_open"
+
+    def before_call(self) -> Optional[int]:
+        """Admit a call, returning its probe id when it is the half-open test call"""
+        with self._lock:
+            if self._open_until is None:
+                return None
+            remaining = self._open_until - time.monotonic()
+            if remaining > 0 or self._probe is not None:
+                UPSTREAM_REJECTED.labels(self.name).inc()
+                raise UpstreamUnavailable(self.name, max(remaining, 1.0))
+            # meio aberto: so esta chamada testa se o upstream voltou
+            self._probe = next(self._probe_ids)
+            return self._probe
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            # qualquer sucesso mostra que o upstream voltou, mesmo de uma chamada anterior a abertura
+            self._probe = None
+            if self._open_until is not None:
+                self._open_until = None
+                UPSTREAM_BREAKER_OPEN.labels(self.name).set(0)
+
+    def record_failure(self, open_for: Optional[float] = None, probe: Optional[int] = None):
+        with self._lock:
+            self.failures += 1
+            is_probe = probe is not None and probe == self._probe
+            if is_probe:
+                self._probe = None
+            elif self._open_until is not None and open_for is None:
+                # chamada iniciada antes da abertura: nao fala pela chamada de teste em andamento
+                return
+            if open_for is not None or is_probe or self.failures >= self.failure_threshold:
+                open_until = time.monotonic() + max(open_for or 0.0, self.reset_timeout)
+                self._open_until = max(open_until, self._open_until or 0.0)
+                UPSTREAM_BREAKER_OPEN.labels(self.name).set(1)
+
+    def release(self, probe: Optional[int]):
+        # chamada de teste cancelada ou com erro que nao diz nada sobre a saude do upstream
+        if probe is None:
+            return
+        with self._lock:
+            if self._probe == probe:
+                self._probe = None
+
+
+class Upstream:
+    """One external service: pooled keep-alive connections, connect/read deadlines,
+    retries with jittered backoff that honor Retry-After, and a circuit breaker"""
+
+    def __init__(self, name: str, max_connections: int, read_timeout: float,
+                 connect_timeout: float = UPSTREAM_CONNECT_TIMEOUT_SECONDS,
+                 max_retries: int = UPSTREAM_MAX_RETRIES,
+                 backoff_base: float = UPSTREAM_BACKOFF_BASE_SECONDS,
+                 backoff_max: float = UPSTREAM_BACKOFF_MAX_SECONDS,
+                 breaker_failures: int = UPSTREAM_BREAKER_FAILURES,
+                 breaker_reset: float = UPSTREAM_BREAKER_RESET_SECONDS,
+                 headers: Optional[Dict[str, str]] = None,
+                 classify: Classifier = classify_http):
+        self.name = name
+        self.max_connections = max_connections
+        self.read_timeout = read_timeout
+        self.connect_timeout = connect_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.headers = headers or {}
+        self.classify = classify
+        self.breaker = CircuitBreaker(name, breaker_failures, breaker_reset)
+        self._async_client: Optional[httpx.AsyncClient] = None
+        self._sync_client: Optional[httpx.Client] = None
+
+    def _client_options(self) -> Dict[str, Any]:
+        return {
+            "headers": self.headers,
+            "timeout": httpx.Timeout(self.read_timeout, connect=self.connect_timeout),
+            "limits": httpx.Limits(max_connections=self.max_connections,
+                                   max_keepalive_connections=self.max_connections),
+        }
+
+    @property
+    def async_client(self) -> httpx.AsyncClient:
+        if self._async_client is None or self._async_client.is_closed:
+            self._async_client = httpx.AsyncClient(**self._client_options())
+        return self._async_client
+
+    @property
+    def sync_client(self) -> httpx.Client:
+        if self._sync_client is None or self._sync_client.is_closed:
+            self._sync_client = httpx.Client(**self._client_options())
+        return self._sync_client
+
+    async def aclose(self):
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+        if self._sync_client is not None:
+            self._sync_client.close()
+            self._sync_client = None
+
+    def record_sent(self, size: int):
+        UPSTREAM_BYTES.labels(self.name, "sent").inc(size)
+
+    def record_received(self, size: int):
+        UPSTREAM_BYTES.labels(self.name, "received").inc(size)
+
+    def _attempt(self, operation: str, result: Any, error: Optional[BaseException],
+                 attempt: int, probe: Optional[int]) -> Tuple[bool, Optional[float]]:
+        """Classify one attempt: (failed, delay before the next one, or None when the call is finished)"""
+        transient, retry_after = self.classify(result, error)
+        if not transient:
+            if error is None:
+                self.breaker.record_success()
+            return error is not None, None
+        if attempt < self.max_retries and (retry_after is None or retry_after <= self.backoff_max):
+            UPSTREAM_RETRIES.labels(self.name, operation).inc()
+            if retry_after is not None:
+                return True, retry_after
+            # "full jitter": espalha as novas tentativas de varios workers no tempo
+            return True, random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        # Retry-After longo: falha rapido e mantem o circuito aberto ate la
+        long_pause = retry_after if retry_after is not None and retry_after > self.backoff_max else None
+        self.breaker.record_failure(open_for=long_pause, probe=probe)
+        return True, None
+
+    async def call(self, operation: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Run `fn` (one attempt against the upstream) under the retry policy and circuit breaker"""
+        probe = self.breaker.before_call()
+        try:
+            attempt = 0
+            while True:
+                with track_upstream(self.name, operation) as tracked:
+                    try:
+                        result, error = await fn(), None
+                    except Exception as e:
+                        result, error = None, e
+                    tracked.failed, delay = self._attempt(operation, result, error, attempt, probe)
+                if delay is None:
+                    if error is not None:
+                        raise error
+                    return result
+                attempt += 1
+                await asyncio.sleep(delay)
+        finally:
+            self.breaker.release(probe)
+
+    def call_sync(self, operation: str, fn: Callable[[], Any]) -> Any:
+        """Blocking variant of `call`, for code running in worker threads"""
+        probe = self.breaker.before_call()
+        try:
+            attempt = 0
+            while True:
+                with track_upstream(self.name, operation) as tracked:
+                    try:
+                        result, error = fn(), None
+                    except Exception as e:
+                        result, error = None, e
+                    tracked.failed, delay = self._attempt(operation, result, error, attempt, probe)
+                if delay is None:
+                    if error is not None:
+                        raise error
+                    return result
+                attempt += 1
+                time.sleep(delay)
+        finally:
+            self.breaker.release(probe)
+
+    async def request(self, method: str, url: str, operation: str, **kwargs) -> httpx.Response:
+        async def send():
+            response = await self.async_client.request(method, url, **kwargs)
+            self.record_sent(len(response.request.content))
+            self.record_received(len(response.content))
+            return response
+        return await self.call(operation, send)
+
+    def request_sync(self, method: str, url: str, operation: str, **kwargs) -> httpx.Response:
+        def send():
+            response = self.sync_client.request(method, url, **kwargs)
+            self.record_sent(len(response.request.content))
+            self.record_received(len(response.content))
+            return response
+        return self.call_sync(operation, send)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"state": self.breaker.state, "consecutive_failures": self.breaker.failures}
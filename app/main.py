@@ -1,14 +1,113 @@
-from fastapi import FastAPI
+import time
+_import_started = time.perf_counter()
+
+import asyncio
+import math
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from sqlalchemy import text
 from app.api.auth_routes import router as auth_router
-from app.core.init_db import create_tables,seed_initial_data
+from app.api.admin_routes import router as admin_router
+from app.api.health_routes import router as health_router, metrics_router
+from app.core.init_db import init_database
+from app.core.database import async_engine
+from app.core.startup import startup_state
+from app.core.metrics import MetricsMiddleware
+from app.core.admission import AdmissionMiddleware, AdmissionPolicy
+from app.core.request_limits import BodySizeLimitMiddleware, MULTIPART_OVERHEAD_BYTES
+from app.core.upstream import UpstreamUnavailable
 from app.api.routes import router
 from fastapi.middleware.cors import CORSMiddleware
-from app.core.config import ALLOWED_ORIGIN
+from app.core.config import (
+    ALLOWED_ORIGIN,
+    IMAGE_MAX_UPLOAD_BYTES,
+    IMAGE_BATCH_MAX_ITEMS,
+    IMAGE_ADMISSION_CONCURRENCY,
+    IMAGE_ADMISSION_QUEUE,
+    IMAGE_RATE_PER_SECOND,
+    IMAGE_RATE_BURST,
+    TTS_ADMISSION_CONCURRENCY,
+    TTS_ADMISSION_QUEUE,
+    TTS_RATE_PER_SECOND,
+    TTS_RATE_BURST,
+    TRANSLATE_ADMISSION_CONCURRENCY,
+    TRANSLATE_ADMISSION_QUEUE,
+    TRANSLATE_RATE_PER_SECOND,
+    TRANSLATE_RATE_BURST,
+)
+from app.services.translate_service import get_client as get_translation_client, close_client as close_translation_client
+from app.services.image_preprocessing import shutdown_pool as shutdown_image_pool
+from app.services.image_description import get_client as get_image_client, close_client as close_image_client
+from app.services.wit_nlu_service import get_wit_nlu_service, close_service as close_wit_nlu_service
+from app.services.feedback_writer import feedback_writer
+from app.services.segment_filter import STATS_HEADERS
+
+async def ping_database():
+    async with async_engine.connect() as connection:
+        await connection.execute(text("SELECT 1"))
+
+# aquecimento depois que o worker ja aceita conexoes; /health/ready responde 503 ate terminar
+WARMUP_STEPS = [
+    ("database", ping_database),
+    ("translation_client", get_translation_client),
+    ("image_client", get_image_client),
+    ("voice_service", get_wit_nlu_service),
+]
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    started = time.perf_counter()
+    # tabelas e usuario inicial (hash bcrypt) fora do event loop e fora do import
+    await asyncio.to_thread(init_database)
+    feedback_writer.start()
+    startup_state.startup_seconds = time.perf_counter() - started
+    startup_state.start_warmup(WARMUP_STEPS)
+    yield
+    await startup_state.stop()
+    await feedback_writer.stop()
+    await close_translation_client()
+    await close_image_client()
+    await close_wit_nlu_service()
+    shutdown_image_pool()
+
+app = FastAPI(lifespan=lifespan)
+
+@app.exception_handler(UpstreamUnavailable)
+async def upstream_unavailable_handler(request: Request, exc: UpstreamUnavailable):
+    # circuito aberto: responde na hora em vez de prender o worker esperando o upstream
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(math.ceil(exc.retry_after))},
+    )
 
-app = FastAPI()
+image_admission = AdmissionPolicy("describe_image", IMAGE_ADMISSION_CONCURRENCY, IMAGE_ADMISSION_QUEUE,
+                                  IMAGE_RATE_PER_SECOND, IMAGE_RATE_BURST)
+tts_admission = AdmissionPolicy("convert_audio", TTS_ADMISSION_CONCURRENCY, TTS_ADMISSION_QUEUE,
+                                TTS_RATE_PER_SECOND, TTS_RATE_BURST)
+translate_admission = AdmissionPolicy("translate", TRANSLATE_ADMISSION_CONCURRENCY, TRANSLATE_ADMISSION_QUEUE,
+                                      TRANSLATE_RATE_PER_SECOND, TRANSLATE_RATE_BURST)
 
-create_tables()
-seed_initial_data()
+# endpoints caros: limite por caminho, variantes em lote e streaming dividem o mesmo limite
+admission_policies = {
+    "/api/v1/describe-image/": image_admission,
+    "/api/v1/describe-image/batch/": image_admission,
+    "/api/v1/convert-audio/": tts_admission,
+    "/api/v1/convert-audio/stream/": tts_admission,
+    "/api/v1/convert-audio/batch/": tts_admission,
+    "/api/v1/translate/": translate_admission,
+    "/api/v1/translate/stream": translate_admission,
+}
+
+# mais interno: as respostas 503/429 ainda passam pelo CORS e pelas metricas
+app.add_middleware(AdmissionMiddleware, policies=admission_policies)
+
+# uploads limitados enquanto chegam, antes do parser do multipart gravar o corpo todo
+app.add_middleware(BodySizeLimitMiddleware, limits={
+    "/api/v1/describe-image/": IMAGE_MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES,
+    "/api/v1/describe-image/batch/": IMAGE_BATCH_MAX_ITEMS * IMAGE_MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES,
+})
 
 origins = [ALLOWED_ORIGIN]
 
@@ -17,9 +116,22 @@ app.add_middleware(
         allow_origins=origins,
         allow_credentials=True,
         allow_methods=["*"],
-        allow_headers=["*"]
+        allow_headers=["*"],
+        # estatisticas do filtro de segmentos, lidas pela extensao
+        expose_headers=list(STATS_HEADERS)
 )
 
 app.include_router(auth_router, prefix="/auth", tags=["auth"])
 
 app.include_router(router,prefix="/api/v1", tags=["api"])
+
+app.include_router(admin_router, prefix="/api/v1/admin", tags=["admin"])
+
+app.include_router(health_router, prefix="/health", tags=["health"])
+
+app.include_router(metrics_router)
+
+# mais externo: mede tambem o tempo gasto no CORS
+app.add_middleware(MetricsMiddleware)
+
+startup_state.import_seconds = time.perf_counter() - _import_started
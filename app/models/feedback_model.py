@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer
+from sqlalchemy import Column, String, Integer, DateTime, Index, func
 from app.core.database import Base
 
 class Feedback_model(Base):
@@ -7,3 +7,7 @@ class Feedback_model(Base):
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, nullable=False)
     message = Column(String, nullable=False)
+    # horario UTC de recebimento (sem fuso, como o sqlite armazena)
+    created_at = Column(DateTime, nullable=False, server_default=func.current_timestamp())
+
+    __table_args__ = (Index("ix_feedback_created_at_id", "created_at", "id"),)
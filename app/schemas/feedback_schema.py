@@ -1,5 +1,18 @@
+from datetime import datetime
 from pydantic import BaseModel
+from typing import List, Optional
 
 class Feedback_schema(BaseModel):
     title: str
     message: str
+
+class FeedbackBulkRequest(BaseModel):
+    feedbacks: List[Feedback_schema]
+
+class FeedbackRecord(Feedback_schema):
+    id: int
+    created_at: datetime
+
+class FeedbackPage(BaseModel):
+    items: List[FeedbackRecord]
+    next_cursor: Optional[int] = None
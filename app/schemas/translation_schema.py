@@ -1,7 +1,10 @@
 from pydantic import BaseModel
-from typing import List
+from typing import List, Literal, Optional
 
 class Translation_schema(BaseModel):
-    from_language : str
+    from_language : Optional[str] = None
     text_list : List[str] 
-    to_language : str
\ No newline at end of file
+    to_language : str
+    # "map": {texto original: traducao}; "compact": lista alinhada por indice com text_list
+    format : Literal["map", "compact"] = "map"
+    include_detected_language : bool = False
@@ -0,0 +1,7 @@
+from pydantic import BaseModel
+from typing import List
+
+class TextToSpeechBatchRequest(BaseModel):
+    texts: List[str]
+    lang: str = "pt"
+    tld: str = "com.br"
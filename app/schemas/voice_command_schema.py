@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Optional, Union
 
 class VoiceCommand(BaseModel):
     intent: str
@@ -9,4 +9,6 @@ class VoiceCommand(BaseModel):
 
 class VoiceCommandRequest(BaseModel):
     text: str
-    
\ No newline at end of file
+class VoiceCommandMessage(BaseModel):
+    id: Union[int, str]
+    text: str
@@ -0,0 +1,145 @@
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import BinaryIO, Callable, Dict, Optional
+from app.core.config import AUDIO_CACHE_DIR, AUDIO_CACHE_MAX_BYTES, AUDIO_CACHE_RESCAN_SECONDS
+from app.core.metrics import cache_metrics
+
+
+# a eviccao libera ate esta fracao do limite, para nao refazer o indice a cada novo arquivo
+_EVICT_TO = 0.9
+
+
+class AudioCache:
+    """Content-addressed MP3 store on local disk with size-bounded LRU eviction, shared by all workers"""
+
+    def __init__(self, directory: str, max_bytes: int, rescan_interval: float = AUDIO_CACHE_RESCAN_SECONDS):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.rescan_interval = rescan_interval
+        self.hits = 0
+        self.misses = 0
+        self._index: Optional["OrderedDict[str, int]"] = None
+        self._total_bytes = 0
+        self._scanned_at = 0.0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(text: str, lang: str, tld: str) -> str:
+        return hashlib.sha256("\0".join((text, lang, tld)).encode("utf-8")).hexdigest()
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.mp3")
+
+    def _load_index(self, rescan: bool = False):
+        # o indice e reconstruido a partir do disco, do acesso mais antigo para o mais recente;
+        # o mtime e atualizado a cada acerto, entao a ordem inclui os acessos dos outros workers
+        stale = time.monotonic() - self._scanned_at > self.rescan_interval
+        if self._index is not None and not rescan and not stale:
+            return self._index
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith(".mp3"):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(root, name))
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, name[:-4], stat.st_size))
+        entries.sort()
+        self._index = OrderedDict((key, size) for _, key, size in entries)
+        self._total_bytes = sum(self._index.values())
+        self._scanned_at = time.monotonic()
+        return self._index
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached file path for `key`, marking it as recently used"""
+        path = self.path_for(key)
+        with self._lock:
+            index = self._load_index()
+            try:
+                os.utime(path)
+            except FileNotFoundError:
+                # pode ter sido removido por outro worker
+                self._total_bytes -= index.pop(key, 0)
+                self.misses += 1
+                return None
+            if key not in index:
+                index[key] = os.path.getsize(path)
+                self._total_bytes += index[key]
+            index.move_to_end(key)
+            self.hits += 1
+            return path
+
+    def open(self, key: str) -> Optional[BinaryIO]:
+        """Open the cached audio for `key`; the open file stays readable even if another worker evicts it"""
+        path = self.get(key)
+        if path is None:
+            return None
+        try:
+            return open(path, "rb")
+        except FileNotFoundError:
+            # removido por outro worker entre o acerto e a abertura
+            with self._lock:
+                self._total_bytes -= self._index.pop(key, 0)
+            return None
+
+    def put(self, key: str, write: Callable[[BinaryIO], None]) -> str:
+        """Store the audio produced by `write` under `key` and return its path"""
+        path = self.path_for(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as fp:
+                write(fp)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+        size = os.path.getsize(path)
+        with self._lock:
+            index = self._load_index()
+            self._total_bytes += size - index.pop(key, 0)
+            index[key] = size
+            if self._total_bytes > self.max_bytes:
+                # outros workers tambem gravam e acessam: o total e a ordem vem do disco antes de remover
+                self._load_index(rescan=True)
+                self._evict(keep=key)
+        return path
+
+    def _evict(self, keep: str):
+        index = self._index
+        if self._total_bytes <= self.max_bytes:
+            return
+        while self._total_bytes > self.max_bytes * _EVICT_TO and len(index) > 1:
+            key, size = next(iter(index.items()))
+            if key == keep:
+                break
+            del index[key]
+            self._total_bytes -= size
+            try:
+                os.remove(self.path_for(key))
+            except FileNotFoundError:
+                pass
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._index or ()),
+            "bytes": self._total_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+audio_cache = AudioCache(directory=AUDIO_CACHE_DIR, max_bytes=AUDIO_CACHE_MAX_BYTES)
+
+def _cache_metrics():
+    stats = audio_cache.stats()
+    return stats["hits"], stats["misses"], stats["entries"]
+
+cache_metrics.register("audio", _cache_metrics)
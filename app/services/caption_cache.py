@@ -0,0 +1,237 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from io import BytesIO
+from typing import Dict, List, Optional, Set, Tuple
+from PIL import Image, UnidentifiedImageError
+from app.core.cache import LRUCache, connect_sqlite
+from app.core.config import CAPTION_CACHE_PATH, CAPTION_CACHE_MAX_ENTRIES, CAPTION_CACHE_MAX_DISTANCE
+from app.core.metrics import cache_metrics
+
+_HASH_BITS = 64
+# acima disso o indice por faixas deixa de garantir todos os vizinhos e a busca vira linear
+_MAX_BANDS = 16
+
+
+def dhash(image_bytes: bytes) -> Optional[int]:
+    """64-bit difference hash: robust to resizing and re-encoding of the same image"""
+    try:
+        with Image.open(BytesIO(image_bytes)) as image:
+            image.draft("L", (64, 64))
+            pixels = image.convert("L").resize((9, 8), Image.Resampling.BILINEAR).tobytes()
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError, ValueError):
+        return None
+
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            value = (value << 1) | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+    return value
+
+
+def _band_ranges(max_distance: int) -> List[Tuple[int, int]]:
+    # pelo principio da casa dos pombos, hashes a distancia <= d coincidem em ao menos uma de d+1 faixas
+    bands = max_distance + 1
+    width = _HASH_BITS // bands
+    return [(i * width, _HASH_BITS if i == bands - 1 else (i + 1) * width) for i in range(bands)]
+
+
+class CaptionCache:
+    """Persistent image caption cache keyed by SHA-256, with a perceptual-hash index for near duplicates"""
+
+    def __init__(self, path: str, max_entries: int, max_distance: int):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_distance = max_distance
+        self.exact_hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self._bands = _band_ranges(max_distance) if 0 <= max_distance < _MAX_BANDS else None
+        self._entries: Optional["OrderedDict[str, Tuple[Optional[int], str]]"] = None
+        self._band_index: Dict[Tuple[int, int], Set[str]] = {}
+        self._dhashes = LRUCache(max_size=256)
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        if self._conn is None:
+            conn = connect_sqlite(self.path)
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS captions ("
+                " sha256 TEXT PRIMARY KEY,"
+                " dhash TEXT,"
+                " caption TEXT NOT NULL,"
+                " last_used REAL NOT NULL"
+                ")"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS captions_last_used ON captions (last_used)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _load(self):
+        if self._entries is None:
+            rows = self._connection().execute(
+                "SELECT sha256, dhash, caption FROM captions ORDER BY last_used DESC LIMIT ?",
+                (self.max_entries,),
+            ).fetchall()
+            self._entries = OrderedDict()
+            for sha, hash_hex, caption in reversed(rows):
+                self._remember(sha, int(hash_hex, 16) if hash_hex else None, caption)
+        return self._entries
+
+    def _band_keys(self, value: int):
+        for band, (start, end) in enumerate(self._bands):
+            yield band, (value >> start) & ((1 << (end - start)) - 1)
+
+    def _remember(self, sha: str, perceptual_hash: Optional[int], caption: str):
+        self._entries[sha] = (perceptual_hash, caption)
+        self._entries.move_to_end(sha)
+        if perceptual_hash is not None and self._bands:
+            for band_key in self._band_keys(perceptual_hash):
+                self._band_index.setdefault(band_key, set()).add(sha)
+
+    def _forget(self, sha: str):
+        perceptual_hash, _ = self._entries.pop(sha)
+        if perceptual_hash is not None and self._bands:
+            for band_key in self._band_keys(perceptual_hash):
+                shas = self._band_index.get(band_key)
+                if shas:
+                    shas.discard(sha)
+                    if not shas:
+                        del self._band_index[band_key]
+
+    def _perceptual_hash(self, sha: str, image_bytes: bytes) -> Optional[int]:
+        value = self._dhashes.get(sha)
+        if value is None:
+            value = dhash(image_bytes)
+            self._dhashes.set(sha, value)
+        return value
+
+    def _nearest(self, perceptual_hash: int) -> Optional[str]:
+        if self._bands:
+            candidates = set()
+            for band_key in self._band_keys(perceptual_hash):
+                candidates |= self._band_index.get(band_key, set())
+        else:
+            candidates = self._entries.keys()
+
+        best, best_distance = None, self.max_distance + 1
+        for sha in candidates:
+            other = self._entries[sha][0]
+            if other is None:
+                continue
+            distance = (perceptual_hash ^ other).bit_count()
+            if distance < best_distance:
+                best, best_distance = sha, distance
+        return best
+
+    def _exact(self, sha: str) -> Optional[str]:
+        entries = self._load()
+        entry = entries.get(sha)
+        if entry is None:
+            # pode ter sido gravado por outro worker
+            row = self._connection().execute(
+                "SELECT dhash, caption FROM captions WHERE sha256 = ?", (sha,)
+            ).fetchone()
+            if row:
+                entry = (int(row[0], 16) if row[0] else None, row[1])
+        if entry is None:
+            return None
+        self.exact_hits += 1
+        if sha in entries:
+            self._touch(sha)
+        else:
+            self._store(sha, *entry)
+        return entry[1]
+
+    def get_exact(self, image_bytes: bytes) -> Optional[str]:
+        """Return the caption of these exact bytes, if cached, without decoding the image"""
+        sha = hashlib.sha256(image_bytes).hexdigest()
+        with self._lock:
+            # ausencia aqui nao conta como miss: quem chama segue para get() com a imagem processada
+            return self._exact(sha)
+
+    def get(self, image_bytes: bytes) -> Optional[str]:
+        """Return the caption of this image or of a near-duplicate, if cached"""
+        sha = hashlib.sha256(image_bytes).hexdigest()
+        with self._lock:
+            caption = self._exact(sha)
+            if caption is not None:
+                return caption
+
+        perceptual_hash = self._perceptual_hash(sha, image_bytes)
+        if perceptual_hash is None or self.max_distance < 0:
+            self.misses += 1
+            return None
+
+        with self._lock:
+            nearest = self._nearest(perceptual_hash)
+            if nearest is None:
+                self.misses += 1
+                return None
+            self.near_hits += 1
+            caption = self._entries[nearest][1]
+            self._touch(nearest)
+            self._store(sha, perceptual_hash, caption)
+            return caption
+
+    def set(self, image_bytes: bytes, caption: str, perceptual: bool = True) -> None:
+        """Cache `caption` for these bytes; without `perceptual` they only match exact repeats"""
+        sha = hashlib.sha256(image_bytes).hexdigest()
+        perceptual_hash = self._perceptual_hash(sha, image_bytes) if perceptual else None
+        with self._lock:
+            self._load()
+            self._store(sha, perceptual_hash, caption)
+
+    def _touch(self, sha: str):
+        self._entries.move_to_end(sha)
+        conn = self._connection()
+        conn.execute("UPDATE captions SET last_used = ? WHERE sha256 = ?", (time.time(), sha))
+        conn.commit()
+
+    def _store(self, sha: str, perceptual_hash: Optional[int], caption: str):
+        if sha in self._entries:
+            self._forget(sha)
+        self._remember(sha, perceptual_hash, caption)
+        conn = self._connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO captions (sha256, dhash, caption, last_used) VALUES (?, ?, ?, ?)",
+            (sha, format(perceptual_hash, "016x") if perceptual_hash is not None else None, caption, time.time()),
+        )
+
+        evicted = []
+        while len(self._entries) > self.max_entries:
+            evicted.append(next(iter(self._entries)))
+            self._forget(evicted[-1])
+        if evicted:
+            conn.executemany("DELETE FROM captions WHERE sha256 = ?", [(sha,) for sha in evicted])
+            # outros workers tambem gravam no arquivo; o excedente sai pela ordem de uso
+            conn.execute(
+                "DELETE FROM captions WHERE sha256 IN ("
+                " SELECT sha256 FROM captions ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+        conn.commit()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._entries or ()),
+            "exact_hits": self.exact_hits,
+            "near_hits": self.near_hits,
+            "misses": self.misses,
+        }
+
+
+caption_cache = CaptionCache(
+    path=CAPTION_CACHE_PATH,
+    max_entries=CAPTION_CACHE_MAX_ENTRIES,
+    max_distance=CAPTION_CACHE_MAX_DISTANCE,
+)
+
+def _cache_metrics():
+    stats = caption_cache.stats()
+    return stats["exact_hits"] + stats["near_hits"], stats["misses"], stats["entries"]
+
+cache_metrics.register("caption", _cache_metrics)
@@ -0,0 +1,75 @@
+import csv
+import json
+from datetime import datetime, timezone
+from io import StringIO
+from typing import AsyncIterator, List, Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import ADMIN_EXPORT_CHUNK_ROWS
+from app.core.database import AsyncSessionLocal
+from app.models.feedback_model import Feedback_model
+from app.schemas.feedback_schema import FeedbackRecord, FeedbackPage
+
+EXPORT_COLUMNS = ("id", "title", "message", "created_at")
+
+
+def to_utc_naive(moment: Optional[datetime]) -> Optional[datetime]:
+    # created_at e gravado em UTC sem fuso
+    if moment is None or moment.tzinfo is None:
+        return moment
+    return moment.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _filtered(query, since: Optional[datetime], until: Optional[datetime]):
+    if since is not None:
+        query = query.where(Feedback_model.created_at >= to_utc_naive(since))
+    if until is not None:
+        query = query.where(Feedback_model.created_at < to_utc_naive(until))
+    return query
+
+
+async def list_feedback(db: AsyncSession, limit: int, before_id: Optional[int] = None,
+                        since: Optional[datetime] = None, until: Optional[datetime] = None) -> FeedbackPage:
+    """Newest-first page of feedback using the id as keyset cursor"""
+    query = _filtered(select(Feedback_model), since, until)
+    if before_id is not None:
+        query = query.where(Feedback_model.id < before_id)
+    # um item a mais diz se existe proxima pagina sem precisar de COUNT
+    rows = (await db.execute(query.order_by(Feedback_model.id.desc()).limit(limit + 1))).scalars().all()
+    items = [FeedbackRecord.model_validate(row, from_attributes=True) for row in rows[:limit]]
+    return FeedbackPage(items=items, next_cursor=items[-1].id if len(rows) > limit else None)
+
+
+async def _iter_rows(since: Optional[datetime], until: Optional[datetime]) -> AsyncIterator[List[tuple]]:
+    # sessao propria: a da dependencia ja foi fechada quando a resposta comeca a ser enviada
+    query = _filtered(select(*(getattr(Feedback_model, column) for column in EXPORT_COLUMNS)), since, until)
+    query = query.order_by(Feedback_model.id).execution_options(yield_per=ADMIN_EXPORT_CHUNK_ROWS)
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(query)
+        async for partition in result.partitions():
+            yield partition
+
+
+def _format_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+async def export_ndjson(since: Optional[datetime] = None, until: Optional[datetime] = None) -> AsyncIterator[bytes]:
+    async for rows in _iter_rows(since, until):
+        yield "".join(
+            json.dumps(dict(zip(EXPORT_COLUMNS, map(_format_value, row))), ensure_ascii=False) + "\n"
+            for row in rows
+        ).encode("utf-8")
+
+
+async def export_csv(since: Optional[datetime] = None, until: Optional[datetime] = None) -> AsyncIterator[bytes]:
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    async for rows in _iter_rows(since, until):
+        writer.writerows([map(_format_value, row) for row in rows])
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
@@ -1,16 +1,16 @@
-from sqlalchemy.orm import Session
-from app.core.database import SessionLocal
-from app.models.feedback_model import Feedback_model
+from datetime import datetime, timezone
+from typing import List
 from app.schemas.feedback_schema import Feedback_schema
+from app.services.feedback_writer import feedback_writer
 
-def send_feedback(title, message):
-    db: Session = SessionLocal()
-    feedback = Feedback_model(
-            title=title,
-            message=message
-    )
-    db.add(feedback)
-    db.commit()
-    db.refresh(feedback)
-    db.close()
+def _row(title, message):
+    # horario do recebimento, nao da gravacao em lote
+    return {"title": title, "message": message, "created_at": datetime.now(timezone.utc).replace(tzinfo=None)}
+
+async def send_feedback(title, message):
+    await feedback_writer.submit([_row(title, message)])
     return Feedback_schema(title=title, message=message)
+
+async def send_feedback_bulk(feedbacks: List[Feedback_schema]) -> int:
+    await feedback_writer.submit([_row(feedback.title, feedback.message) for feedback in feedbacks])
+    return len(feedbacks)
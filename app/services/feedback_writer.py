@@ -0,0 +1,150 @@
+import asyncio
+import logging
+from typing import Dict, List, Optional
+from fastapi import HTTPException, status
+from sqlalchemy import insert
+from app.core.database import AsyncSessionLocal
+from app.core.config import (
+    FEEDBACK_QUEUE_MAX_SIZE,
+    FEEDBACK_FLUSH_MAX_ROWS,
+    FEEDBACK_FLUSH_INTERVAL_SECONDS,
+    FEEDBACK_FLUSH_MAX_RETRIES,
+    FEEDBACK_RETRY_BACKOFF_SECONDS,
+    FEEDBACK_RETRY_BACKOFF_MAX_SECONDS,
+)
+from app.models.feedback_model import Feedback_model
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class FeedbackWriter:
+    """Write-behind buffer that acknowledges feedback immediately and inserts it in bulk"""
+
+    def __init__(self, max_queue: int, max_rows: int, flush_interval: float,
+                 max_retries: int = FEEDBACK_FLUSH_MAX_RETRIES,
+                 retry_backoff: float = FEEDBACK_RETRY_BACKOFF_SECONDS,
+                 retry_backoff_max: float = FEEDBACK_RETRY_BACKOFF_MAX_SECONDS):
+        self.max_queue = max_queue
+        self.max_rows = max_rows
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.retry_backoff_max = retry_backoff_max
+        self.written = 0
+        self.batches = 0
+        self.retries = 0
+        self.failed = 0
+        self.rejected = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        if not self.running:
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Flush everything still buffered and stop the background writer"""
+        if not self.running:
+            return
+        self._queue.put_nowait(_STOP)
+        await self._task
+        self._task = None
+
+    async def submit(self, rows: List[Dict[str, str]]) -> None:
+        if not self.running:
+            # sem o writer (ex.: fora do lifespan) a escrita e direta
+            await self._insert(rows)
+            return
+        # a fila e ilimitada no asyncio; o limite e aplicado aqui para o lote inteiro
+        if self._queue.qsize() + len(rows) > self.max_queue:
+            self.rejected += len(rows)
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Feedback queue is full",
+                headers={"Retry-After": "1"},
+            )
+        for row in rows:
+            self._queue.put_nowait(row)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            first = await self._queue.get()
+            if first is _STOP:
+                break
+            batch = [first]
+            deadline = loop.time() + self.flush_interval
+            # junta linhas ate o tamanho maximo do lote ou o fim do intervalo
+            while len(batch) < self.max_rows:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    row = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if row is _STOP:
+                    stopping = True
+                    break
+                batch.append(row)
+            await self._flush(batch)
+
+        # drena o que sobrou na fila antes de encerrar
+        remaining = []
+        while not self._queue.empty():
+            row = self._queue.get_nowait()
+            if row is not _STOP:
+                remaining.append(row)
+        for start in range(0, len(remaining), self.max_rows):
+            await self._flush(remaining[start:start + self.max_rows])
+
+    async def _flush(self, batch: List[Dict[str, str]]):
+        # os clientes ja receberam 202: o lote so e descartado depois de esgotar as tentativas
+        for attempt in range(self.max_retries + 1):
+            try:
+                await self._insert(batch)
+                return
+            except Exception:
+                if attempt == self.max_retries:
+                    self.failed += len(batch)
+                    logger.exception(f"Failed to write {len(batch)} feedback rows, dropping them")
+                    return
+                self.retries += 1
+                delay = min(self.retry_backoff * 2 ** attempt, self.retry_backoff_max)
+                logger.warning(f"Failed to write {len(batch)} feedback rows, retrying in {delay:.2f}s", exc_info=True)
+                await asyncio.sleep(delay)
+
+    async def _insert(self, rows: List[Dict[str, str]]):
+        if not rows:
+            return
+        async with AsyncSessionLocal() as db:
+            await db.execute(insert(Feedback_model), rows)
+            await db.commit()
+        self.written += len(rows)
+        self.batches += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "queued": self._queue.qsize() if self.running else 0,
+            "max_queue": self.max_queue,
+            "written": self.written,
+            "batches": self.batches,
+            "retries": self.retries,
+            "failed": self.failed,
+            "rejected": self.rejected,
+        }
+
+
+feedback_writer = FeedbackWriter(
+    max_queue=FEEDBACK_QUEUE_MAX_SIZE,
+    max_rows=FEEDBACK_FLUSH_MAX_ROWS,
+    flush_interval=FEEDBACK_FLUSH_INTERVAL_SECONDS,
+)
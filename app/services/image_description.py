@@ -1,26 +1,139 @@
-from azure.ai.vision.imageanalysis import ImageAnalysisClient
-from azure.ai.vision.imageanalysis.models import VisualFeatures
-from azure.core.credentials import AzureKeyCredential
-from app.core.config import AZURE_CV_KEY, AZURE_CV_ENDPOINT
-
-client = ImageAnalysisClient(
-    endpoint=AZURE_CV_ENDPOINT,
-    credential=AzureKeyCredential(AZURE_CV_KEY)
+import asyncio
+import logging
+from typing import Optional, Tuple
+from app.core.config import (
+    AZURE_CV_KEY,
+    AZURE_CV_ENDPOINT,
+    UPSTREAM_CONNECT_TIMEOUT_SECONDS,
+    VISION_TIMEOUT_SECONDS,
+    VISION_POOL_SIZE,
 )
+from app.core.upstream import RETRY_STATUSES, Upstream, UpstreamUnavailable, parse_retry_after
+from app.services.caption_cache import caption_cache
+
+logger = logging.getLogger(__name__)
+
+def classify_azure_error(result, error: Optional[BaseException]) -> Tuple[bool, Optional[float]]:
+    from azure.core.exceptions import HttpResponseError, ServiceRequestError, ServiceResponseError
+
+    if isinstance(error, (ServiceRequestError, ServiceResponseError)):
+        return True, None
+    if isinstance(error, HttpResponseError) and error.status_code in RETRY_STATUSES:
+        headers = error.response.headers if error.response is not None else {}
+        return True, parse_retry_after(headers.get("Retry-After"))
+    return False, None
+
+# o SDK faz apenas uma tentativa; novas tentativas e circuit breaker ficam na camada comum
+vision = Upstream(
+    "azure_vision",
+    max_connections=VISION_POOL_SIZE,
+    read_timeout=VISION_TIMEOUT_SECONDS,
+    classify=classify_azure_error,
+)
+
+_client = None
+
+def _pooled_transport():
+    import aiohttp
+    from azure.core.pipeline.transport import AioHttpTransport
+
+    class PooledAioHttpTransport(AioHttpTransport):
+        async def open(self):
+            # a sessao precisa do event loop, por isso e criada aqui e nao junto com o cliente
+            if self.session is None and self._session_owner:
+                self.session = aiohttp.ClientSession(
+                    connector=aiohttp.TCPConnector(limit=VISION_POOL_SIZE),
+                    cookie_jar=aiohttp.DummyCookieJar(),
+                    auto_decompress=False,
+                    trust_env=True,
+                )
+            await super().open()
+
+    return PooledAioHttpTransport()
+
+def get_client():
+    """Shared Azure client, built on first use (the SDK is only imported then)"""
+    global _client
+    if _client is None:
+        from azure.ai.vision.imageanalysis.aio import ImageAnalysisClient
+        from azure.core.credentials import AzureKeyCredential
+
+        if not AZURE_CV_KEY or not AZURE_CV_ENDPOINT:
+            raise RuntimeError("AZURE_CV_KEY and AZURE_CV_ENDPOINT must be set")
+        _client = ImageAnalysisClient(
+            endpoint=AZURE_CV_ENDPOINT,
+            credential=AzureKeyCredential(AZURE_CV_KEY),
+            transport=_pooled_transport(),
+            retry_total=0,
+            connection_timeout=UPSTREAM_CONNECT_TIMEOUT_SECONDS,
+            read_timeout=VISION_TIMEOUT_SECONDS,
+        )
+    return _client
+
+async def close_client():
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
+
+def _caption_features():
+    from azure.ai.vision.imageanalysis.models import VisualFeatures
+    return [VisualFeatures.CAPTION]
+
+def _caption_from_result(result) -> dict:
+    if result and result.caption is not None:
+        return {"caption": result.caption.text}
+    else:
+        return {"caption": "no caption"}
+
+async def cached_caption(upload_bytes: bytes) -> Optional[dict]:
+    """Caption of an exact repeat of this upload, found before it is decoded and preprocessed"""
+    caption = await asyncio.to_thread(caption_cache.get_exact, upload_bytes)
+    return {"caption": caption} if caption is not None else None
+
+async def _remember_upload(upload_bytes: Optional[bytes], image_bytes: bytes, caption: str):
+    # o upload original aponta para a mesma legenda, para que a proxima repeticao pule o pre-processamento
+    if upload_bytes is not None and upload_bytes != image_bytes:
+        await asyncio.to_thread(caption_cache.set, upload_bytes, caption, False)
+
+async def analyze_image(image_bytes: bytes, upload_bytes: Optional[bytes] = None) -> dict:
+    cached = await asyncio.to_thread(caption_cache.get, image_bytes)
+    if cached is not None:
+        await _remember_upload(upload_bytes, image_bytes, cached)
+        return {"caption": cached}
 
-def analyze_image(image_bytes: bytes) -> str:
     result = None
     try:
-        result = client.analyze(
+        vision.record_sent(len(image_bytes))
+        result = await vision.call("analyze", lambda: get_client().analyze(
             image_data=image_bytes,
-            visual_features=[VisualFeatures.CAPTION],
+            visual_features=_caption_features(),
             gender_neutral_caption=True
-        )
-    except Exception as e:
-        print(e)
+        ))
+    except UpstreamUnavailable:
+        # circuito aberto: vira 503 com Retry-After no handler global
+        raise
+    except Exception:
+        logger.exception("Error analyzing image")
         return {"caption": "error analyzing image"}
-        
+
     if result and result.caption is not None:
-        return {"caption": result.caption.text}
-    else:
-        return {"caption": "no caption"}
+        await asyncio.to_thread(caption_cache.set, image_bytes, result.caption.text)
+        await _remember_upload(upload_bytes, image_bytes, result.caption.text)
+    return _caption_from_result(result)
+
+async def analyze_image_url(image_url: str) -> dict:
+    result = None
+    try:
+        result = await vision.call("analyze_url", lambda: get_client().analyze_from_url(
+            image_url=image_url,
+            visual_features=_caption_features(),
+            gender_neutral_caption=True
+        ))
+    except UpstreamUnavailable:
+        raise
+    except Exception:
+        logger.exception("Error analyzing image URL %s", image_url)
+        return {"caption": "error analyzing image"}
+
+    return _caption_from_result(result)
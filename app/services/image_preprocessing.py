@@ -0,0 +1,58 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from typing import Optional
+from PIL import Image, ImageOps, UnidentifiedImageError
+from app.core.config import IMAGE_MAX_SIDE, IMAGE_JPEG_QUALITY, IMAGE_PREPROCESS_WORKERS
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+class ImageTooLarge(ValueError):
+    """The image has more pixels than Pillow accepts to decode (decompression bomb)"""
+
+def preprocess_image(image_bytes: bytes, max_side: int = IMAGE_MAX_SIDE, quality: int = IMAGE_JPEG_QUALITY) -> bytes:
+    """Downscale to `max_side`, drop metadata and re-encode as JPEG; keeps the original if it is smaller"""
+    try:
+        with Image.open(BytesIO(image_bytes)) as image:
+            # decodifica JPEGs grandes ja em escala reduzida
+            image.draft("RGB", (max_side, max_side))
+            image = ImageOps.exif_transpose(image)
+            if image.mode in ("RGBA", "LA", "P"):
+                image = image.convert("RGBA")
+                background = Image.new("RGB", image.size, (255, 255, 255))
+                background.paste(image, mask=image.getchannel("A"))
+                image = background
+            elif image.mode != "RGB":
+                image = image.convert("RGB")
+            image.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+
+            output = BytesIO()
+            image.save(output, format="JPEG", quality=quality, optimize=True)
+    except Image.DecompressionBombError as e:
+        raise ImageTooLarge(str(e))
+    except (UnidentifiedImageError, OSError, ValueError):
+        return image_bytes
+
+    processed = output.getvalue()
+    return processed if len(processed) < len(image_bytes) else image_bytes
+
+def get_pool() -> Optional[ProcessPoolExecutor]:
+    global _pool
+    if _pool is None and IMAGE_PREPROCESS_WORKERS > 0:
+        # o pool nasce sob demanda num servidor com varias threads: fork copiaria locks em uso
+        _pool = ProcessPoolExecutor(max_workers=IMAGE_PREPROCESS_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(cancel_futures=True)
+        _pool = None
+
+async def preprocess_image_async(image_bytes: bytes) -> bytes:
+    """Run `preprocess_image` off the event loop, in the process pool when enabled"""
+    pool = get_pool()
+    if pool is None:
+        return await asyncio.to_thread(preprocess_image, image_bytes)
+    return await asyncio.get_running_loop().run_in_executor(pool, preprocess_image, image_bytes)
@@ -0,0 +1,131 @@
+import json
+import logging
+import re
+import unicodedata
+from typing import Any, Dict, List, Optional, Tuple
+from app.schemas.voice_command_schema import VoiceCommand
+from app.core.config import VOICE_PHRASES_PATH, VOICE_LOCAL_MATCH_CONFIDENCE
+
+logger = logging.getLogger(__name__)
+
+_TOKEN = re.compile(r"\w+")
+_END = object()
+
+# comandos mais frequentes; "takes_target" indica que o restante da frase e o alvo
+DEFAULT_PHRASES: List[Dict[str, Any]] = [
+    {"phrase": "voltar", "intent": "go_back", "action": "go_back"},
+    {"phrase": "volta", "intent": "go_back", "action": "go_back"},
+    {"phrase": "voltar pagina", "intent": "go_back", "action": "go_back"},
+    {"phrase": "pagina anterior", "intent": "go_back", "action": "go_back"},
+    {"phrase": "ajuda", "intent": "show_help", "action": "show_help"},
+    {"phrase": "mostrar ajuda", "intent": "show_help", "action": "show_help"},
+    {"phrase": "aumentar zoom", "intent": "zoom", "action": "zoom_in"},
+    {"phrase": "mais zoom", "intent": "zoom", "action": "zoom_in"},
+    {"phrase": "ampliar", "intent": "zoom", "action": "zoom_in"},
+    {"phrase": "diminuir zoom", "intent": "zoom", "action": "zoom_out"},
+    {"phrase": "menos zoom", "intent": "zoom", "action": "zoom_out"},
+    {"phrase": "reduzir zoom", "intent": "zoom", "action": "zoom_out"},
+    {"phrase": "rolar para baixo", "intent": "navigate", "action": "scroll_down"},
+    {"phrase": "rolar pra baixo", "intent": "navigate", "action": "scroll_down"},
+    {"phrase": "descer", "intent": "navigate", "action": "scroll_down"},
+    {"phrase": "rolar para cima", "intent": "navigate", "action": "scroll_up"},
+    {"phrase": "rolar pra cima", "intent": "navigate", "action": "scroll_up"},
+    {"phrase": "subir", "intent": "navigate", "action": "scroll_up"},
+    {"phrase": "rolar para direita", "intent": "navigate", "action": "scroll_right"},
+    {"phrase": "rolar para a direita", "intent": "navigate", "action": "scroll_right"},
+    {"phrase": "rolar para esquerda", "intent": "navigate", "action": "scroll_left"},
+    {"phrase": "rolar para a esquerda", "intent": "navigate", "action": "scroll_left"},
+    {"phrase": "proximo", "intent": "navigate", "action": "navigate_next"},
+    {"phrase": "proximo elemento", "intent": "navigate", "action": "navigate_next"},
+    {"phrase": "anterior", "intent": "navigate", "action": "navigate_previous"},
+    {"phrase": "elemento anterior", "intent": "navigate", "action": "navigate_previous"},
+    {"phrase": "clicar em", "intent": "click", "action": "click", "takes_target": True},
+    {"phrase": "clique em", "intent": "click", "action": "click", "takes_target": True},
+    {"phrase": "ler", "intent": "read", "action": "read", "takes_target": True},
+    {"phrase": "leia", "intent": "read", "action": "read", "takes_target": True},
+    {"phrase": "ir para", "intent": "navigate", "action": "navigate_to", "takes_target": True},
+    {"phrase": "navegar para", "intent": "navigate", "action": "navigate_to", "takes_target": True},
+]
+
+# artigos e preposicoes que nao fazem parte do alvo ("clicar em o botao" -> "botao")
+_TARGET_STOPWORDS = {"o", "a", "os", "as", "no", "na", "nos", "nas", "um", "uma", "em"}
+
+
+def normalize_token(token: str) -> str:
+    decomposed = unicodedata.normalize("NFKD", token.casefold())
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def tokenize(text: str) -> Tuple[List[str], List[str]]:
+    """Split text into its original word tokens and their normalized form (case and accents)"""
+    originals = _TOKEN.findall(text)
+    return originals, [normalize_token(token) for token in originals]
+
+
+def normalize_utterance(text: str) -> str:
+    return " ".join(tokenize(text)[1])
+
+
+class LocalIntentMatcher:
+    """Token trie of known phrases that resolves frequent commands without calling Wit.ai"""
+
+    def __init__(self, phrases: List[Dict[str, Any]], intents: List[str],
+                 entity_intent_roles: Dict[Tuple[str, str], List[str]],
+                 confidence: float = VOICE_LOCAL_MATCH_CONFIDENCE):
+        self.confidence = confidence
+        self._root: Dict[Any, Any] = {}
+
+        # acoes validas: a propria intencao ou um dos papeis das entidades daquela intencao
+        allowed = {intent: {intent} for intent in intents}
+        for (_, intent), roles in entity_intent_roles.items():
+            allowed.setdefault(intent, set()).update(roles)
+
+        for entry in phrases:
+            intent, action = entry["intent"], entry["action"]
+            if action not in allowed.get(intent, ()):
+                raise ValueError(f"Invalid intent/action for phrase '{entry['phrase']}': {intent}/{action}")
+            node = self._root
+            for token in tokenize(entry["phrase"])[1]:
+                node = node.setdefault(token, {})
+            node[_END] = (intent, action, bool(entry.get("takes_target", False)))
+
+    def match(self, text: str) -> Optional[VoiceCommand]:
+        """Return the command for `text` when it matches a known phrase, otherwise None"""
+        originals, tokens = tokenize(text)
+        node, best = self._root, None
+        for position, token in enumerate(tokens):
+            node = node.get(token)
+            if node is None:
+                break
+            if _END in node:
+                best = (position + 1, node[_END])
+
+        if best is None:
+            return None
+        consumed, (intent, action, takes_target) = best
+
+        rest = consumed
+        if takes_target:
+            while rest < len(tokens) and tokens[rest] in _TARGET_STOPWORDS:
+                rest += 1
+            if rest == len(tokens):
+                return None
+        elif consumed != len(tokens):
+            return None
+
+        return VoiceCommand(
+            intent=intent,
+            action=action,
+            target=" ".join(originals[rest:]) if takes_target else None,
+            confidence=self.confidence,
+        )
+
+
+def load_phrases(path: Optional[str] = VOICE_PHRASES_PATH) -> List[Dict[str, Any]]:
+    """Default phrase table plus the entries from the optional JSON file at `path`"""
+    phrases = list(DEFAULT_PHRASES)
+    if path:
+        with open(path, encoding="utf-8") as phrases_file:
+            phrases.extend(json.load(phrases_file))
+        logger.info(f"Loaded voice phrases from {path}")
+    return phrases
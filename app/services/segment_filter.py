@@ -0,0 +1,126 @@
+import re
+from typing import Dict, List, Optional, Sequence, Set
+from app.core.metrics import TRANSLATION_CHARS_SAVED, TRANSLATION_SEGMENTS_SKIPPED
+from app.services.translation_cache import normalize_text
+
+_URL = re.compile(r"(?:[a-z][a-z0-9+.-]*://|www\.)\S+", re.IGNORECASE)
+_EMAIL = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+# codigos ISO 4217 aceitos junto de valores; outras siglas ("TOP 10", "FAQ 3") continuam sendo traduzidas
+_CURRENCY_CODES = (
+    "ARS", "AUD", "BOB", "BRL", "CAD", "CHF", "CLP", "CNY", "COP", "DKK", "EUR", "GBP", "HKD", "INR",
+    "JPY", "KRW", "MXN", "NOK", "NZD", "PEN", "PLN", "PYG", "RUB", "SEK", "SGD", "TRY", "USD", "UYU", "ZAR",
+)
+_CURRENCY = "|".join(_CURRENCY_CODES)
+# numeros, datas, horas, precos e porcentagens: "R$ 1.299,90", "US$ 5", "10 EUR", "12/05/2024"
+_NUMERIC = re.compile(
+    rf"(?:[A-Z]{{1,3}}\$|(?:{_CURRENCY})(?=[\s\d]))?\s*[-+]?\d[\d\s.,:/-]*(?:\s*(?:{_CURRENCY}|%|‰))?", re.ASCII
+)
+# identificadores e caminhos sem espacos: snake_case, foo.bar(), /usr/bin, ../src, C:\app, app.main:app
+# so conta como caminho o que comeca em /, ~/, ./ ou ../ ou usa barra invertida; "Home/Produtos" e texto de interface
+_CODE_TOKEN = re.compile(
+    r"(?:~|\.\.?)?/[\w.-]\S*|\S*(?:[a-z0-9]_[a-z0-9]|[A-Za-z]\.[A-Za-z_]+\(|\(\)|::|=>|\\|\w\.\w+:\w)\S*"
+)
+# em frases com espacos exige ao menos um marcador forte, para nao pegar texto comum ("let me know;")
+_STRONG_CODE_MARKERS = (
+    re.compile(r"[{}]"),
+    re.compile(r"[!=<>]=|=>|\+\+|&&|\|\||\w\s*=\s*[\w\"'\[({]"),
+    re.compile(r"\w\([^)]*\)"),
+)
+_WEAK_CODE_MARKERS = (
+    re.compile(r";\s*$"),
+    re.compile(r"^\s*(?:def|function|return|const|let|var|import|class|public|private|#include)\b"),
+)
+
+# escritas usadas por um unico idioma de destino; texto so com elas ja esta no idioma
+_TARGET_SCRIPTS = {
+    "ko": re.compile(r"[가-힯ᄀ-ᇿ㄰-㆏]"),
+    "ja": re.compile(r"[぀-ヿ]"),
+    "el": re.compile(r"[Ͱ-Ͽ]"),
+    "he": re.compile(r"[֐-׿]"),
+    "th": re.compile(r"[฀-๿]"),
+    "hy": re.compile(r"[԰-֏]"),
+    "ka": re.compile(r"[Ⴀ-ჿ]"),
+}
+_LATIN = re.compile(r"[A-Za-zÀ-ɏ]")
+
+
+def _looks_like_code(text: str) -> bool:
+    if " " not in text:
+        return bool(_CODE_TOKEN.fullmatch(text))
+    strong = sum(1 for marker in _STRONG_CODE_MARKERS if marker.search(text))
+    weak = sum(1 for marker in _WEAK_CODE_MARKERS if marker.search(text))
+    return strong >= 1 and strong + weak >= 2
+
+
+def _in_target_script(text: str, to_language: str) -> bool:
+    script = _TARGET_SCRIPTS.get(to_language.split("-")[0].lower())
+    return bool(script and script.search(text) and not _LATIN.search(text))
+
+
+def skip_reason(text: str, to_language: str, detected_language: Optional[str] = None) -> Optional[str]:
+    """Why `text` can be returned unchanged instead of translated, or None when it needs translation"""
+    stripped = text.strip()
+    if not stripped:
+        return "empty"
+    if not any(char.isalpha() for char in stripped):
+        # numeros, pontuacao, simbolos e emojis
+        return "no_letters"
+    if _NUMERIC.fullmatch(stripped):
+        return "number"
+    if _URL.fullmatch(stripped):
+        return "url"
+    if _EMAIL.fullmatch(stripped):
+        return "email"
+    if _looks_like_code(stripped):
+        return "code"
+    # codigos completos: pt -> pt-PT ainda precisa de traducao
+    if detected_language and detected_language.lower() == to_language.lower():
+        return "target_language"
+    if _in_target_script(stripped, to_language):
+        return "target_language"
+    return None
+
+
+STATS_HEADERS = ("X-Translation-Segments", "X-Translation-Segments-Skipped", "X-Translation-Chars-Saved")
+
+
+class SegmentFilterStats:
+    """Segments and characters a translation request kept away from the upstream"""
+
+    def __init__(self):
+        self.segments = 0
+        self.skipped = 0
+        self.chars_saved = 0
+        self.reasons: Dict[str, int] = {}
+
+    def headers(self) -> Dict[str, str]:
+        return dict(zip(STATS_HEADERS, map(str, (self.segments, self.skipped, self.chars_saved))))
+
+
+def untranslatable_positions(text_list: Sequence[str], to_language: str, from_language: Optional[str] = None,
+                             detected_languages: Optional[List[Optional[str]]] = None,
+                             stats: Optional[SegmentFilterStats] = None) -> Set[int]:
+    """Positions of `text_list` that go back unchanged, without a call to the translator"""
+    same_language = bool(from_language) and from_language.lower() == to_language.lower()
+    skipped, saved_sources = set(), set()
+    for index, text in enumerate(text_list):
+        detected = detected_languages[index] if detected_languages else None
+        reason = "target_language" if same_language else skip_reason(text, to_language, detected)
+        if reason is None:
+            continue
+        skipped.add(index)
+        TRANSLATION_SEGMENTS_SKIPPED.labels(reason).inc()
+        # o Azure cobraria cada segmento distinto uma unica vez
+        source = normalize_text(text)
+        if source not in saved_sources:
+            saved_sources.add(source)
+            TRANSLATION_CHARS_SAVED.labels(reason).inc(len(source))
+            if stats is not None:
+                stats.chars_saved += len(source)
+        if stats is not None:
+            stats.reasons[reason] = stats.reasons.get(reason, 0) + 1
+
+    if stats is not None:
+        stats.segments += len(text_list)
+        stats.skipped += len(skipped)
+    return skipped
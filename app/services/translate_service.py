@@ -1,7 +1,51 @@
-import requests, uuid, json
-from app.core.config import AZURE_TRANSLATE_API_ENDPOINT, AZURE_TRANSLATE_API_KEY, AZURE_API_REGION
+import asyncio, uuid
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple
+import httpx
+from app.core.config import (
+    AZURE_TRANSLATE_API_ENDPOINT,
+    AZURE_TRANSLATE_API_KEY,
+    AZURE_API_REGION,
+    TRANSLATE_MAX_ELEMENTS_PER_REQUEST,
+    TRANSLATE_MAX_CHARS_PER_REQUEST,
+    TRANSLATE_MAX_CONCURRENCY,
+    TRANSLATE_TIMEOUT_SECONDS,
+)
+from app.core.upstream import Upstream
+from app.services.translation_cache import translation_cache, normalize_text, with_surrounding_whitespace
+from app.services.segment_filter import SegmentFilterStats, untranslatable_positions
 
-def translate_list(to_language, text_list, from_language=None):
+translator = Upstream(
+    "azure_translator",
+    max_connections=TRANSLATE_MAX_CONCURRENCY * 2,
+    read_timeout=TRANSLATE_TIMEOUT_SECONDS,
+)
+
+# traducoes em andamento por (idioma de origem, idioma de destino, segmento normalizado)
+_in_flight: Dict[Tuple[str, str, str], asyncio.Future] = {}
+_background_tasks = set()
+
+def get_client() -> httpx.AsyncClient:
+    """Shared keep-alive client used for every call to Azure Translator"""
+    return translator.async_client
+
+async def close_client():
+    await translator.aclose()
+
+def make_batches(text_list: List[str], max_elements: int, max_chars: int) -> List[List[str]]:
+    """Split segments into batches within Azure's per-request element and character limits"""
+    batches = []
+    current, current_chars = [], 0
+    for text in text_list:
+        if current and (len(current) >= max_elements or current_chars + len(text) > max_chars):
+            batches.append(current)
+            current, current_chars = [], 0
+        current.append(text)
+        current_chars += len(text)
+    if current:
+        batches.append(current)
+    return batches
+
+async def _request_translations(to_language, text_list, from_language=None) -> List[str]:
     path = '/translate'
     constructed_url = AZURE_TRANSLATE_API_ENDPOINT + path
 
@@ -21,11 +65,142 @@ def translate_list(to_language, text_list, from_language=None):
 
     body = [{'text': text} for text in text_list]
 
-    response = requests.post(constructed_url, params=params, headers=headers, json=body)
+    response = await translator.request("POST", constructed_url, "translate", params=params, headers=headers, json=body)
 
     if response.status_code != 200:
         raise Exception(f"Erro {response.status_code}: {response.text}")
 
     translations = response.json()
 
-    return {orig: trans['translations'][0]['text'] for orig, trans in zip(text_list, translations)}
+    if not from_language:
+        translation_cache.set_detected_many({
+            text: trans['detectedLanguage']['language']
+            for text, trans in zip(text_list, translations) if 'detectedLanguage' in trans
+        })
+
+    return [trans['translations'][0]['text'] for trans in translations]
+
+async def _translate_batches(to_language, text_list, from_language=None) -> AsyncIterator[Dict[str, str]]:
+    """Translate `text_list` in concurrent batches, yielding each batch as soon as it completes"""
+    semaphore = asyncio.Semaphore(TRANSLATE_MAX_CONCURRENCY)
+
+    async def run(batch):
+        async with semaphore:
+            return dict(zip(batch, await _request_translations(to_language, batch, from_language)))
+
+    batches = make_batches(text_list, TRANSLATE_MAX_ELEMENTS_PER_REQUEST, TRANSLATE_MAX_CHARS_PER_REQUEST)
+    tasks = [asyncio.create_task(run(batch)) for batch in batches]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+
+async def _resolve_owned(to_language, from_language, owned: Dict[str, asyncio.Future]):
+    """Translate the segments this request owns and resolve the futures other requests may share"""
+    try:
+        async for fresh in _translate_batches(to_language, list(owned), from_language):
+            await asyncio.to_thread(translation_cache.set_many, from_language, to_language, fresh)
+            for source, translation in fresh.items():
+                owned[source].set_result(translation)
+    except Exception as error:
+        for future in owned.values():
+            if not future.done():
+                future.set_exception(error)
+    finally:
+        for source, future in owned.items():
+            if not future.done():
+                future.set_exception(RuntimeError("Tradução cancelada"))
+            key = (from_language or "auto", to_language, source)
+            if _in_flight.get(key) is future:
+                del _in_flight[key]
+
+def _consume_exception(future: asyncio.Future):
+    # evita avisos de excecao nao lida quando nenhuma requisicao aguarda o resultado
+    if not future.cancelled():
+        future.exception()
+
+async def _iter_translations(to_language, sources, from_language=None) -> AsyncIterator[Tuple[str, str]]:
+    """Yield (segment, translation) pairs for unique normalized `sources` as they become available"""
+    cached = await asyncio.to_thread(translation_cache.get_many, from_language, to_language, sources)
+    for item in cached.items():
+        yield item
+
+    # requisicoes concorrentes pelo mesmo segmento compartilham uma unica chamada ao Azure
+    loop = asyncio.get_running_loop()
+    waiting, owned = {}, {}
+    for source in sources:
+        if source in cached:
+            continue
+        key = (from_language or "auto", to_language, source)
+        future = _in_flight.get(key)
+        if future is None:
+            future = loop.create_future()
+            future.add_done_callback(_consume_exception)
+            _in_flight[key] = owned[source] = future
+        waiting[source] = future
+
+    if owned:
+        # a tarefa nao e cancelada junto com esta requisicao, pois outras podem aguardar o resultado
+        task = asyncio.create_task(_resolve_owned(to_language, from_language, owned))
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+
+    async def wait(source, future):
+        return source, await asyncio.shield(future)
+
+    tasks = [asyncio.create_task(wait(source, future)) for source, future in waiting.items()]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+
+def _untranslatable(to_language, text_list, from_language, stats) -> Set[int]:
+    # deteccoes anteriores do Azure so valem quando a origem nao foi informada
+    detected = None if from_language else translation_cache.detected_languages(text_list)
+    return untranslatable_positions(text_list, to_language, from_language, detected, stats)
+
+async def translate_segments(to_language, text_list, from_language=None,
+                             stats: Optional[SegmentFilterStats] = None) -> List[str]:
+    """Translate `text_list`, returning one translation per input position"""
+    skipped = _untranslatable(to_language, text_list, from_language, stats)
+    sources = [normalize_text(text) for text in text_list]
+    pending = list(dict.fromkeys(source for index, source in enumerate(sources) if index not in skipped))
+    translated = {}
+    async for source, translation in _iter_translations(to_language, pending, from_language):
+        translated[source] = translation
+    # o segmento normalizado e so a chave; cada posicao recebe de volta seus espacos ao redor
+    return [text if index in skipped else with_surrounding_whitespace(text, translated[source])
+            for index, (text, source) in enumerate(zip(text_list, sources))]
+
+async def translate_stream(to_language, text_list, from_language=None) -> AsyncIterator[Tuple[int, str]]:
+    """Yield (index, translation) pairs as soon as each segment is translated"""
+    skipped = _untranslatable(to_language, text_list, from_language, None)
+    for index in sorted(skipped):
+        yield index, text_list[index]
+
+    positions: Dict[str, List[int]] = {}
+    for index, text in enumerate(text_list):
+        if index not in skipped:
+            positions.setdefault(normalize_text(text), []).append(index)
+    async for source, translation in _iter_translations(to_language, list(positions), from_language):
+        for index in positions[source]:
+            yield index, with_surrounding_whitespace(text_list[index], translation)
+
+def detected_languages(text_list) -> List[Optional[str]]:
+    return translation_cache.detected_languages(text_list)
+
+async def translate_compact(to_language, text_list, from_language=None, include_detected_language=False,
+                            stats: Optional[SegmentFilterStats] = None):
+    """Index-aligned translations, without repeating the source texts"""
+    result = {"translations": await translate_segments(to_language, text_list, from_language, stats)}
+    if include_detected_language:
+        result["detected_languages"] = detected_languages(text_list)
+    return result
+
+async def translate_list(to_language, text_list, from_language=None, stats: Optional[SegmentFilterStats] = None):
+    translations = await translate_segments(to_language, text_list, from_language, stats)
+    return dict(zip(text_list, translations))
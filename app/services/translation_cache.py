@@ -0,0 +1,179 @@
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Tuple
+from app.core.cache import LRUCache, connect_sqlite
+from app.core.metrics import cache_metrics
+from app.core.config import (
+    TRANSLATION_CACHE_PATH,
+    TRANSLATION_CACHE_MAX_ENTRIES,
+    TRANSLATION_CACHE_TTL_SECONDS,
+)
+
+# SQLite limita a quantidade de parametros por consulta
+_SQL_CHUNK_SIZE = 500
+
+
+def normalize_text(text: str) -> str:
+    """Normalize a segment for cache lookups (unicode form and spacing, keeping line breaks)"""
+    lines = unicodedata.normalize("NFC", text).strip().splitlines()
+    return "\n".join(" ".join(line.split()) for line in lines)
+
+
+def with_surrounding_whitespace(text: str, translation: str) -> str:
+    """Put the leading and trailing whitespace of `text` back around its translation"""
+    stripped = text.strip()
+    if not stripped:
+        return text
+    start = text.index(stripped)
+    return text[:start] + translation + text[start + len(stripped):]
+
+
+class TranslationCache:
+    """Per-segment translation cache: in-process LRU in front of a SQLite file"""
+
+    def __init__(self, path: Optional[str], max_entries: int, ttl_seconds: Optional[float]):
+        self.path = path
+        self.ttl_seconds = ttl_seconds or None
+        self.memory = LRUCache(max_size=max_entries, ttl=self.ttl_seconds)
+        # idioma detectado pelo Azure quando a origem nao e informada; persistido junto da traducao
+        self.detections = LRUCache(max_size=max_entries, ttl=self.ttl_seconds)
+        self.disk_hits = 0
+        self.misses = 0
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        if self._conn is None:
+            conn = connect_sqlite(self.path)
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS translations ("
+                " from_language TEXT NOT NULL,"
+                " to_language TEXT NOT NULL,"
+                " source TEXT NOT NULL,"
+                " translation TEXT NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " detected_language TEXT,"
+                " PRIMARY KEY (from_language, to_language, source)"
+                ") WITHOUT ROWID"
+            )
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(translations)")}
+            if "detected_language" not in columns:
+                try:
+                    conn.execute("ALTER TABLE translations ADD COLUMN detected_language TEXT")
+                except sqlite3.OperationalError:
+                    # outro worker adicionou a coluna ao mesmo tempo
+                    pass
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def _language_pair(from_language: Optional[str], to_language: str):
+        return from_language or "auto", to_language
+
+    def get_many(self, from_language: Optional[str], to_language: str, texts: Iterable[str]) -> Dict[str, str]:
+        """Return the cached translations for `texts`, keyed by the original text"""
+        pair = self._language_pair(from_language, to_language)
+        found: Dict[str, str] = {}
+        pending: Dict[str, list] = {}
+        seen = set()
+
+        for text in texts:
+            if text in seen:
+                continue
+            seen.add(text)
+            source = normalize_text(text)
+            translation = self.memory.get((*pair, source))
+            if translation is not None:
+                found[text] = with_surrounding_whitespace(text, translation)
+            else:
+                pending.setdefault(source, []).append(text)
+
+        if pending and self.path:
+            rows = self._select(pair, list(pending))
+            for source, (translation, detected_language) in rows.items():
+                self.memory.set((*pair, source), translation)
+                if detected_language:
+                    self.detections.set(source, detected_language)
+                for text in pending.pop(source):
+                    found[text] = with_surrounding_whitespace(text, translation)
+                    self.disk_hits += 1
+
+        self.misses += sum(len(originals) for originals in pending.values())
+        return found
+
+    def _select(self, pair, sources) -> Dict[str, Tuple[str, Optional[str]]]:
+        rows = {}
+        min_created_at = time.time() - self.ttl_seconds if self.ttl_seconds else 0
+        with self._lock:
+            conn = self._connection()
+            for start in range(0, len(sources), _SQL_CHUNK_SIZE):
+                chunk = sources[start:start + _SQL_CHUNK_SIZE]
+                placeholders = ",".join("?" * len(chunk))
+                cursor = conn.execute(
+                    "SELECT source, translation, detected_language FROM translations"
+                    " WHERE from_language = ? AND to_language = ? AND created_at >= ?"
+                    f" AND source IN ({placeholders})",
+                    (*pair, min_created_at, *chunk),
+                )
+                rows.update((source, (translation, detected)) for source, translation, detected in cursor)
+        return rows
+
+    def set_many(self, from_language: Optional[str], to_language: str, translations: Dict[str, str]) -> None:
+        """Store translations keyed by original text in both tiers"""
+        pair = self._language_pair(from_language, to_language)
+        rows = {}
+        for text, translation in translations.items():
+            source = normalize_text(text)
+            # o cache guarda so o nucleo; os espacos ao redor voltam de cada texto consultado
+            translation = translation.strip()
+            self.memory.set((*pair, source), translation)
+            rows[source] = translation
+
+        if rows and self.path:
+            now = time.time()
+            with self._lock:
+                conn = self._connection()
+                # a deteccao chega antes, em set_detected_many, na resposta do proprio Azure
+                conn.executemany(
+                    "INSERT OR REPLACE INTO translations"
+                    " (from_language, to_language, source, translation, created_at, detected_language)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    [(*pair, source, translation, now, self.detections.get(source) if pair[0] == "auto" else None)
+                     for source, translation in rows.items()],
+                )
+                conn.commit()
+
+    def set_detected_many(self, detected: Dict[str, str]) -> None:
+        for text, language in detected.items():
+            self.detections.set(normalize_text(text), language)
+
+    def detected_languages(self, texts: Iterable[str]) -> List[Optional[str]]:
+        """Detected source language for each text, None when it is unknown"""
+        return [self.detections.get(normalize_text(text)) for text in texts]
+
+    def stats(self) -> Dict[str, int]:
+        memory_stats = self.memory.stats()
+        hits = memory_stats["hits"] + self.disk_hits
+        return {
+            "memory_entries": memory_stats["size"],
+            "memory_hits": memory_stats["hits"],
+            "disk_hits": self.disk_hits,
+            "hits": hits,
+            "misses": self.misses,
+        }
+
+
+translation_cache = TranslationCache(
+    path=TRANSLATION_CACHE_PATH,
+    max_entries=TRANSLATION_CACHE_MAX_ENTRIES,
+    ttl_seconds=TRANSLATION_CACHE_TTL_SECONDS,
+)
+
+def _cache_metrics():
+    stats = translation_cache.stats()
+    return stats["hits"], stats["misses"], stats["memory_entries"]
+
+cache_metrics.register("translation", _cache_metrics)
@@ -1,14 +1,129 @@
+import os
+import re
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from io import BytesIO
-from gtts import gTTS
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple, Union
+from gtts import gTTS as GoogleTTS, gTTSError
+from app.core.config import (
+    TTS_MAX_WORKERS,
+    TTS_STREAM_PREFETCH,
+    TTS_TIMEOUT_SECONDS,
+    GTTS_BASE_URL,
+    UPSTREAM_CONNECT_TIMEOUT_SECONDS,
+)
+from app.core.upstream import RETRY_STATUSES, Upstream, parse_retry_after
+from app.services.audio_cache import AudioCache, audio_cache
+
+_SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?…;:])\s+|\n+")
+
+# pool compartilhado para sintetizar trechos em paralelo
+synthesis_pool = ThreadPoolExecutor(max_workers=TTS_MAX_WORKERS, thread_name_prefix="tts")
+
+class gTTS(GoogleTTS):
+    """gTTS with connect/read deadlines that sends its requests to GTTS_BASE_URL when it is set"""
+
+    def __init__(self, *args, timeout=(UPSTREAM_CONNECT_TIMEOUT_SECONDS, TTS_TIMEOUT_SECONDS), **kwargs):
+        super().__init__(*args, timeout=timeout, **kwargs)
+
+    def _prepare_requests(self):
+        prepared_requests = super()._prepare_requests()
+        if GTTS_BASE_URL:
+            for request in prepared_requests:
+                request.prepare_url(f"{GTTS_BASE_URL.rstrip('/')}/_/TranslateWebserverUi/data/batchexecute", None)
+        return prepared_requests
+
+def classify_gtts_error(result, error: Optional[BaseException]) -> Tuple[bool, Optional[float]]:
+    if not isinstance(error, gTTSError):
+        return False, None
+    # sem resposta: falha de rede ou timeout
+    if error.rsp is None:
+        return True, None
+    if error.rsp.status_code in RETRY_STATUSES:
+        return True, parse_retry_after(error.rsp.headers.get("Retry-After"))
+    return False, None
+
+# o gTTS abre suas proprias conexoes; daqui vem os prazos, novas tentativas e o circuit breaker
+google_tts = Upstream(
+    "gtts",
+    max_connections=TTS_MAX_WORKERS,
+    read_timeout=TTS_TIMEOUT_SECONDS,
+    classify=classify_gtts_error,
+)
+
+def split_sentences(text: str) -> List[str]:
+    """Split text at sentence boundaries, dropping empty pieces"""
+    return [sentence.strip() for sentence in _SENTENCE_BOUNDARY.split(text) if sentence.strip()]
 
 class TextToSpeechService:
-    def convert_text_to_audio(self, text: str, lang: str = "pt", tld='com.br') -> BytesIO:
+    def __init__(self, cache: Optional[AudioCache] = None):
+        self.cache = cache or audio_cache
+
+    def get_audio_file(self, text: str, lang: str = "pt", tld='com.br') -> str:
+        """Return the path of the MP3 for `text`, synthesizing it only on a cache miss"""
+        if not text.strip():
+            raise ValueError("Text cannot be empty.")
+
+        key = self.cache.make_key(text, lang, tld)
+        path = self.cache.get(key)
+        if path is None:
+            path = self._synthesize(key, text, lang, tld)
+
+        return path
+
+    def open_audio_file(self, text: str, lang: str = "pt", tld='com.br') -> BinaryIO:
+        """Open the MP3 for `text`, synthesizing it again if another worker evicted the cached file"""
         if not text.strip():
             raise ValueError("Text cannot be empty.")
 
+        key = self.cache.make_key(text, lang, tld)
+        audio_file = self.cache.open(key)
+        if audio_file is None:
+            audio_file = open(self._synthesize(key, text, lang, tld), "rb")
+        return audio_file
+
+    def _synthesize(self, key: str, text: str, lang: str, tld: str) -> str:
         tts = gTTS(text=text, lang=lang, tld=tld)
-        audio_bytes = BytesIO()
-        tts.write_to_fp(audio_bytes)
-        audio_bytes.seek(0)
-        
-        return audio_bytes
\ No newline at end of file
+        path = google_tts.call_sync("synthesize", lambda: self.cache.put(key, tts.write_to_fp))
+        google_tts.record_sent(len(text))
+        google_tts.record_received(os.path.getsize(path))
+        return path
+
+    def convert_text_to_audio(self, text: str, lang: str = "pt", tld='com.br') -> BytesIO:
+        with self.open_audio_file(text, lang, tld) as audio_file:
+            return BytesIO(audio_file.read())
+
+    def stream_text_to_audio(self, text: str, lang: str = "pt", tld='com.br') -> Iterator[bytes]:
+        """Synthesize `text` sentence by sentence, yielding MP3 frames in order as they are ready"""
+        if not text.strip():
+            raise ValueError("Text cannot be empty.")
+        return self._iter_sentence_audio(split_sentences(text), lang, tld)
+
+    def _iter_sentence_audio(self, sentences: List[str], lang: str, tld: str) -> Iterator[bytes]:
+        # no maximo TTS_STREAM_PREFETCH trechos sintetizados a frente do que ja foi enviado
+        pending = deque()
+        try:
+            for sentence in sentences:
+                pending.append(synthesis_pool.submit(self.convert_text_to_audio, sentence, lang, tld))
+                if len(pending) >= TTS_STREAM_PREFETCH:
+                    yield pending.popleft().result().getvalue()
+            while pending:
+                yield pending.popleft().result().getvalue()
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def synthesize_batch(self, texts: List[str], lang: str = "pt", tld='com.br') -> List[Union[bytes, Exception]]:
+        """Synthesize many texts concurrently, returning the MP3 bytes or the error for each position"""
+        futures: Dict[str, Future] = {}
+        for text in texts:
+            if text not in futures:
+                futures[text] = synthesis_pool.submit(self.convert_text_to_audio, text, lang, tld)
+
+        results = []
+        for text in texts:
+            try:
+                results.append(futures[text].result().getvalue())
+            except Exception as e:
+                results.append(e)
+        return results
@@ -1,8 +1,19 @@
-import requests
+import httpx
 import logging
 from typing import Optional, Dict, List, Tuple, Any
 from app.schemas.voice_command_schema import VoiceCommand
-from app.core.config import WITAI_TOKEN
+from app.core.cache import LRUCache
+from app.core.metrics import cache_metrics
+from app.core.upstream import Upstream, UpstreamUnavailable
+from app.core.config import (
+    WITAI_TOKEN,
+    WITAI_API_URL,
+    WITAI_TIMEOUT_SECONDS,
+    WITAI_POOL_SIZE,
+    WITAI_CACHE_MAX_ENTRIES,
+    WITAI_CACHE_TTL_SECONDS,
+)
+from app.services.local_intent_matcher import LocalIntentMatcher, load_phrases, normalize_utterance
 
 logger = logging.getLogger(__name__)
 
@@ -86,6 +97,12 @@ class ZoomProcessor(EntityProcessor):
             
         return None, None
 
+local_matcher = LocalIntentMatcher(
+    load_phrases(),
+    intents=WitNLUConfig.INTENTS,
+    entity_intent_roles=WitNLUConfig.ENTITY_INTENT_ROLES,
+)
+
 class WitNLUService:
     """Service for processing natural language commands using Wit.ai"""
     
@@ -93,7 +110,7 @@ class WitNLUService:
         self.token = token or WITAI_TOKEN
         if not self.token:
             raise RuntimeError("WITAI_TOKEN not configured in environment variables")
-        self.api_url = "https://api.wit.ai/message"
+        self.api_url = WITAI_API_URL
         
         # Initialize entity processors
         self.entity_processors = {
@@ -102,16 +119,38 @@ class WitNLUService:
             'scroll': ScrollProcessor(),
             'zoom': ZoomProcessor()
         }
+        self.local_matcher = local_matcher
+
+        # Keep-alive connections, deadlines, retries and circuit breaker shared across commands
+        self.upstream = Upstream(
+            "witai",
+            max_connections=WITAI_POOL_SIZE,
+            read_timeout=WITAI_TIMEOUT_SECONDS,
+            headers={"Authorization": f"Bearer {self.token}"},
+        )
+
+        # Wit.ai responses keyed by normalized utterance (case, accents, whitespace)
+        self.cache = LRUCache(max_size=WITAI_CACHE_MAX_ENTRIES, ttl=WITAI_CACHE_TTL_SECONDS)
     
     def _make_wit_request(self, text: str) -> Dict[str, Any]:
         """Make request to Wit.ai API"""
         try:
-            headers = {"Authorization": f"Bearer {self.token}"}
             params = {"q": text}
-            response = requests.get(self.api_url, headers=headers, params=params, timeout=10)
+            response = self.upstream.request_sync("GET", self.api_url, "message", params=params)
+            response.raise_for_status()
+            return response.json()
+        except (httpx.HTTPError, UpstreamUnavailable) as e:
+            logger.error(f"Error making request to Wit.ai: {e}")
+            raise RuntimeError(f"Falha na comunicação com Wit.ai: {e}")
+
+    async def _make_wit_request_async(self, text: str) -> Dict[str, Any]:
+        """Make request to Wit.ai API without blocking the event loop"""
+        try:
+            params = {"q": text}
+            response = await self.upstream.request("GET", self.api_url, "message", params=params)
             response.raise_for_status()
             return response.json()
-        except requests.exceptions.RequestException as e:
+        except (httpx.HTTPError, UpstreamUnavailable) as e:
             logger.error(f"Error making request to Wit.ai: {e}")
             raise RuntimeError(f"Falha na comunicação com Wit.ai: {e}")
     
@@ -187,48 +226,111 @@ class WitNLUService:
             
         return action, target
     
-    def process_command(self, text: str) -> VoiceCommand:
-        """Process natural language command and return structured VoiceCommand"""
+    def _unknown_command(self) -> VoiceCommand:
+        return VoiceCommand(
+            intent="unknown",
+            action="unknown",
+            target=None,
+            confidence=0.0
+        )
+
+    def _match_without_wit(self, text: str) -> Optional[VoiceCommand]:
+        """Resolve empty and locally known commands"""
         if not text or not text.strip():
             logger.warning("Empty text provided for processing")
-            return VoiceCommand(
-                intent="unknown",
-                action="unknown",
-                target=None,
-                confidence=0.0
-            )
+            return self._unknown_command()
+
+        # Frequent commands are resolved locally without calling Wit.ai
+        local_command = self.local_matcher.match(text)
+        if local_command:
+            logger.info(f"Matched command '{text}' locally -> {local_command}")
+        return local_command
+
+    def _build_command(self, text: str, data: Dict[str, Any]) -> VoiceCommand:
+        """Turn a Wit.ai response into a structured VoiceCommand"""
+        logger.debug(f"Wit.ai response for '{text}': {data}")
+        
+        # Extract intent and confidence
+        intent, confidence = self._extract_intent_and_confidence(data)
+        
+        # Process entities
+        entities = data.get("entities", {})
+        action, target = self._process_entities(entities, intent)
+        
+        # Handle special intent rules
+        final_action, final_target = self._handle_special_intents(intent, action, target)
+        
+        # Create result
+        result = VoiceCommand(
+            intent=intent or "unknown",
+            action=final_action or "unknown",
+            target=final_target,
+            confidence=confidence
+        )
+        
+        logger.info(f"Processed command '{text}' -> {result}")
+        return result
+
+    def process_command(self, text: str) -> VoiceCommand:
+        """Process natural language command and return structured VoiceCommand"""
+        command = self._match_without_wit(text)
+        if command:
+            return command
         
         try:
-            # Make request to Wit.ai
-            data = self._make_wit_request(text.strip())
-            logger.debug(f"Wit.ai response for '{text}': {data}")
-            
-            # Extract intent and confidence
-            intent, confidence = self._extract_intent_and_confidence(data)
-            
-            # Process entities
-            entities = data.get("entities", {})
-            action, target = self._process_entities(entities, intent)
-            
-            # Handle special intent rules
-            final_action, final_target = self._handle_special_intents(intent, action, target)
-            
-            # Create result
-            result = VoiceCommand(
-                intent=intent or "unknown",
-                action=final_action or "unknown",
-                target=final_target,
-                confidence=confidence
-            )
-            
-            logger.info(f"Processed command '{text}' -> {result}")
-            return result
+            cache_key = normalize_utterance(text)
+            data = self.cache.get(cache_key)
+            if data is None:
+                # Make request to Wit.ai
+                data = self._make_wit_request(text.strip())
+                self.cache.set(cache_key, data)
+            return self._build_command(text, data)
             
         except Exception as e:
             logger.error(f"Error processing command '{text}': {e}")
-            return VoiceCommand(
-                intent="unknown",
-                action="unknown",
-                target=None,
-                confidence=0.0
-            )
+            return self._unknown_command()
+
+    async def process_command_async(self, text: str) -> VoiceCommand:
+        """Async variant of process_command"""
+        command = self._match_without_wit(text)
+        if command:
+            return command
+
+        try:
+            cache_key = normalize_utterance(text)
+            data = self.cache.get(cache_key)
+            if data is None:
+                data = await self._make_wit_request_async(text.strip())
+                self.cache.set(cache_key, data)
+            return self._build_command(text, data)
+
+        except Exception as e:
+            logger.error(f"Error processing command '{text}': {e}")
+            return self._unknown_command()
+
+    async def close(self):
+        await self.upstream.aclose()
+
+_service: Optional[WitNLUService] = None
+
+def get_wit_nlu_service() -> WitNLUService:
+    """Process-wide WitNLUService shared by every request"""
+    global _service
+    if _service is None:
+        _service = WitNLUService()
+    return _service
+
+async def close_service():
+    global _service
+    if _service is not None:
+        await _service.close()
+        _service = None
+
+def _cache_metrics():
+    # o servico so existe depois do aquecimento ou do primeiro comando
+    if _service is None:
+        return 0, 0, 0
+    stats = _service.cache.stats()
+    return stats["hits"], stats["misses"], stats["size"]
+
+cache_metrics.register("witai", _cache_metrics)
@@ -0,0 +1,20 @@
+import os
+import tempfile
+import pytest
+
+# caches em disco dos testes ficam em um diretorio temporario
+os.environ["CACHE_DIR"] = tempfile.mkdtemp(prefix="wea-tests-")
+# bcrypt com custo minimo para os testes
+os.environ["BCRYPT_ROUNDS"] = "4"
+# banco em arquivo temporario (o engine sincrono e o assincrono precisam ver os mesmos dados)
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(os.environ['CACHE_DIR'], 'app.db')}"
+# chave de assinatura dos JWTs dos testes, quando o ambiente nao define uma
+os.environ.setdefault("SECRET_KEY", "test-secret")
+# o servico do Wit.ai exige um token ao ser criado; os testes nao chamam a API real
+os.environ.setdefault("WITAI_TOKEN", "test-token")
+
+@pytest.fixture(scope="session", autouse=True)
+def database():
+    # o TestClient usado fora de "with" nao executa o lifespan, que e quem cria as tabelas
+    from app.core.init_db import init_database
+    init_database()
@@ -0,0 +1,114 @@
+import asyncio
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+from app.auth.jwt_handler import create_access_token
+from app.core.admission import AdmissionMiddleware, AdmissionPolicy, ConcurrencyLimiter, Overloaded, RateLimiter, client_key
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+def test_concurrency_limiter_queues_then_sheds():
+    async def scenario():
+        limiter = ConcurrencyLimiter("teste_fila", max_concurrent=1, max_queue=1, max_wait=1)
+        assert await limiter.acquire() == 0
+
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0.01)
+        # fila cheia: rejeita na hora
+        with pytest.raises(Overloaded) as error:
+            await limiter.acquire()
+        assert error.value.status_code == 503
+
+        await asyncio.sleep(0.05)
+        limiter.release()
+        assert await waiter >= 0.05
+        assert limiter.stats() == {"max_concurrent": 1, "active": 1, "queued": 0, "rejected": 1}
+        limiter.release()
+        assert limiter.active == 0
+
+    asyncio.run(scenario())
+    assert sample("admission_rejected_total", endpoint="teste_fila", reason="queue_full") == 1
+
+def test_concurrency_limiter_times_out_waiting():
+    async def scenario():
+        limiter = ConcurrencyLimiter("teste_espera", max_concurrent=1, max_queue=5, max_wait=0.02)
+        await limiter.acquire()
+        with pytest.raises(Overloaded):
+            await limiter.acquire()
+        limiter.release()
+        # o slot liberado nao vai para o waiter que desistiu
+        assert limiter.active == 0
+
+    asyncio.run(scenario())
+    assert sample("admission_rejected_total", endpoint="teste_espera", reason="timeout") == 1
+
+def test_rate_limiter_token_bucket_per_client():
+    limiter = RateLimiter("teste_taxa", rate=1, burst=2)
+    limiter.check("a")
+    limiter.check("a")
+    with pytest.raises(Overloaded) as error:
+        limiter.check("a")
+    assert error.value.status_code == 429
+    assert 0 < error.value.retry_after <= 1
+    # outro cliente tem seu proprio balde
+    limiter.check("b")
+
+def test_client_key_uses_only_verified_tokens():
+    token = create_access_token({"sub": "alguem@example.com"})
+    scope = {"headers": [(b"authorization", f"Bearer {token}".encode())], "client": ("10.0.0.1", 1234)}
+    assert client_key(scope) == "user:alguem@example.com"
+    assert client_key({"headers": [(b"authorization", b"Bearer abc")], "client": ("10.0.0.1", 1234)}) == "ip:10.0.0.1"
+    assert client_key({"headers": [], "client": ("10.0.0.1", 1234)}) == "ip:10.0.0.1"
+
+def make_app(policy):
+    app = FastAPI()
+
+    @app.post("/slow")
+    async def slow():
+        await asyncio.sleep(0.2)
+        return {"ok": True}
+
+    @app.post("/fast")
+    async def fast():
+        return {"ok": True}
+
+    app.add_middleware(AdmissionMiddleware, policies={"/slow": policy})
+    return app
+
+def test_middleware_rejects_when_full():
+    policy = AdmissionPolicy("teste_slow", max_concurrent=1, max_queue=0)
+    app = make_app(policy)
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            return await asyncio.gather(http.post("/slow"), http.post("/slow"), http.post("/fast"))
+
+    first, second, fast = asyncio.run(scenario())
+    assert sorted([first.status_code, second.status_code]) == [200, 503]
+    rejected = first if first.status_code == 503 else second
+    assert rejected.headers["retry-after"] == "1"
+    assert fast.status_code == 200
+    assert policy.limiter.active == 0
+
+def test_middleware_rate_limits_per_client():
+    policy = AdmissionPolicy("teste_rate", max_concurrent=10, max_queue=10, rate=0.5, burst=1)
+    client = TestClient(make_app(policy))
+
+    assert client.post("/slow").status_code == 200
+    response = client.post("/slow")
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "2"
+    token = create_access_token({"sub": "outro@example.com"})
+    assert client.post("/slow", headers={"Authorization": f"Bearer {token}"}).status_code == 200
+    assert sample("admission_queue_wait_seconds_count", endpoint="teste_rate") == 2
+
+def test_unverified_tokens_share_the_ip_bucket():
+    policy = AdmissionPolicy("teste_tokens_falsos", max_concurrent=10, max_queue=10, rate=0.5, burst=1)
+    client = TestClient(make_app(policy))
+
+    assert client.post("/slow", headers={"Authorization": "Bearer falso-1"}).status_code == 200
+    assert client.post("/slow", headers={"Authorization": "Bearer falso-2"}).status_code == 429
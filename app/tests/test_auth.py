@@ -0,0 +1,136 @@
+from sqlalchemy import create_engine, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+from passlib.context import CryptContext
+from app.auth.auth_service import authenticate_user
+from app.auth.jwt_handler import get_password_hash
+from app.auth.password_hasher import PasswordHasher
+from app.core.database import Base
+from app.models.user_model import User_model
+import asyncio
+import threading
+import pytest
+
+@pytest.fixture
+def sessions(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'auth.db'}")
+    Base.metadata.create_all(bind=engine)
+    with sessionmaker(bind=engine)() as session:
+        session.add(User_model(username="admin@example.com", full_name="Administrator",
+                               hashed_password=get_password_hash("senha123"), disabled=False))
+        session.commit()
+    engine.dispose()
+    # NullPool: cada asyncio.run abre sua propria conexao
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'auth.db'}", poolclass=NullPool)
+    yield async_sessionmaker(async_engine, expire_on_commit=False)
+    asyncio.run(async_engine.dispose())
+
+def run_with_session(sessions, function, *args):
+    async def scenario():
+        async with sessions() as db:
+            return await function(db, *args)
+    return asyncio.run(scenario())
+
+def test_authenticate_user(sessions):
+    assert run_with_session(sessions, authenticate_user, "admin@example.com", "senha123").username == "admin@example.com"
+    assert run_with_session(sessions, authenticate_user, "admin@example.com", "errada") is False
+    assert run_with_session(sessions, authenticate_user, "ninguem@example.com", "senha123") is False
+
+def test_outdated_hash_is_upgraded_on_login(sessions, monkeypatch):
+    stronger_context = CryptContext(schemes=["bcrypt"], deprecated="auto",
+                                    bcrypt__default_rounds=5, bcrypt__min_rounds=5)
+    monkeypatch.setattr("app.auth.password_hasher.pwd_context", stronger_context)
+
+    assert run_with_session(sessions, authenticate_user, "admin@example.com", "senha123")
+
+    async def stored_hash(db):
+        return (await db.execute(select(User_model.hashed_password))).scalar_one()
+    assert run_with_session(sessions, stored_hash).startswith("$2b$05$")
+    assert run_with_session(sessions, authenticate_user, "admin@example.com", "senha123")
+
+def test_password_hasher_rejects_when_queue_is_full():
+    from fastapi import HTTPException
+
+    hasher = PasswordHasher(max_workers=1, max_queue=1)
+    started, release = threading.Event(), threading.Event()
+
+    def blocking_verify():
+        started.set()
+        release.wait()
+        return "first"
+
+    async def scenario():
+        first = asyncio.ensure_future(hasher._run(blocking_verify))
+        await asyncio.to_thread(started.wait)
+        second = asyncio.ensure_future(hasher._run(lambda: "second"))
+        await asyncio.sleep(0)
+
+        with pytest.raises(HTTPException) as rejected:
+            await hasher._run(lambda: "third")
+        stats = hasher.stats()
+        release.set()
+        return await first, await second, rejected.value, stats
+
+    first, second, rejected, stats = asyncio.run(scenario())
+
+    assert (first, second) == ("first", "second")
+    assert rejected.status_code == 503
+    assert stats == {"workers": 1, "in_flight": 1, "queued": 1, "rejected": 1}
+
+def test_current_user_is_cached_until_user_changes(sessions, monkeypatch):
+    from app.auth import auth_service
+    from app.auth.jwt_handler import create_access_token
+    from app.auth.principal_cache import token_cache, user_cache
+
+    token_cache.clear()
+    user_cache.clear()
+    token = create_access_token({"sub": "admin@example.com"})
+
+    decoded = []
+    original_decode = auth_service.decode_access_token
+    def counting_decode(value):
+        decoded.append(value)
+        return original_decode(value)
+
+    monkeypatch.setattr(auth_service, "decode_access_token", counting_decode)
+
+    def current_user(db, token):
+        return auth_service.get_current_user(token, db)
+
+    first = run_with_session(sessions, current_user, token)
+    # sem acesso ao banco: a sessao nao e usada em um acerto de cache
+    second = asyncio.run(auth_service.get_current_user(token, None))
+
+    assert first == second
+    assert first.disabled is False
+    assert len(decoded) == 1
+
+    async def disable_user(db):
+        user = (await db.execute(select(User_model))).scalar_one()
+        user.disabled = True
+        await db.commit()
+    run_with_session(sessions, disable_user)
+
+    refreshed = run_with_session(sessions, current_user, token)
+    assert refreshed.disabled is True
+    assert len(decoded) == 1
+
+def test_login_and_feedback_use_the_file_database():
+    from fastapi.testclient import TestClient
+    from app.core.database import SessionLocal
+    from app.main import app
+    from app.models.feedback_model import Feedback_model
+    from app.auth.principal_cache import user_cache
+
+    user_cache.clear()
+    client = TestClient(app)
+    response = client.post("/auth/login", data={"username": "admin@example.com", "password": "senha123"})
+    assert response.status_code == 200
+    token = response.json()["access_token"]
+    assert client.get("/auth/users/me/", headers={"Authorization": f"Bearer {token}"}).json()["username"] == "admin@example.com"
+
+    assert client.post("/api/v1/feedback", json={"title": "t", "message": "persistido"}).status_code == 202
+    # gravado pela sessao assincrona e visivel para outra conexao
+    with SessionLocal() as db:
+        assert db.query(Feedback_model).filter(Feedback_model.message == "persistido").count() == 1
@@ -0,0 +1,187 @@
+import asyncio
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from app.services.feedback_writer import FeedbackWriter
+
+def make_rows(count):
+    return [{"title": f"t{i}", "message": f"m{i}"} for i in range(count)]
+
+def recording_writer(monkeypatch, **kwargs):
+    writer = FeedbackWriter(**kwargs)
+    batches = []
+
+    async def fake_insert(rows):
+        batches.append(list(rows))
+    monkeypatch.setattr(writer, "_insert", fake_insert)
+    return writer, batches
+
+def test_writer_flushes_in_bulk_and_drains_on_stop(monkeypatch):
+    writer, batches = recording_writer(monkeypatch, max_queue=100, max_rows=3, flush_interval=60)
+
+    async def scenario():
+        writer.start()
+        await writer.submit(make_rows(7))
+        await asyncio.sleep(0.05)
+        # dois lotes cheios saem na hora; o resto espera o intervalo ou o encerramento
+        flushed_before_stop = [len(batch) for batch in batches]
+        await writer.stop()
+        return flushed_before_stop
+
+    assert asyncio.run(scenario()) == [3, 3]
+    assert [len(batch) for batch in batches] == [3, 3, 1]
+    assert [row["title"] for batch in batches for row in batch] == [f"t{i}" for i in range(7)]
+
+def test_writer_flushes_after_interval(monkeypatch):
+    writer, batches = recording_writer(monkeypatch, max_queue=100, max_rows=100, flush_interval=0.01)
+
+    async def scenario():
+        writer.start()
+        await writer.submit(make_rows(2))
+        await asyncio.sleep(0.1)
+        flushed = [len(batch) for batch in batches]
+        await writer.stop()
+        return flushed
+
+    assert asyncio.run(scenario()) == [2]
+
+def test_writer_rejects_when_buffer_is_full(monkeypatch):
+    writer, _ = recording_writer(monkeypatch, max_queue=2, max_rows=10, flush_interval=60)
+
+    async def scenario():
+        writer.start()
+        with pytest.raises(HTTPException) as rejected:
+            await writer.submit(make_rows(3))
+        await writer.submit(make_rows(2))
+        stats = writer.stats()
+        await writer.stop()
+        return rejected.value, stats
+
+    rejected, stats = asyncio.run(scenario())
+    assert rejected.status_code == 503
+    assert rejected.headers["Retry-After"] == "1"
+    assert stats["queued"] == 2
+    assert stats["rejected"] == 3
+
+def test_writer_retries_failed_batches_before_dropping(monkeypatch):
+    writer = FeedbackWriter(max_queue=100, max_rows=10, flush_interval=0.01, max_retries=2, retry_backoff=0.001)
+    attempts = []
+
+    async def flaky_insert(rows):
+        attempts.append(rows[0]["title"])
+        # o primeiro lote falha uma vez; o segundo falha sempre
+        if rows[0]["title"] == "t1" or len(attempts) == 1:
+            raise RuntimeError("database is locked")
+    monkeypatch.setattr(writer, "_insert", flaky_insert)
+
+    async def scenario():
+        writer.start()
+        await writer.submit(make_rows(1))
+        await asyncio.sleep(0.05)
+        await writer.submit([{"title": "t1", "message": "m1"}])
+        await writer.stop()
+
+    asyncio.run(scenario())
+    assert attempts == ["t0", "t0", "t1", "t1", "t1"]
+    assert writer.stats()["retries"] == 3
+    assert writer.stats()["failed"] == 1
+
+def test_bulk_feedback_route(monkeypatch):
+    from app.api import routes
+    from app.core.database import SessionLocal
+    from app.main import app
+    from app.models.feedback_model import Feedback_model
+
+    feedbacks = [{"title": "bulk", "message": f"mensagem {i}"} for i in range(5)]
+    with TestClient(app) as client:
+        response = client.post("/api/v1/feedback/bulk", json={"feedbacks": feedbacks})
+        assert response.status_code == 202
+        assert response.json() == {"accepted": 5}
+
+        monkeypatch.setattr(routes, "FEEDBACK_BULK_MAX_ITEMS", 2)
+        assert client.post("/api/v1/feedback/bulk", json={"feedbacks": feedbacks}).status_code == 400
+        assert client.get("/api/v1/feedback/queue-stats").json()["max_queue"] > 0
+
+    # o encerramento do app grava o que ainda estava na fila
+    with SessionLocal() as db:
+        assert db.query(Feedback_model).filter(Feedback_model.title == "bulk").count() == 5
+
+@pytest.fixture
+def admin_client():
+    from app.auth.principal_cache import user_cache
+    from app.main import app
+
+    user_cache.clear()
+    client = TestClient(app)
+    token = client.post("/auth/login", data={"username": "admin@example.com", "password": "senha123"}).json()["access_token"]
+    client.headers["Authorization"] = f"Bearer {token}"
+    return client
+
+@pytest.fixture
+def future_feedback():
+    from datetime import datetime, timedelta
+    from app.core.database import SessionLocal
+    from app.models.feedback_model import Feedback_model
+
+    # datas no futuro isolam estas linhas das gravadas pelos outros testes
+    start = datetime(2099, 1, 1)
+    with SessionLocal() as db:
+        db.add_all(Feedback_model(title="admin", message=f"m{i}", created_at=start + timedelta(hours=i)) for i in range(5))
+        db.commit()
+    yield start
+    with SessionLocal() as db:
+        db.query(Feedback_model).filter(Feedback_model.title == "admin").delete()
+        db.commit()
+
+def test_admin_feedback_requires_authentication():
+    from app.main import app
+    client = TestClient(app)
+    assert client.get("/api/v1/admin/feedback").status_code == 401
+    assert client.get("/api/v1/admin/feedback/export").status_code == 401
+
+def test_admin_feedback_keyset_pagination(admin_client, future_feedback):
+    params = {"limit": 2, "since": "2099-01-01T00:00:00", "until": "2099-01-01T04:00:00"}
+    pages = []
+    while True:
+        page = admin_client.get("/api/v1/admin/feedback", params=params).json()
+        pages.append([item["message"] for item in page["items"]])
+        if page["next_cursor"] is None:
+            break
+        params["before_id"] = page["next_cursor"]
+
+    # mais recentes primeiro; "until" e exclusivo
+    assert pages == [["m3", "m2"], ["m1", "m0"]]
+    assert admin_client.get("/api/v1/admin/feedback", params={"limit": 100000}).status_code == 422
+
+def test_admin_feedback_export(admin_client, future_feedback):
+    import csv
+    import json
+
+    params = {"since": "2099-01-01T02:00:00Z"}
+    ndjson = admin_client.get("/api/v1/admin/feedback/export", params=params)
+    assert ndjson.headers["content-type"] == "application/x-ndjson"
+    records = [json.loads(line) for line in ndjson.text.splitlines()]
+    assert [record["message"] for record in records] == ["m2", "m3", "m4"]
+    assert records[0]["created_at"] == "2099-01-01T02:00:00"
+
+    exported = admin_client.get("/api/v1/admin/feedback/export", params={**params, "format": "csv"})
+    rows = list(csv.reader(exported.text.splitlines()))
+    assert rows[0] == ["id", "title", "message", "created_at"]
+    assert [row[2] for row in rows[1:]] == ["m2", "m3", "m4"]
+
+def test_feedback_table_gains_created_at_column(tmp_path, monkeypatch):
+    from sqlalchemy import create_engine, inspect, text
+    from app.core import init_db
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE feedback (id INTEGER PRIMARY KEY, title VARCHAR NOT NULL, message VARCHAR NOT NULL)"))
+        connection.execute(text("INSERT INTO feedback (title, message) VALUES ('antigo', 'sem data')"))
+    monkeypatch.setattr(init_db, "engine", engine)
+
+    init_db.migrate_feedback_table()
+    init_db.migrate_feedback_table()
+
+    assert "created_at" in {column["name"] for column in inspect(engine).get_columns("feedback")}
+    with engine.connect() as connection:
+        assert connection.execute(text("SELECT created_at FROM feedback")).scalar() is not None
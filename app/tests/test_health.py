@@ -0,0 +1,58 @@
+import asyncio
+import threading
+import time
+from fastapi.testclient import TestClient
+from app.core.startup import StartupState
+from app.main import app
+
+def test_liveness_and_readiness_after_startup():
+    with TestClient(app) as client:
+        assert client.get("/health/live").json() == {"status": "alive"}
+
+        deadline = time.monotonic() + 10
+        response = client.get("/health/ready")
+        while response.status_code == 503 and time.monotonic() < deadline:
+            time.sleep(0.02)
+            response = client.get("/health/ready")
+
+        assert response.status_code == 200
+        report = response.json()
+        assert report["status"] == "ready"
+        assert report["import_seconds"] > 0
+        assert report["startup_seconds"] > 0
+        assert set(report["warmup_seconds"]) == {"database", "translation_client", "image_client", "voice_service"}
+
+def test_warmup_reports_starting_until_done_and_tolerates_failures():
+    state = StartupState()
+    release = threading.Event()
+
+    def slow_step():
+        release.wait()
+
+    def failing_step():
+        raise RuntimeError("sem credenciais")
+
+    async def scenario():
+        state.start_warmup([("slow", slow_step), ("failing", failing_step)])
+        await asyncio.sleep(0.01)
+        before = state.report()["status"]
+        release.set()
+        await state._task
+        return before
+
+    assert asyncio.run(scenario()) == "starting"
+    report = state.report()
+    assert report["status"] == "ready"
+    assert report["warmup_errors"] == {"failing": "sem credenciais"}
+    assert set(report["warmup_seconds"]) == {"slow", "failing"}
+
+def test_image_client_is_built_lazily(monkeypatch):
+    import pytest
+    from app.services import image_description
+
+    monkeypatch.setattr(image_description, "_client", None)
+    monkeypatch.setattr(image_description, "AZURE_CV_KEY", None)
+    with pytest.raises(RuntimeError):
+        image_description.get_client()
+    # sem cliente a descricao falha de forma controlada em vez de quebrar o import
+    assert asyncio.run(image_description.analyze_image_url("https://example.invalid/a.png")) == {"caption": "error analyzing image"}
@@ -2,6 +2,7 @@ from fastapi.testclient import TestClient
 from app.main import app
 from app.services.image_description import analyze_image
 import pytest
+import asyncio
 import io
 
 client = TestClient(app)
@@ -14,7 +15,7 @@ def test_describe_image_invalid_file_type():
     assert response.json()["detail"] == "File must be an image" 
 
 def test_describe_image_success(monkeypatch):
-    def mock_image_analyze(_):
+    async def mock_image_analyze(_, upload_bytes=None):
         return {"caption":"mocked caption"}
 
     monkeypatch.setattr("app.api.routes.analyze_image", mock_image_analyze)
@@ -28,7 +29,7 @@ def test_describe_image_success(monkeypatch):
     assert response.json() == {"caption":"mocked caption"}
 
 def test_empty_caption(monkeypatch):
-    def mock_no_caption(_):
+    async def mock_no_caption(_, upload_bytes=None):
         return {"caption": "no caption"}
     
     monkeypatch.setattr("app.api.routes.analyze_image", mock_no_caption)
@@ -41,3 +42,233 @@ def test_empty_caption(monkeypatch):
     assert response.status_code == 200
     assert response.json() == {"caption": "no caption"}
 
+def make_image(size, fmt="PNG", seed=0):
+    from PIL import Image
+
+    image = Image.new("RGB", (64, 64))
+    image.putdata([((x * 4 + seed) % 256, (y * 4) % 256, ((x * y) + seed) % 256) for y in range(64) for x in range(64)])
+    buffer = io.BytesIO()
+    image.resize(size).save(buffer, format=fmt)
+    return buffer.getvalue()
+
+def test_caption_cache_exact_and_near_duplicate(tmp_path):
+    from app.services.caption_cache import CaptionCache
+
+    cache = CaptionCache(path=str(tmp_path / "captions.sqlite3"), max_entries=10, max_distance=4)
+    original = make_image((256, 256))
+    cache.set(original, "a colorful gradient")
+
+    assert cache.get(original) == "a colorful gradient"
+    assert cache.get(make_image((200, 200), fmt="JPEG")) == "a colorful gradient"
+    assert cache.get(make_image((256, 256), seed=128)) is None
+    assert cache.get(b"not an image") is None
+    assert cache.stats() == {"entries": 2, "exact_hits": 1, "near_hits": 1, "misses": 2}
+
+def test_caption_cache_persists_and_evicts(tmp_path):
+    from app.services.caption_cache import CaptionCache
+
+    path = str(tmp_path / "captions.sqlite3")
+    cache = CaptionCache(path=path, max_entries=2, max_distance=0)
+    cache.set(b"first", "first caption")
+    cache.set(b"second", "second caption")
+    cache.get(b"first")
+    cache.set(b"third", "third caption")
+
+    restarted = CaptionCache(path=path, max_entries=2, max_distance=0)
+    assert restarted.get(b"first") == "first caption"
+    assert restarted.get(b"second") is None
+    assert restarted.get(b"third") == "third caption"
+
+def test_analyze_image_uses_caption_cache(monkeypatch, tmp_path):
+    from types import SimpleNamespace
+    from app.services import image_description
+    from app.services.caption_cache import CaptionCache
+
+    monkeypatch.setattr(image_description, "caption_cache", CaptionCache(str(tmp_path / "c.sqlite3"), 10, 4))
+
+    calls = []
+    async def mock_analyze(**kwargs):
+        calls.append(kwargs)
+        return SimpleNamespace(caption=SimpleNamespace(text="a logo"))
+
+    monkeypatch.setattr(image_description, "get_client", lambda: SimpleNamespace(analyze=mock_analyze))
+
+    image_bytes = make_image((128, 128))
+    assert asyncio.run(image_description.analyze_image(image_bytes)) == {"caption": "a logo"}
+    assert asyncio.run(image_description.analyze_image(image_bytes)) == {"caption": "a logo"}
+    assert len(calls) == 1
+
+def test_repeated_upload_skips_preprocessing(monkeypatch, tmp_path):
+    from types import SimpleNamespace
+    from app.services import image_description
+    from app.services.caption_cache import CaptionCache
+    from app.services.image_preprocessing import preprocess_image
+
+    cache = CaptionCache(str(tmp_path / "c.sqlite3"), 10, 4)
+    monkeypatch.setattr(image_description, "caption_cache", cache)
+
+    preprocessed, analyzed = [], []
+    async def mock_preprocess(image_bytes):
+        preprocessed.append(image_bytes)
+        return preprocess_image(image_bytes, max_side=64)
+
+    async def mock_analyze(**kwargs):
+        analyzed.append(kwargs)
+        return SimpleNamespace(caption=SimpleNamespace(text="a gradient"))
+
+    monkeypatch.setattr("app.api.routes.preprocess_image_async", mock_preprocess)
+    monkeypatch.setattr(image_description, "get_client", lambda: SimpleNamespace(analyze=mock_analyze))
+
+    upload = make_image((256, 256))
+    for _ in range(2):
+        response = client.post("/api/v1/describe-image/", files={"file": ("a.png", upload, "image/png")})
+        assert response.json() == {"caption": "a gradient"}
+
+    assert len(preprocessed) == 1
+    assert len(analyzed) == 1
+    assert cache.stats()["exact_hits"] == 1
+
+def test_describe_image_reports_open_circuit(monkeypatch, tmp_path):
+    from app.core.upstream import CircuitBreaker
+    from app.services import image_description
+    from app.services.caption_cache import CaptionCache
+
+    monkeypatch.setattr(image_description, "caption_cache", CaptionCache(str(tmp_path / "c.sqlite3"), 10, 4))
+    breaker = CircuitBreaker("azure_vision", failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    monkeypatch.setattr(image_description.vision, "breaker", breaker)
+
+    response = client.post("/api/v1/describe-image/", files={"file": ("a.png", make_image((32, 32)), "image/png")})
+
+    assert response.status_code == 503
+    assert int(response.headers["retry-after"]) >= 29
+
+def test_preprocess_image_downscales_and_strips_metadata():
+    from PIL import Image
+    from app.services.image_preprocessing import preprocess_image
+
+    image = Image.new("RGBA", (3000, 2000), (10, 200, 30, 255))
+    exif = Image.Exif()
+    exif[0x010F] = "Camera Maker"
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG", exif=exif)
+
+    processed = preprocess_image(buffer.getvalue(), max_side=1024)
+
+    with Image.open(io.BytesIO(processed)) as result:
+        assert result.format == "JPEG"
+        assert max(result.size) == 1024
+        assert not result.getexif()
+    assert len(processed) < len(buffer.getvalue())
+    assert preprocess_image(b"fake_image_bytes") == b"fake_image_bytes"
+
+def test_describe_image_sends_preprocessed_bytes(monkeypatch):
+    received = []
+    async def mock_image_analyze(image_bytes, upload_bytes=None):
+        received.append(image_bytes)
+        return {"caption": "mocked caption"}
+
+    monkeypatch.setattr("app.api.routes.analyze_image", mock_image_analyze)
+
+    response = client.post("/api/v1/describe-image/",
+                           files={"file": ("big.png", make_image((2048, 2048)), "image/png")}
+                           )
+
+    assert response.status_code == 200
+    assert received[0][:2] == b"\xff\xd8"
+
+def test_describe_image_too_large(monkeypatch):
+    monkeypatch.setattr("app.api.routes.IMAGE_MAX_UPLOAD_BYTES", 10)
+
+    response = client.post("/api/v1/describe-image/",
+                           files={"file": ("test.png", io.BytesIO(b"fake_image_bytes"), "image/png")}
+                           )
+
+    assert response.status_code == 413
+
+def test_describe_image_batch(monkeypatch):
+    active, peak = [], []
+    async def mock_image_analyze(image_bytes, upload_bytes=None):
+        active.append(1)
+        peak.append(len(active))
+        await asyncio.sleep(0.01)
+        active.pop()
+        return {"caption": f"caption {len(image_bytes)}"}
+
+    async def mock_image_analyze_url(url):
+        return {"caption": f"caption for {url}"}
+
+    monkeypatch.setattr("app.api.routes.analyze_image", mock_image_analyze)
+    monkeypatch.setattr("app.api.routes.analyze_image_url", mock_image_analyze_url)
+    monkeypatch.setattr("app.api.routes.IMAGE_BATCH_CONCURRENCY", 2)
+
+    response = client.post("/api/v1/describe-image/batch/",
+                           files=[
+                               ("files", ("a.png", b"12345", "image/png")),
+                               ("files", ("b.txt", b"text", "text/plain")),
+                               ("files", ("c.png", b"123", "image/png")),
+                               ("files", ("d.png", b"1", "image/png")),
+                           ],
+                           data={"urls": ["https://example.com/logo.png", "ftp://example.com/x.png"]}
+                           )
+
+    assert response.status_code == 200
+    assert response.json()["results"] == [
+        {"index": 0, "source": "a.png", "caption": "caption 5"},
+        {"index": 1, "source": "b.txt", "error": "File must be an image"},
+        {"index": 2, "source": "c.png", "caption": "caption 3"},
+        {"index": 3, "source": "d.png", "caption": "caption 1"},
+        {"index": 4, "source": "https://example.com/logo.png", "caption": "caption for https://example.com/logo.png"},
+        {"index": 5, "source": "ftp://example.com/x.png", "error": "Invalid image URL"},
+    ]
+    assert max(peak) <= 2
+
+def make_bomb():
+    from PIL import Image
+
+    # poucos KB em PNG, mas 400 milhoes de pixels ao decodificar
+    buffer = io.BytesIO()
+    Image.new("1", (20000, 20000)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+def test_describe_image_rejects_decompression_bomb(monkeypatch):
+    async def mock_image_analyze(image_bytes, upload_bytes=None):
+        raise AssertionError("nao deveria chegar ao Azure")
+
+    monkeypatch.setattr("app.api.routes.analyze_image", mock_image_analyze)
+
+    response = client.post("/api/v1/describe-image/", files={"file": ("bomb.png", make_bomb(), "image/png")})
+
+    assert response.status_code == 400
+
+def test_upload_limit_is_enforced_while_receiving():
+    from fastapi import FastAPI, Request
+    from fastapi.testclient import TestClient
+    from app.core.request_limits import BodySizeLimitMiddleware
+
+    limited = FastAPI()
+
+    @limited.post("/upload")
+    async def upload(request: Request):
+        return {"size": len(await request.body())}
+
+    limited.add_middleware(BodySizeLimitMiddleware, limits={"/upload": 10})
+    limited_client = TestClient(limited)
+
+    assert limited_client.post("/upload", content=b"x" * 10).json() == {"size": 10}
+    assert limited_client.post("/upload", content=b"x" * 11).status_code == 413
+    # sem Content-Length: o corpo e interrompido durante a leitura
+    chunks = iter([b"x" * 6, b"x" * 6])
+    assert limited_client.post("/upload", content=chunks).status_code == 413
+
+def test_describe_image_rejects_oversized_body_by_content_length():
+    response = client.post("/api/v1/describe-image/", content=b"x", headers={
+        "Content-Type": "multipart/form-data; boundary=x",
+        "Content-Length": str(100 * 1024 * 1024),
+    })
+    assert response.status_code == 413
+
+def test_dhash_ignores_decompression_bomb():
+    from app.services.caption_cache import dhash
+
+    assert dhash(make_bomb()) is None
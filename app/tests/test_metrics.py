@@ -0,0 +1,65 @@
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+from app.core.metrics import track_upstream
+from app.main import app
+
+client = TestClient(app)
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+def test_http_metrics_use_route_templates():
+    before = sample("http_requests_total", method="GET", route="/health/live", status="200")
+    assert client.get("/health/live").status_code == 200
+    assert client.get("/nao-existe").status_code == 404
+
+    assert sample("http_requests_total", method="GET", route="/health/live", status="200") == before + 1
+    assert sample("http_requests_total", method="GET", route="unmatched", status="404") >= 1
+    assert sample("http_request_duration_seconds_count", method="GET", route="/health/live") >= 1
+    assert sample("http_response_bytes_total", route="/health/live") > 0
+    assert sample("http_requests_in_flight") == 0
+
+def test_upstream_timing_records_errors():
+    def call(fail):
+        with track_upstream("teste", "op"):
+            if fail:
+                raise RuntimeError("falhou")
+
+    call(False)
+    with pytest.raises(RuntimeError):
+        call(True)
+
+    assert sample("upstream_requests_total", upstream="teste", operation="op", outcome="ok") == 1
+    assert sample("upstream_requests_total", upstream="teste", operation="op", outcome="error") == 1
+    assert sample("upstream_request_duration_seconds_count", upstream="teste", operation="op") == 2
+    assert sample("upstream_requests_in_flight", upstream="teste") == 0
+
+def test_translation_upstream_is_timed(monkeypatch):
+    import httpx
+    from app.services import translate_service
+
+    async def handler(request):
+        return httpx.Response(200, json=[{"translations": [{"text": "ola"}]}])
+
+    translator = translate_service.Upstream("azure_translator", max_connections=1, read_timeout=1)
+    translator._async_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(translate_service, "AZURE_TRANSLATE_API_ENDPOINT", "https://translator.invalid")
+    monkeypatch.setattr(translate_service, "AZURE_TRANSLATE_API_KEY", "teste")
+    monkeypatch.setattr(translate_service, "AZURE_API_REGION", "teste")
+    monkeypatch.setattr(translate_service, "translator", translator)
+    before = sample("upstream_requests_total", upstream="azure_translator", operation="translate", outcome="ok")
+    received_before = sample("upstream_bytes_total", upstream="azure_translator", direction="received")
+
+    assert asyncio.run(translate_service._request_translations("pt", ["hello"])) == ["ola"]
+    assert sample("upstream_requests_total", upstream="azure_translator", operation="translate", outcome="ok") == before + 1
+    assert sample("upstream_bytes_total", upstream="azure_translator", direction="received") > received_before
+
+def test_metrics_endpoint_exposes_prometheus_text():
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    for name in ("http_request_duration_seconds_bucket", "upstream_requests_total", 'cache_hits_total{cache="translation"}',
+                 'cache_misses_total{cache="audio"}', 'cache_entries{cache="auth_user"}'):
+        assert name in response.text
@@ -0,0 +1,66 @@
+import pytest
+from app.services.segment_filter import SegmentFilterStats, skip_reason, untranslatable_positions
+
+@pytest.mark.parametrize("text, reason", [
+    ("   ", "empty"),
+    ("42", "no_letters"),
+    ("…", "no_letters"),
+    ("12/05/2024 14:30", "no_letters"),
+    ("R$ 1.299,90", "number"),
+    ("US$ 5", "number"),
+    ("10 EUR", "number"),
+    ("BRL 49,90", "number"),
+    ("https://example.com/page?id=1", "url"),
+    ("www.example.com", "url"),
+    ("contato@example.com.br", "email"),
+    ("snake_case_name", "code"),
+    ("app.main:app", "code"),
+    ("/usr/local/bin", "code"),
+    ("~/.config/app", "code"),
+    ("../src/main.py", "code"),
+    ("C:\\Users\\app", "code"),
+    ("const total = items.length;", "code"),
+    ("if (a == b) { return a; }", "code"),
+    ("안녕하세요", "target_language"),
+])
+def test_skip_reason_detects_untranslatable(text, reason):
+    to_language = "ko" if reason == "target_language" else "pt"
+    assert skip_reason(text, to_language) == reason
+
+@pytest.mark.parametrize("text", [
+    "Read more",
+    "a",
+    "Let me know;",
+    "Price: 10 dollars",
+    "iPhone 15",
+    "NEW 2024",
+    "TOP 10",
+    "FAQ 3",
+    "10 FAQ",
+    "Home/Products/Shoes",
+    "Sim/Não/Talvez",
+    "and/or",
+    "Contact us at the office",
+    "안녕하세요 world",
+])
+def test_skip_reason_keeps_translatable_text(text):
+    assert skip_reason(text, "ko" if "안녕" in text else "pt") is None
+
+def test_detected_language_must_match_full_code():
+    assert skip_reason("Leia mais", "pt", detected_language="pt") == "target_language"
+    assert skip_reason("Leia mais", "pt-PT", detected_language="pt") is None
+
+def test_untranslatable_positions_collects_stats():
+    stats = SegmentFilterStats()
+    texts = ["Share", "42", "https://example.com", "42", "  "]
+
+    assert untranslatable_positions(texts, "pt", "en", stats=stats) == {1, 2, 3, 4}
+    assert stats.segments == 5
+    assert stats.skipped == 4
+    # segmentos repetidos so seriam cobrados uma vez
+    assert stats.chars_saved == len("42") + len("https://example.com")
+    assert stats.reasons == {"no_letters": 2, "url": 1, "empty": 1}
+    assert stats.headers()["X-Translation-Chars-Saved"] == str(stats.chars_saved)
+
+def test_same_source_and_target_language_skips_everything():
+    assert untranslatable_positions(["Leia mais", "Compartilhar"], "pt", "pt") == {0, 1}
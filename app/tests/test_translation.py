@@ -1,12 +1,15 @@
 from fastapi.testclient import TestClient
 from app.main import app
+import asyncio
+import json
+import random
 import pytest
 from app.schemas.translation_schema import Translation_schema
 
 client = TestClient(app)
 
 def test_translation_success(monkeypatch):
-    def mock_translation_success(to_language, text_list, from_language):
+    async def mock_translation_success(to_language, text_list, from_language, stats=None):
         return {"test": "teste", "car": "carro"}
     
     monkeypatch.setattr("app.api.routes.translate_list", mock_translation_success)
@@ -20,4 +23,369 @@ def test_translation_success(monkeypatch):
 
     assert response.status_code == 200
     assert response.json() == {"test":"teste", "car":"carro"} 
-    
+
+def test_translate_list_uses_cache(monkeypatch, tmp_path):
+    from app.services import translate_service
+    from app.services.translation_cache import TranslationCache
+
+    cache = TranslationCache(path=str(tmp_path / "cache.sqlite3"), max_entries=100, ttl_seconds=60)
+    monkeypatch.setattr(translate_service, "translation_cache", cache)
+
+    upstream_calls = []
+    async def mock_request_translations(to_language, text_list, from_language=None):
+        upstream_calls.append(list(text_list))
+        return [text.upper() for text in text_list]
+
+    monkeypatch.setattr(translate_service, "_request_translations", mock_request_translations)
+
+    first = asyncio.run(translate_service.translate_list("pt", ["home", "share"], "en"))
+    second = asyncio.run(translate_service.translate_list("pt", ["home", "about"], "en"))
+
+    assert first == {"home": "HOME", "share": "SHARE"}
+    assert second == {"home": "HOME", "about": "ABOUT"}
+
+    assert upstream_calls == [["home", "share"], ["about"]]
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 3
+
+def test_translation_cache_persists_on_disk(tmp_path):
+    from app.services.translation_cache import TranslationCache
+
+    path = str(tmp_path / "cache.sqlite3")
+    TranslationCache(path=path, max_entries=100, ttl_seconds=60).set_many("en", "pt", {"Read  more": "Leia mais"})
+
+    restarted = TranslationCache(path=path, max_entries=100, ttl_seconds=60)
+    assert restarted.get_many("en", "pt", ["Read more", "Share"]) == {"Read more": "Leia mais"}
+    assert restarted.get_many("en", "es", ["Read more"]) == {}
+    assert restarted.stats()["disk_hits"] == 1
+
+def test_translation_cache_keeps_surrounding_whitespace_of_each_text():
+    from app.services.translation_cache import TranslationCache, normalize_text
+
+    cache = TranslationCache(None, 100, None)
+    cache.set_many("en", "pt", {"Read": "Leia"})
+
+    assert cache.get_many("en", "pt", ["Read ", " Read", "Read"]) == {"Read ": "Leia ", " Read": " Leia", "Read": "Leia"}
+    assert normalize_text("  Line1 \n\n  Line2  ") == "Line1\n\nLine2"
+
+def test_make_batches_respects_limits():
+    from app.services.translate_service import make_batches
+
+    batches = make_batches(["aa", "bbb", "c", "dddd", "ee"], max_elements=2, max_chars=5)
+
+    assert batches == [["aa", "bbb"], ["c", "dddd"], ["ee"]]
+    assert make_batches([], max_elements=2, max_chars=5) == []
+
+def test_translate_list_batches_keep_order(monkeypatch, tmp_path):
+    from app.services import translate_service
+    from app.services.translation_cache import TranslationCache
+
+    monkeypatch.setattr(translate_service, "translation_cache", TranslationCache(None, 100, None))
+    monkeypatch.setattr(translate_service, "TRANSLATE_MAX_ELEMENTS_PER_REQUEST", 3)
+
+    batch_sizes = []
+    async def mock_request_translations(to_language, text_list, from_language=None):
+        batch_sizes.append(len(text_list))
+        await asyncio.sleep(random.random() / 100)
+        return [f"{text}-{to_language}" for text in text_list]
+
+    monkeypatch.setattr(translate_service, "_request_translations", mock_request_translations)
+
+    texts = [f"segment {i}" for i in range(10)]
+    result = asyncio.run(translate_service.translate_list("pt", texts, "en"))
+
+    assert list(result) == texts
+    assert list(result.values()) == [f"{text}-pt" for text in texts]
+    assert sorted(batch_sizes) == [1, 3, 3, 3]
+
+def test_translate_segments_dedupes_and_keeps_positions(monkeypatch):
+    from app.services import translate_service
+    from app.services.translation_cache import TranslationCache
+
+    monkeypatch.setattr(translate_service, "translation_cache", TranslationCache(None, 100, None))
+
+    upstream_calls = []
+    async def mock_request_translations(to_language, text_list, from_language=None):
+        upstream_calls.append(list(text_list))
+        return [text.upper() for text in text_list]
+
+    monkeypatch.setattr(translate_service, "_request_translations", mock_request_translations)
+
+    texts = ["Share", "Read more", "Share", "Read  more"]
+    result = asyncio.run(translate_service.translate_segments("pt", texts, "en"))
+
+    assert result == ["SHARE", "READ MORE", "SHARE", "READ MORE"]
+    assert upstream_calls == [["Share", "Read more"]]
+
+def test_concurrent_requests_share_upstream_call(monkeypatch):
+    from app.services import translate_service
+    from app.services.translation_cache import TranslationCache
+
+    monkeypatch.setattr(translate_service, "translation_cache", TranslationCache(None, 100, None))
+
+    upstream_calls = []
+    async def mock_request_translations(to_language, text_list, from_language=None):
+        upstream_calls.append(list(text_list))
+        await asyncio.sleep(0.05)
+        return [text.upper() for text in text_list]
+
+    monkeypatch.setattr(translate_service, "_request_translations", mock_request_translations)
+
+    async def run_concurrently():
+        return await asyncio.gather(*[
+            translate_service.translate_segments("pt", ["Share", "Home"], "en") for _ in range(5)
+        ])
+
+    results = asyncio.run(run_concurrently())
+
+    assert results == [["SHARE", "HOME"]] * 5
+    assert upstream_calls == [["Share", "Home"]]
+    assert translate_service._in_flight == {}
+
+def test_upstream_error_is_shared_with_waiters(monkeypatch):
+    from app.services import translate_service
+    from app.services.translation_cache import TranslationCache
+
+    monkeypatch.setattr(translate_service, "translation_cache", TranslationCache(None, 100, None))
+
+    async def mock_request_translations(to_language, text_list, from_language=None):
+        await asyncio.sleep(0.01)
+        raise Exception("Erro 429: too many requests")
+
+    monkeypatch.setattr(translate_service, "_request_translations", mock_request_translations)
+
+    async def run_concurrently():
+        return await asyncio.gather(*[
+            translate_service.translate_segments("pt", ["Share"], "en") for _ in range(3)
+        ], return_exceptions=True)
+
+    results = asyncio.run(run_concurrently())
+
+    assert all(str(result) == "Erro 429: too many requests" for result in results)
+    assert translate_service._in_flight == {}
+
+def test_translation_stream(monkeypatch):
+    async def mock_translation_stream(to_language, text_list, from_language):
+        for index in reversed(range(len(text_list))):
+            yield index, text_list[index].upper()
+
+    monkeypatch.setattr("app.api.routes.translate_stream", mock_translation_stream)
+
+    fake_translation_schema = Translation_schema(from_language="en",
+                                                 text_list=["test", "car", "test"],
+                                                 to_language="pt")
+
+    with client.stream("POST", "/api/v1/translate/stream", json=fake_translation_schema.model_dump()) as response:
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/x-ndjson"
+        records = [json.loads(line) for line in response.iter_lines() if line]
+
+    assert records == [
+        {"index": 2, "translation": "TEST"},
+        {"index": 1, "translation": "CAR"},
+        {"index": 0, "translation": "TEST"},
+    ]
+
+def test_translation_stream_reports_early_failures(monkeypatch):
+    from app.core.upstream import UpstreamUnavailable
+
+    async def mock_translation_stream(to_language, text_list, from_language):
+        raise UpstreamUnavailable("azure_translator", 12)
+        yield
+
+    async def mock_failing_later(to_language, text_list, from_language):
+        yield 0, "TEST"
+        raise RuntimeError("Erro 500: upstream")
+
+    monkeypatch.setattr("app.api.routes.translate_stream", mock_translation_stream)
+    body = {"from_language": "en", "text_list": ["test", "car"], "to_language": "pt"}
+
+    response = client.post("/api/v1/translate/stream", json=body)
+
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "12"
+
+    monkeypatch.setattr("app.api.routes.translate_stream", mock_failing_later)
+    response = client.post("/api/v1/translate/stream", json=body)
+
+    assert response.status_code == 200
+    assert [json.loads(line) for line in response.text.splitlines()] == [
+        {"index": 0, "translation": "TEST"},
+        {"error": "Erro 500: upstream"},
+    ]
+
+def test_translate_stream_fans_out_duplicates(monkeypatch):
+    from app.services import translate_service
+    from app.services.translation_cache import TranslationCache
+
+    monkeypatch.setattr(translate_service, "translation_cache", TranslationCache(None, 100, None))
+
+    async def mock_request_translations(to_language, text_list, from_language=None):
+        return [text.upper() for text in text_list]
+
+    monkeypatch.setattr(translate_service, "_request_translations", mock_request_translations)
+
+    async def collect():
+        return [item async for item in translate_service.translate_stream("pt", ["a", "b", "a"], "en")]
+
+    assert sorted(asyncio.run(collect())) == [(0, "A"), (1, "B"), (2, "A")]
+
+def fake_azure_translate(monkeypatch, calls):
+    import httpx
+    from app.services import translate_service
+    from app.services.translation_cache import TranslationCache
+
+    monkeypatch.setattr(translate_service, "translation_cache", TranslationCache(None, 100, None))
+
+    async def mock_request(method, url, operation, params=None, headers=None, json=None):
+        calls.append([item["text"] for item in json])
+        detected = {} if params.get("from") else {"detectedLanguage": {"language": "en", "score": 1.0}}
+        return httpx.Response(200, json=[
+            {**detected, "translations": [{"text": item["text"].upper(), "to": params["to"][0]}]} for item in json
+        ])
+
+    monkeypatch.setattr(translate_service.translator, "request", mock_request)
+    monkeypatch.setattr(translate_service, "AZURE_TRANSLATE_API_ENDPOINT", "https://translator.invalid")
+    monkeypatch.setattr(translate_service, "AZURE_TRANSLATE_API_KEY", "teste")
+    monkeypatch.setattr(translate_service, "AZURE_API_REGION", "teste")
+
+def test_translation_compact_format(monkeypatch):
+    calls = []
+    fake_azure_translate(monkeypatch, calls)
+
+    response = client.post("/api/v1/translate/", json={
+        "text_list": ["car", "house", "car"],
+        "to_language": "pt",
+        "format": "compact",
+        "include_detected_language": True,
+    })
+
+    assert response.status_code == 200
+    assert response.json() == {"translations": ["CAR", "HOUSE", "CAR"], "detected_languages": ["en", "en", "en"]}
+    assert calls == [["car", "house"]]
+
+def test_translation_compact_without_detected_language(monkeypatch):
+    fake_azure_translate(monkeypatch, [])
+
+    response = client.post("/api/v1/translate/", json={
+        "from_language": "en", "text_list": ["car"], "to_language": "pt", "format": "compact",
+    })
+
+    assert response.json() == {"translations": ["CAR"]}
+
+@pytest.mark.parametrize("accept_encoding, expected", [("gzip", "gzip"), ("gzip, br", "br"), ("br;q=0, gzip", "gzip")])
+def test_large_translation_response_is_compressed(monkeypatch, accept_encoding, expected):
+    fake_azure_translate(monkeypatch, [])
+    text_list = [f"segment {i}" for i in range(200)]
+
+    response = client.post("/api/v1/translate/", headers={"Accept-Encoding": accept_encoding}, json={
+        "from_language": "en", "text_list": text_list, "to_language": "pt", "format": "compact",
+    })
+
+    assert response.headers["content-encoding"] == expected
+    assert response.json() == {"translations": [text.upper() for text in text_list]}
+
+def test_small_translation_response_is_not_compressed(monkeypatch):
+    fake_azure_translate(monkeypatch, [])
+
+    response = client.post("/api/v1/translate/", headers={"Accept-Encoding": "gzip, br"}, json={
+        "from_language": "en", "text_list": ["car"], "to_language": "pt",
+    })
+
+    assert "content-encoding" not in response.headers
+    assert response.json() == {"car": "CAR"}
+
+def test_untranslatable_segments_skip_upstream(monkeypatch):
+    calls = []
+    fake_azure_translate(monkeypatch, calls)
+
+    response = client.post("/api/v1/translate/", json={
+        "from_language": "en",
+        "text_list": ["Read more", "R$ 10,00", "https://example.com", "Read more", " "],
+        "to_language": "pt",
+        "format": "compact",
+    })
+
+    assert response.json() == {"translations": ["READ MORE", "R$ 10,00", "https://example.com", "READ MORE", " "]}
+    assert calls == [["Read more"]]
+    assert response.headers["x-translation-segments"] == "5"
+    assert response.headers["x-translation-segments-skipped"] == "3"
+    assert response.headers["x-translation-chars-saved"] == str(len("R$ 10,00") + len("https://example.com"))
+
+def test_text_detected_in_target_language_is_not_translated_again(monkeypatch):
+    from app.services import translate_service
+
+    calls = []
+    fake_azure_translate(monkeypatch, calls)
+    translate_service.translation_cache.set_detected_many({"Obrigado": "pt"})
+
+    async def run():
+        return await translate_service.translate_segments("pt", ["Obrigado", "Thanks"])
+
+    assert asyncio.run(run()) == ["Obrigado", "THANKS"]
+    assert calls == [["Thanks"]]
+
+def test_translate_stream_passes_untranslatable_segments_through(monkeypatch):
+    from app.services import translate_service
+
+    calls = []
+    fake_azure_translate(monkeypatch, calls)
+
+    async def collect():
+        return [item async for item in translate_service.translate_stream("pt", ["42", "car"], "en")]
+
+    assert sorted(asyncio.run(collect())) == [(0, "42"), (1, "CAR")]
+    assert calls == [["car"]]
+
+def test_translation_keeps_whitespace_and_line_breaks(monkeypatch):
+    from app.services import translate_service
+
+    calls = []
+    fake_azure_translate(monkeypatch, calls)
+
+    texts = ["Read ", " more", "Line1\n\nLine2"]
+    result = asyncio.run(translate_service.translate_list("pt", texts, "en"))
+
+    assert result == {"Read ": "READ ", " more": " MORE", "Line1\n\nLine2": "LINE1\n\nLINE2"}
+    assert calls == [["Read", "more", "Line1\n\nLine2"]]
+
+    async def collect():
+        return [item async for item in translate_service.translate_stream("pt", ["Read ", " Read"], "en")]
+
+    assert sorted(asyncio.run(collect())) == [(0, "READ "), (1, " READ")]
+
+def test_detected_language_survives_restart(monkeypatch, tmp_path):
+    from app.services import translate_service
+    from app.services.translation_cache import TranslationCache
+
+    calls = []
+    fake_azure_translate(monkeypatch, calls)
+    path = str(tmp_path / "cache.sqlite3")
+    monkeypatch.setattr(translate_service, "translation_cache", TranslationCache(path, 100, None))
+    asyncio.run(translate_service.translate_compact("pt", ["car"], include_detected_language=True))
+
+    # novo processo (ou outro worker): so o arquivo sqlite e compartilhado
+    monkeypatch.setattr(translate_service, "translation_cache", TranslationCache(path, 100, None))
+    result = asyncio.run(translate_service.translate_compact("pt", ["car"], include_detected_language=True))
+
+    assert result == {"translations": ["CAR"], "detected_languages": ["en"]}
+    assert calls == [["car"]]
+
+def test_translation_cache_adds_detected_language_column(tmp_path):
+    import sqlite3
+    from app.services.translation_cache import TranslationCache
+
+    path = str(tmp_path / "old.sqlite3")
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE translations (from_language TEXT NOT NULL, to_language TEXT NOT NULL, source TEXT NOT NULL,"
+        " translation TEXT NOT NULL, created_at REAL NOT NULL, PRIMARY KEY (from_language, to_language, source))"
+        " WITHOUT ROWID"
+    )
+    conn.execute("INSERT INTO translations VALUES ('en', 'pt', 'Share', 'Compartilhar', 9e9)")
+    conn.commit()
+    conn.close()
+
+    cache = TranslationCache(path, 100, None)
+    assert cache.get_many("en", "pt", ["Share"]) == {"Share": "Compartilhar"}
+    assert cache.detected_languages(["Share"]) == [None]
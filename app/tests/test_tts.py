@@ -3,7 +3,13 @@ import tempfile
 import pygame
 import time
 import os
-from app.services.tts_service import TextToSpeechService
+import json
+import zipfile
+from io import BytesIO
+from fastapi.testclient import TestClient
+from app.main import app
+from app.services.audio_cache import AudioCache
+from app.services.tts_service import TextToSpeechService, split_sentences
 
 class TestTextToSpeechService:
     def setup_method(self):
@@ -43,3 +49,177 @@ class TestTextToSpeechService:
         finally:
             os.remove(temp_file_path)
 
+
+class FakeTTS:
+    calls = []
+
+    def __init__(self, text, lang, tld):
+        self.text = text
+        FakeTTS.calls.append((text, lang, tld))
+
+    def write_to_fp(self, fp):
+        fp.write(f"mp3:{self.text}".encode())
+
+
+class TestAudioCache:
+    def setup_method(self):
+        FakeTTS.calls = []
+
+    @pytest.fixture(autouse=True)
+    def fresh_breaker(self, monkeypatch):
+        # o teste com rede de verdade pode ter aberto o circuito do gTTS
+        from app.core.upstream import CircuitBreaker
+        from app.services.tts_service import google_tts
+
+        breaker = google_tts.breaker
+        monkeypatch.setattr(google_tts, "breaker",
+                            CircuitBreaker(breaker.name, breaker.failure_threshold, breaker.reset_timeout))
+
+    def test_repeated_text_is_synthesized_once(self, monkeypatch, tmp_path):
+        monkeypatch.setattr("app.services.tts_service.gTTS", FakeTTS)
+        service = TextToSpeechService(AudioCache(str(tmp_path), max_bytes=1024))
+
+        first_path = service.get_audio_file("Olá, tudo bem?")
+        second_path = service.get_audio_file("Olá, tudo bem?")
+        service.get_audio_file("Olá, tudo bem?", lang="en", tld="com")
+
+        assert first_path == second_path
+        assert service.convert_text_to_audio("Olá, tudo bem?").read() == "mp3:Olá, tudo bem?".encode()
+        assert FakeTTS.calls == [("Olá, tudo bem?", "pt", "com.br"), ("Olá, tudo bem?", "en", "com")]
+
+    def test_least_recently_used_audio_is_evicted(self, monkeypatch, tmp_path):
+        monkeypatch.setattr("app.services.tts_service.gTTS", FakeTTS)
+        cache = AudioCache(str(tmp_path), max_bytes=20)
+        service = TextToSpeechService(cache)
+
+        oldest = service.get_audio_file("um")
+        recent = service.get_audio_file("dois")
+        service.get_audio_file("um")
+        service.get_audio_file("tres")
+
+        assert os.path.exists(oldest)
+        assert not os.path.exists(recent)
+        assert cache.stats()["bytes"] <= 20
+
+    def test_cache_size_is_shared_between_workers(self, monkeypatch, tmp_path):
+        monkeypatch.setattr("app.services.tts_service.gTTS", FakeTTS)
+        # dois workers com o mesmo diretorio, cada um com seu proprio indice
+        first = TextToSpeechService(AudioCache(str(tmp_path), max_bytes=20, rescan_interval=0))
+        second = TextToSpeechService(AudioCache(str(tmp_path), max_bytes=20, rescan_interval=0))
+
+        oldest = first.get_audio_file("um")
+        first.get_audio_file("dois")
+        second.get_audio_file("tres")
+
+        assert not os.path.exists(oldest)
+        assert sum(path.stat().st_size for path in tmp_path.rglob("*.mp3")) <= 20
+        assert second.cache.stats()["bytes"] <= 20
+
+    def test_audio_evicted_by_another_worker_is_synthesized_again(self, monkeypatch, tmp_path):
+        monkeypatch.setattr("app.services.tts_service.gTTS", FakeTTS)
+        service = TextToSpeechService(AudioCache(str(tmp_path), max_bytes=1024))
+
+        os.remove(service.get_audio_file("Menu"))
+        with service.open_audio_file("Menu") as audio_file:
+            # o arquivo aberto continua legivel depois de removido
+            os.remove(audio_file.name)
+            assert audio_file.read() == b"mp3:Menu"
+
+        assert len(FakeTTS.calls) == 2
+
+    def test_convert_audio_route_serves_cached_file(self, monkeypatch, tmp_path):
+        monkeypatch.setattr("app.services.tts_service.gTTS", FakeTTS)
+        monkeypatch.setattr("app.api.routes.tts_service", TextToSpeechService(AudioCache(str(tmp_path), 1024)))
+        client = TestClient(app)
+
+        for _ in range(2):
+            response = client.post("/api/v1/convert-audio/", params={"text": "Bem-vindo"})
+            assert response.status_code == 200
+            assert response.headers["content-type"] == "audio/mpeg"
+            assert response.content == b"mp3:Bem-vindo"
+
+        assert len(FakeTTS.calls) == 1
+
+    def test_convert_audio_route_reports_open_circuit(self, monkeypatch, tmp_path):
+        from app.services.tts_service import google_tts
+
+        monkeypatch.setattr("app.services.tts_service.gTTS", FakeTTS)
+        monkeypatch.setattr("app.api.routes.tts_service", TextToSpeechService(AudioCache(str(tmp_path), 1024)))
+        google_tts.breaker.record_failure(open_for=30)
+        client = TestClient(app)
+
+        response = client.post("/api/v1/convert-audio/", params={"text": "Bem-vindo"})
+
+        assert response.status_code == 503
+        assert int(response.headers["retry-after"]) >= 29
+        assert not list(tmp_path.rglob("*.mp3"))
+
+    def test_split_sentences(self):
+        text = "Primeira frase. Segunda frase!  Terceira?\nQuarta linha"
+
+        assert split_sentences(text) == ["Primeira frase.", "Segunda frase!", "Terceira?", "Quarta linha"]
+
+    def test_gtts_base_url_override(self, monkeypatch):
+        from app.services import tts_service
+
+        monkeypatch.setattr(tts_service, "GTTS_BASE_URL", "http://127.0.0.1:9000/")
+        prepared = tts_service.gTTS(text="Olá", lang="pt", tld="com.br")._prepare_requests()
+
+        assert prepared[0].url == "http://127.0.0.1:9000/_/TranslateWebserverUi/data/batchexecute"
+
+    def test_stream_yields_sentences_in_order(self, monkeypatch, tmp_path):
+        monkeypatch.setattr("app.services.tts_service.gTTS", FakeTTS)
+        service = TextToSpeechService(AudioCache(str(tmp_path), 1024))
+
+        chunks = list(service.stream_text_to_audio("Um. Dois. Três. Um."))
+
+        assert chunks == [b"mp3:Um.", b"mp3:Dois.", "mp3:Três.".encode(), b"mp3:Um."]
+        assert len(FakeTTS.calls) == 3
+
+    def test_convert_audio_stream_route(self, monkeypatch, tmp_path):
+        monkeypatch.setattr("app.services.tts_service.gTTS", FakeTTS)
+        monkeypatch.setattr("app.api.routes.tts_service", TextToSpeechService(AudioCache(str(tmp_path), 1024)))
+        client = TestClient(app)
+
+        response = client.post("/api/v1/convert-audio/stream/", params={"text": "Olá. Tudo bem?"})
+        empty_response = client.post("/api/v1/convert-audio/stream/", params={"text": "  "})
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "audio/mpeg"
+        assert response.content == "mp3:Olá.mp3:Tudo bem?".encode()
+        assert empty_response.status_code == 400
+
+    def test_convert_audio_stream_reports_early_failures(self, monkeypatch, tmp_path):
+        class FailingTTS(FakeTTS):
+            def write_to_fp(self, fp):
+                raise ValueError("Language not supported")
+
+        monkeypatch.setattr("app.services.tts_service.gTTS", FailingTTS)
+        monkeypatch.setattr("app.api.routes.tts_service", TextToSpeechService(AudioCache(str(tmp_path), 1024)))
+        client = TestClient(app)
+
+        response = client.post("/api/v1/convert-audio/stream/", params={"text": "Olá. Tudo bem?"})
+
+        assert response.status_code == 400
+        assert response.json() == {"detail": "Language not supported"}
+
+    def test_convert_audio_batch_route(self, monkeypatch, tmp_path):
+        monkeypatch.setattr("app.services.tts_service.gTTS", FakeTTS)
+        monkeypatch.setattr("app.api.routes.tts_service", TextToSpeechService(AudioCache(str(tmp_path), 1024)))
+        client = TestClient(app)
+
+        response = client.post("/api/v1/convert-audio/batch/", json={"texts": ["Menu", " ", "Rodapé", "Menu"]})
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/zip"
+        with zipfile.ZipFile(BytesIO(response.content)) as archive:
+            index = json.loads(archive.read("index.json"))
+            assert index == [
+                {"index": 0, "file": "0.mp3"},
+                {"index": 1, "error": "Text cannot be empty."},
+                {"index": 2, "file": "2.mp3"},
+                {"index": 3, "file": "0.mp3"},
+            ]
+            assert archive.read("0.mp3") == b"mp3:Menu"
+            assert archive.read("2.mp3") == "mp3:Rodapé".encode()
+        assert len(FakeTTS.calls) == 2
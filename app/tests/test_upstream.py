@@ -0,0 +1,128 @@
+import asyncio
+import time
+import httpx
+import pytest
+from email.utils import formatdate
+from fastapi.testclient import TestClient
+from app.core.upstream import CircuitBreaker, Upstream, UpstreamUnavailable, parse_retry_after
+
+def make_upstream(handler, **kwargs):
+    options = {"max_connections": 2, "read_timeout": 1, "backoff_base": 0, "breaker_failures": 3, "breaker_reset": 60}
+    upstream = Upstream("teste", **{**options, **kwargs})
+    upstream._async_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    upstream._sync_client = httpx.Client(transport=httpx.MockTransport(handler))
+    return upstream
+
+def scripted(*responses):
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        response = responses[min(len(calls), len(responses)) - 1]
+        if isinstance(response, Exception):
+            raise response
+        return response
+    return handler, calls
+
+def test_retries_transient_failures_honoring_retry_after():
+    handler, calls = scripted(httpx.Response(503, headers={"Retry-After": "0"}),
+                              httpx.ConnectError("recusada"),
+                              httpx.Response(200, json={"ok": True}))
+    upstream = make_upstream(handler)
+
+    response = asyncio.run(upstream.request("GET", "https://upstream.invalid/x", "op"))
+
+    assert response.json() == {"ok": True}
+    assert len(calls) == 3
+    assert upstream.stats() == {"state": "closed", "consecutive_failures": 0}
+
+def test_gives_up_after_max_retries_and_returns_last_response():
+    handler, calls = scripted(httpx.Response(502))
+    upstream = make_upstream(handler, max_retries=2)
+
+    assert asyncio.run(upstream.request("GET", "https://upstream.invalid/x", "op")).status_code == 502
+    assert len(calls) == 3
+    assert upstream.breaker.failures == 1
+
+def test_client_errors_are_not_retried_and_do_not_trip_the_breaker():
+    handler, calls = scripted(httpx.Response(400))
+    upstream = make_upstream(handler, breaker_failures=1)
+
+    for _ in range(3):
+        assert upstream.request_sync("GET", "https://upstream.invalid/x", "op").status_code == 400
+    assert len(calls) == 3
+    assert upstream.stats()["state"] == "closed"
+
+def test_long_retry_after_fails_fast_and_opens_the_circuit():
+    handler, calls = scripted(httpx.Response(429, headers={"Retry-After": "120"}))
+    upstream = make_upstream(handler, backoff_max=5)
+
+    assert upstream.request_sync("GET", "https://upstream.invalid/x", "op").status_code == 429
+    with pytest.raises(UpstreamUnavailable) as rejected:
+        upstream.request_sync("GET", "https://upstream.invalid/x", "op")
+
+    assert len(calls) == 1
+    assert rejected.value.retry_after > 100
+
+def test_breaker_opens_then_lets_one_probe_through():
+    handler, calls = scripted(*[httpx.ConnectError("fora do ar")] * 2, httpx.Response(200))
+    upstream = make_upstream(handler, max_retries=0, breaker_failures=2, breaker_reset=0.05)
+
+    async def scenario():
+        for _ in range(2):
+            with pytest.raises(httpx.ConnectError):
+                await upstream.request("GET", "https://upstream.invalid/x", "op")
+        with pytest.raises(UpstreamUnavailable):
+            await upstream.request("GET", "https://upstream.invalid/x", "op")
+        state_while_open = upstream.stats()["state"]
+        await asyncio.sleep(0.06)
+        probe = await upstream.request("GET", "https://upstream.invalid/x", "op")
+        return state_while_open, probe.status_code
+
+    assert asyncio.run(scenario()) == ("open", 200)
+    assert len(calls) == 3
+    assert upstream.stats()["state"] == "closed"
+
+def test_only_the_probe_call_owns_the_half_open_state():
+    breaker = CircuitBreaker("teste_sonda", failure_threshold=1, reset_timeout=0.01)
+    # chamada lenta iniciada com o circuito fechado
+    stale = breaker.before_call()
+    breaker.record_failure(probe=None)
+    time.sleep(0.02)
+
+    probe = breaker.before_call()
+    assert probe is not None
+    # a chamada antiga termina: nao libera a sonda nem conta sua falha como a dela
+    breaker.record_failure(probe=stale)
+    breaker.release(stale)
+    assert breaker.state == "half_open"
+    with pytest.raises(UpstreamUnavailable):
+        breaker.before_call()
+
+    breaker.record_failure(probe=probe)
+    breaker.release(probe)
+    assert breaker.state == "open"
+
+def test_parse_retry_after():
+    assert parse_retry_after("3") == 3.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("amanha") is None
+    assert 50 < parse_retry_after(formatdate(time.time() + 60, usegmt=True)) <= 60
+
+def test_open_translator_circuit_returns_503(monkeypatch):
+    from app.main import app
+    from app.services import translate_service
+
+    translator = Upstream("azure_translator", max_connections=1, read_timeout=1)
+    translator.breaker.record_failure(open_for=30)
+    monkeypatch.setattr(translate_service, "translator", translator)
+    monkeypatch.setattr(translate_service, "AZURE_TRANSLATE_API_ENDPOINT", "https://translator.invalid")
+    monkeypatch.setattr(translate_service, "AZURE_TRANSLATE_API_KEY", "teste")
+    monkeypatch.setattr(translate_service, "AZURE_API_REGION", "teste")
+
+    response = TestClient(app).post("/api/v1/translate/", json={
+        "from_language": "pt", "to_language": "en", "text_list": ["circuito aberto"],
+    })
+
+    assert response.status_code == 503
+    assert 0 < int(response.headers["Retry-After"]) <= 30
@@ -0,0 +1,118 @@
+from fastapi.testclient import TestClient
+from app.main import app
+from app.services.local_intent_matcher import LocalIntentMatcher, DEFAULT_PHRASES
+from app.services.wit_nlu_service import WitNLUConfig, WitNLUService, get_wit_nlu_service
+import asyncio
+import pytest
+
+client = TestClient(app)
+
+def make_matcher(phrases=DEFAULT_PHRASES):
+    return LocalIntentMatcher(phrases, WitNLUConfig.INTENTS, WitNLUConfig.ENTITY_INTENT_ROLES)
+
+@pytest.mark.parametrize("text, intent, action", [
+    ("voltar", "go_back", "go_back"),
+    ("  Ajuda! ", "show_help", "show_help"),
+    ("AUMENTAR zoom", "zoom", "zoom_in"),
+    ("rolar para baixo", "navigate", "scroll_down"),
+    ("próximo", "navigate", "navigate_next"),
+])
+def test_local_matcher_simple_commands(text, intent, action):
+    command = make_matcher().match(text)
+
+    assert command.intent == intent
+    assert command.action == action
+    assert command.target is None
+
+def test_local_matcher_extracts_target():
+    command = make_matcher().match("Clicar em o botão Contato")
+
+    assert command.intent == "click"
+    assert command.action == "click"
+    assert command.target == "botão Contato"
+
+@pytest.mark.parametrize("text", ["voltar para o início", "clicar em", "abrir o menu lateral", ""])
+def test_local_matcher_falls_back_when_unsure(text):
+    assert make_matcher().match(text) is None
+
+def test_local_matcher_rejects_invalid_phrase():
+    with pytest.raises(ValueError):
+        make_matcher([{"phrase": "pular", "intent": "navigate", "action": "jump"}])
+
+def test_voice_command_uses_local_match_before_wit(monkeypatch):
+    wit_requests = []
+    async def mock_wit_request(self, text):
+        wit_requests.append(text)
+        return {"intents": [{"name": "read", "confidence": 0.9}], "entities": {}}
+
+    monkeypatch.setattr(WitNLUService, "_make_wit_request_async", mock_wit_request)
+    get_wit_nlu_service().cache.clear()
+
+    local_response = client.post("/api/v1/voice-navigation/command", json={"text": "diminuir zoom"})
+    wit_response = client.post("/api/v1/voice-navigation/command", json={"text": "o que tem nessa página"})
+
+    assert local_response.json() == {"intent": "zoom", "action": "zoom_out", "target": None, "confidence": 0.99}
+    assert wit_response.json()["intent"] == "read"
+    assert wit_requests == ["o que tem nessa página"]
+
+def test_wit_responses_cached_by_normalized_text(monkeypatch):
+    service = WitNLUService(token="test-token")
+    wit_requests = []
+    def mock_wit_request(text):
+        wit_requests.append(text)
+        return {
+            "intents": [{"name": "navigate", "confidence": 0.95}],
+            "entities": {"browse_elements:browse_elements": [
+                {"name": "browse_elements", "role": "navigate_to", "value": "contato"}
+            ]},
+        }
+
+    async def mock_wit_request_async(text):
+        return mock_wit_request(text)
+
+    monkeypatch.setattr(service, "_make_wit_request", mock_wit_request)
+    monkeypatch.setattr(service, "_make_wit_request_async", mock_wit_request_async)
+
+    first = service.process_command("Quero a página de Contato")
+    second = service.process_command("  quero a   pagina de contato ")
+    third = asyncio.run(service.process_command_async("QUERO A PÁGINA DE CONTATO"))
+
+    assert first == second == third
+    assert first.action == "navigate_to"
+    assert first.target == "contato"
+    assert wit_requests == ["Quero a página de Contato"]
+
+def test_wit_errors_are_not_cached(monkeypatch):
+    service = WitNLUService(token="test-token")
+    def failing_wit_request(text):
+        raise RuntimeError("Falha na comunicação com Wit.ai")
+
+    monkeypatch.setattr(service, "_make_wit_request", failing_wit_request)
+
+    assert service.process_command("abrir menu").intent == "unknown"
+    assert len(service.cache) == 0
+
+def test_voice_navigation_service_is_shared():
+    assert get_wit_nlu_service() is get_wit_nlu_service()
+
+def test_voice_navigation_websocket_pipelines_commands(monkeypatch):
+    from app.schemas.voice_command_schema import VoiceCommand
+
+    async def mock_process_command_async(text):
+        await asyncio.sleep(0.05 if text == "lento" else 0)
+        return VoiceCommand(intent="read", action="read", target=text, confidence=0.9)
+
+    monkeypatch.setattr(get_wit_nlu_service(), "process_command_async", mock_process_command_async)
+
+    with client.websocket_connect("/api/v1/voice-navigation/ws") as websocket:
+        websocket.send_json({"id": 1, "text": "lento"})
+        websocket.send_json({"id": "b", "text": "rápido"})
+        websocket.send_text("not json")
+        responses = [websocket.receive_json() for _ in range(3)]
+
+    by_id = {response["id"]: response for response in responses}
+    assert "error" in by_id[None]
+    assert by_id["b"]["command"] == {"intent": "read", "action": "read", "target": "rápido", "confidence": 0.9}
+    assert by_id[1]["command"] == {"intent": "read", "action": "read", "target": "lento", "confidence": 0.9}
+    # o comando lento nao bloqueia os seguintes
+    assert responses.index(by_id["b"]) < responses.index(by_id[1])
@@ -0,0 +1,90 @@
+"""Local stand-ins for Azure Translator, Azure Vision, Wit.ai and the gTTS endpoint.
+
+Latency and failures are injected from the environment:
+FAKE_LATENCY_MS (mean added latency), FAKE_JITTER_MS (uniform +/- jitter) and
+FAKE_ERROR_RATE (fraction of calls answered with 503).
+"""
+import asyncio
+import base64
+import json
+import os
+import random
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+LATENCY_MS = float(os.getenv("FAKE_LATENCY_MS", "50"))
+JITTER_MS = float(os.getenv("FAKE_JITTER_MS", "10"))
+ERROR_RATE = float(os.getenv("FAKE_ERROR_RATE", "0"))
+
+# quadro MP3 silencioso repetido: o conteudo so precisa ter um tamanho realista
+_MP3_FRAME = bytes.fromhex("fff3e4c4") + bytes(140)
+_AUDIO = base64.b64encode(_MP3_FRAME * 40).decode("ascii")
+
+app = FastAPI()
+
+
+async def _simulate():
+    delay = max(0.0, LATENCY_MS + random.uniform(-JITTER_MS, JITTER_MS)) / 1000
+    await asyncio.sleep(delay)
+    if random.random() < ERROR_RATE:
+        return JSONResponse(status_code=503, content={"error": "injected failure"}, headers={"Retry-After": "1"})
+    return None
+
+
+@app.get("/health/ready")
+async def ready():
+    return {"status": "ready"}
+
+
+@app.post("/translate")
+async def translate(request: Request):
+    failure = await _simulate()
+    if failure:
+        return failure
+    to_language = request.query_params.get("to", "en")
+    body = await request.json()
+    results = []
+    for item in body:
+        result = {"translations": [{"text": f"[{to_language}] {item['text']}", "to": to_language}]}
+        if "from" not in request.query_params:
+            result["detectedLanguage"] = {"language": "pt", "score": 1.0}
+        results.append(result)
+    return results
+
+
+@app.post("/computervision/imageanalysis:analyze")
+async def analyze_image(request: Request):
+    failure = await _simulate()
+    if failure:
+        return failure
+    size = len(await request.body())
+    return {
+        "modelVersion": "2023-10-01",
+        "metadata": {"width": 64, "height": 64},
+        "captionResult": {"text": f"a synthetic image of {size} bytes", "confidence": 0.9},
+    }
+
+
+@app.get("/message")
+async def wit_message(q: str = ""):
+    failure = await _simulate()
+    if failure:
+        return failure
+    return {
+        "text": q,
+        "intents": [{"id": "1", "name": "navigate", "confidence": 0.97}],
+        "entities": {
+            "scroll:scroll": [{"id": "2", "name": "scroll", "role": "scroll_down", "value": "baixo", "confidence": 0.95}],
+        },
+        "traits": {},
+    }
+
+
+@app.post("/_/TranslateWebserverUi/data/batchexecute")
+async def gtts_batchexecute():
+    failure = await _simulate()
+    if failure:
+        return failure
+    # mesmo formato de linha que o gTTS procura na resposta do Google Tradutor
+    payload = json.dumps([["wrb.fr", "jQ1olc", json.dumps([_AUDIO]), None, None, None, "generic"]], separators=(",", ":"))
+    return PlainTextResponse(f")]}}'\n\n{len(payload)}\n{payload}\n")
@@ -0,0 +1,309 @@
+"""Benchmark the API against local fake upstreams.
+
+    python -m benchmarks.run --concurrency 1,8,32 --requests 200
+    python -m benchmarks.run --save-baseline
+    python -m benchmarks.run --compare          # exits 1 on regressions
+
+Results are written to benchmarks/results/; the baseline lives in benchmarks/baseline.json.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+import httpx
+import websockets
+from benchmarks.scenarios import SCENARIOS, Scenario
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+BASELINE_PATH = os.path.join(ROOT, "benchmarks", "baseline.json")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(app_path: str, port: int, env: Dict[str, str], workers: int = 1) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", app_path, "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning", "--no-access-log"],
+        cwd=ROOT, env={**os.environ, **env},
+    )
+
+
+def rss_mb(pid: int) -> Optional[float]:
+    """Resident memory of `pid` and its children (uvicorn workers), from /proc"""
+    total = 0
+    pids = [pid]
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as children:
+            pids += [int(child) for child in children.read().split()]
+        for current in pids:
+            with open(f"/proc/{current}/status") as status:
+                for line in status:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1])
+    except OSError:
+        return None
+    return total / 1024
+
+
+async def wait_until_ready(base_url: str, timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get("/health/ready")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.1)
+    raise RuntimeError(f"{base_url} did not become ready in {timeout}s")
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+async def run_http(client: httpx.AsyncClient, scenario: Scenario, token: str, total: int, concurrency: int,
+                   latencies: List[float]) -> int:
+    counter = iter(range(total))
+    errors = 0
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            started = time.perf_counter()
+            try:
+                response = await client.request(scenario.method, scenario.path, **scenario.build(i, token))
+                await response.aread()
+                failed = response.status_code not in scenario.expected_status
+            except httpx.HTTPError:
+                failed = True
+            latencies.append(time.perf_counter() - started)
+            errors += failed
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return errors
+
+
+async def run_websocket(ws_url: str, scenario: Scenario, token: str, total: int, concurrency: int,
+                        latencies: List[float]) -> int:
+    counter = iter(range(total))
+    errors = 0
+
+    async def worker():
+        nonlocal errors
+        # uma conexao por cliente; a latencia e o tempo de ida e volta de cada comando
+        async with websockets.connect(ws_url + scenario.path) as connection:
+            for i in counter:
+                started = time.perf_counter()
+                await connection.send(json.dumps(scenario.build(i, token)))
+                reply = json.loads(await connection.recv())
+                latencies.append(time.perf_counter() - started)
+                errors += "error" in reply
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return errors
+
+
+async def measure(base_url: str, server_pid: int, scenario: Scenario, token: str, total: int,
+                  concurrency: int, warmup: int) -> Dict[str, float]:
+    latencies: List[float] = []
+    peak_rss = rss_mb(server_pid)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        async def run(count, sink):
+            if scenario.websocket:
+                return await run_websocket(base_url.replace("http", "ws", 1), scenario, token, count, concurrency, sink)
+            return await run_http(client, scenario, token, count, concurrency, sink)
+
+        if warmup:
+            await run(warmup, [])
+
+        async def sample_memory():
+            nonlocal peak_rss
+            while True:
+                current = rss_mb(server_pid)
+                if current is not None:
+                    peak_rss = max(peak_rss or 0, current)
+                await asyncio.sleep(0.1)
+
+        sampler = asyncio.create_task(sample_memory())
+        started = time.perf_counter()
+        try:
+            errors = await run(total, latencies)
+        finally:
+            elapsed = time.perf_counter() - started
+            sampler.cancel()
+
+    latencies.sort()
+    return {
+        "requests": total,
+        "concurrency": concurrency,
+        "errors": errors,
+        "rps": round(total / elapsed, 1),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 2),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "peak_rss_mb": round(peak_rss, 1) if peak_rss is not None else None,
+    }
+
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], tolerance: float, min_delta_ms: float) -> List[str]:
+    """Describe every run that is slower than the baseline beyond `tolerance`"""
+    regressions = []
+    for key, current in results.items():
+        previous = baseline.get(key)
+        if previous is None:
+            continue
+        if current["rps"] < previous["rps"] * (1 - tolerance):
+            regressions.append(f"{key}: throughput {previous['rps']} -> {current['rps']} req/s")
+        for metric in ("p95_ms", "p99_ms"):
+            # diferencas de poucos milissegundos sao ruido em rotas rapidas
+            if current[metric] > previous[metric] * (1 + tolerance) and current[metric] - previous[metric] > min_delta_ms:
+                regressions.append(f"{key}: {metric} {previous[metric]} -> {current[metric]}")
+        if current["errors"] > previous["errors"]:
+            regressions.append(f"{key}: errors {previous['errors']} -> {current['errors']}")
+    return regressions
+
+
+def print_table(results: Dict[str, Dict]):
+    header = f"{'scenario':<40}{'req/s':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'errors':>8}{'rss MB':>9}"
+    print(header)
+    print("-" * len(header))
+    for key, row in results.items():
+        print(f"{key:<40}{row['rps']:>9}{row['p50_ms']:>9}{row['p95_ms']:>9}{row['p99_ms']:>9}"
+              f"{row['errors']:>8}{row['peak_rss_mb'] or '-':>9}")
+
+
+async def benchmark(args) -> Dict[str, Dict]:
+    scenarios = [s for s in SCENARIOS if not args.scenarios or s.name in args.scenarios]
+    unknown = set(args.scenarios or ()) - {s.name for s in SCENARIOS}
+    if unknown:
+        raise SystemExit(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+    upstream_port, app_port = free_port(), free_port()
+    upstream_url = f"http://127.0.0.1:{upstream_port}"
+    workdir = tempfile.mkdtemp(prefix="wea-bench-")
+    upstream = start_server("benchmarks.fake_upstreams:app", upstream_port, {
+        "FAKE_LATENCY_MS": str(args.latency_ms),
+        "FAKE_JITTER_MS": str(args.jitter_ms),
+        "FAKE_ERROR_RATE": str(args.error_rate),
+    })
+    server = start_server("app.main:app", app_port, {
+        "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+        "CACHE_DIR": os.path.join(workdir, "cache"),
+        "SECRET_KEY": "benchmark",
+        "ALLOWED_ORIGIN": "*",
+        "AZURE_API_TRANSLATE_ENDPOINT": upstream_url,
+        "AZURE_API_TRANSLATE_KEY": "benchmark",
+        "AZURE_API_REGION": "benchmark",
+        "AZURE_CV_ENDPOINT": upstream_url,
+        "AZURE_CV_KEY": "benchmark",
+        "WITAI_TOKEN": "benchmark",
+        "WITAI_API_URL": f"{upstream_url}/message",
+        "GTTS_BASE_URL": upstream_url,
+        # toda a carga vem de um unico cliente: so os limites de concorrencia continuam valendo
+        "IMAGE_RATE_PER_SECOND": "0",
+        "TTS_RATE_PER_SECOND": "0",
+        "TRANSLATE_RATE_PER_SECOND": "0",
+        "NO_PROXY": "127.0.0.1,localhost",
+        "no_proxy": "127.0.0.1,localhost",
+    }, workers=args.workers)
+
+    base_url = f"http://127.0.0.1:{app_port}"
+    results = {}
+    try:
+        await wait_until_ready(upstream_url)
+        await wait_until_ready(base_url)
+        async with httpx.AsyncClient(base_url=base_url) as client:
+            login = await client.post("/auth/login", data={"username": "admin@example.com", "password": "senha123"})
+            token = login.json()["access_token"]
+
+        for scenario in scenarios:
+            for concurrency in args.concurrency:
+                key = f"{scenario.name}@c{concurrency}"
+                results[key] = await measure(base_url, server.pid, scenario, token, args.requests,
+                                             concurrency, args.warmup)
+                print(f"{key}: {results[key]['rps']} req/s, p95 {results[key]['p95_ms']} ms", flush=True)
+    finally:
+        for process in (server, upstream):
+            process.terminate()
+            process.wait(timeout=30)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", default="1,8,32", type=lambda value: [int(v) for v in value.split(",")])
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario and concurrency level")
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers for the API")
+    parser.add_argument("--scenarios", type=lambda value: value.split(","), help="comma-separated subset")
+    parser.add_argument("--latency-ms", type=float, default=50, help="mean latency added by the fake upstreams")
+    parser.add_argument("--jitter-ms", type=float, default=10)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of upstream calls that fail")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--compare", action="store_true", help="fail when slower than the saved baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative slowdown")
+    parser.add_argument("--min-delta-ms", type=float, default=5.0, help="ignore latency changes smaller than this")
+    args = parser.parse_args()
+
+    results = asyncio.run(benchmark(args))
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "workers": args.workers,
+            "requests": args.requests,
+            "latency_ms": args.latency_ms,
+            "jitter_ms": args.jitter_ms,
+            "error_rate": args.error_rate,
+        },
+        "results": results,
+    }
+
+    print()
+    print_table(results)
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    output_path = os.path.join(RESULTS_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}.json")
+    with open(output_path, "w") as output:
+        json.dump(report, output, indent=2)
+    print(f"\nResults written to {output_path}")
+
+    if args.save_baseline:
+        with open(BASELINE_PATH, "w") as baseline_file:
+            json.dump(report, baseline_file, indent=2)
+        print(f"Baseline saved to {BASELINE_PATH}")
+
+    if args.compare:
+        with open(BASELINE_PATH) as baseline_file:
+            baseline = json.load(baseline_file)
+        regressions = compare(results, baseline["results"], args.tolerance, args.min_delta_ms)
+        if regressions:
+            print("\nRegressions against the baseline:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print("\nNo regressions against the baseline.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Request builders for every /auth and /api/v1 route exercised by the benchmark"""
+import random
+from dataclasses import dataclass, field
+from io import BytesIO
+from typing import Any, Callable, Dict, Tuple
+from PIL import Image
+
+TEXTS = [
+    "Bem-vindo ao portal de acessibilidade.",
+    "Clique no botao para continuar.",
+    "Esta pagina contem informacoes importantes sobre o seu cadastro.",
+    "Voltar para o inicio",
+    "Fale conosco",
+]
+
+
+@dataclass
+class Scenario:
+    name: str
+    method: str
+    path: str
+    # build(i, token) -> kwargs do httpx (ou a mensagem, no caso de websocket)
+    build: Callable[[int, str], Dict[str, Any]] = field(default=lambda i, token: {})
+    expected_status: Tuple[int, ...] = (200,)
+    websocket: bool = False
+
+
+def _auth(token: str) -> Dict[str, str]:
+    return {"Authorization": f"Bearer {token}"}
+
+
+def _image(i: int, unique: bool) -> bytes:
+    # ruido aleatorio gera hashes perceptuais distantes; a semente fixa repete a mesma imagem
+    rng = random.Random(i if unique else 0)
+    image = Image.frombytes("RGB", (64, 64), bytes(rng.getrandbits(8) for _ in range(64 * 64 * 3)))
+    output = BytesIO()
+    image.save(output, format="PNG")
+    return output.getvalue()
+
+
+def _feedback(i: int) -> Dict[str, str]:
+    return {"title": "benchmark", "message": f"Feedback numero {i}"}
+
+
+SCENARIOS = [
+    Scenario("auth_login", "POST", "/auth/login",
+             lambda i, token: {"data": {"username": "admin@example.com", "password": "senha123"}}),
+    Scenario("auth_me", "GET", "/auth/users/me/", lambda i, token: {"headers": _auth(token)}),
+    Scenario("auth_hasher_stats", "GET", "/auth/hasher/stats", lambda i, token: {"headers": _auth(token)}),
+
+    Scenario("feedback", "POST", "/api/v1/feedback", lambda i, token: {"json": _feedback(i)}, (202,)),
+    Scenario("feedback_bulk", "POST", "/api/v1/feedback/bulk",
+             lambda i, token: {"json": {"feedbacks": [_feedback(i * 50 + j) for j in range(50)]}}, (202,)),
+    Scenario("feedback_queue_stats", "GET", "/api/v1/feedback/queue-stats"),
+
+    Scenario("translate_cached", "POST", "/api/v1/translate/",
+             lambda i, token: {"json": {"from_language": "pt", "to_language": "en", "text_list": TEXTS}}),
+    Scenario("translate_uncached", "POST", "/api/v1/translate/",
+             lambda i, token: {"json": {"from_language": "pt", "to_language": "en", "text_list": [f"{text} ({i})" for text in TEXTS]}}),
+    Scenario("translate_compact", "POST", "/api/v1/translate/",
+             lambda i, token: {"json": {"to_language": "en", "text_list": TEXTS, "format": "compact",
+                                        "include_detected_language": True}}),
+    Scenario("translate_stream", "POST", "/api/v1/translate/stream",
+             lambda i, token: {"json": {"from_language": "pt", "to_language": "es", "text_list": [f"{text} [{i}]" for text in TEXTS]}}),
+    Scenario("translate_cache_stats", "GET", "/api/v1/translate/cache-stats"),
+
+    Scenario("describe_image_cached", "POST", "/api/v1/describe-image/",
+             lambda i, token: {"files": {"file": ("bench.png", _image(i, unique=False), "image/png")}}),
+    Scenario("describe_image_uncached", "POST", "/api/v1/describe-image/",
+             lambda i, token: {"files": {"file": ("bench.png", _image(i, unique=True), "image/png")}}),
+    Scenario("describe_image_batch", "POST", "/api/v1/describe-image/batch/",
+             lambda i, token: {"files": [("files", (f"bench{j}.png", _image(i * 4 + j, unique=True), "image/png"))
+                                         for j in range(4)]}),
+
+    Scenario("convert_audio_cached", "POST", "/api/v1/convert-audio/",
+             lambda i, token: {"params": {"text": TEXTS[0]}}),
+    Scenario("convert_audio_uncached", "POST", "/api/v1/convert-audio/",
+             lambda i, token: {"params": {"text": f"{TEXTS[2]} {i}"}}),
+    Scenario("convert_audio_stream", "POST", "/api/v1/convert-audio/stream/",
+             lambda i, token: {"params": {"text": f"{TEXTS[0]} {TEXTS[2]} Parte {i}."}}),
+    Scenario("convert_audio_batch", "POST", "/api/v1/convert-audio/batch/",
+             lambda i, token: {"json": {"texts": [f"{text} {i}" for text in TEXTS]}}),
+
+    Scenario("voice_command_local", "POST", "/api/v1/voice-navigation/command",
+             lambda i, token: {"json": {"text": "rolar para baixo"}}),
+    Scenario("voice_command_wit", "POST", "/api/v1/voice-navigation/command",
+             lambda i, token: {"json": {"text": f"desce um pouco a pagina {i}"}}),
+    Scenario("voice_websocket", "WS", "/api/v1/voice-navigation/ws",
+             lambda i, token: {"id": i, "text": f"desce a pagina {i}"}, websocket=True),
+
+    Scenario("admin_feedback_list", "GET", "/api/v1/admin/feedback",
+             lambda i, token: {"headers": _auth(token), "params": {"limit": 50}}),
+    Scenario("admin_feedback_export", "GET", "/api/v1/admin/feedback/export",
+             lambda i, token: {"headers": _auth(token), "params": {"format": "ndjson"}}),
+]